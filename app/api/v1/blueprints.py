@@ -12,7 +12,8 @@ from .routes.dashboard_routes import dashboards_bp
 from .routes.settings_routes import create_settings_bp
 
 def register_all_blueprints(app, user_service, dashboard_service,
-                            station_service, active_staff_service, production_lines_service):
+                            station_service, active_staff_service, production_lines_service,
+                            photo_manifest=None, photo_derivatives=None):
     """
     Registra todos los blueprints en la aplicación Flask.
 
@@ -32,6 +33,9 @@ def register_all_blueprints(app, user_service, dashboard_service,
             estaciones (opcional).
         active_staff_service: Servicio para manejar la lógica del
         personal activo.
+        photo_manifest: Índice en memoria de las fotos de empleados
+        (opcional).
+        photo_derivatives: Versiones reducidas de las fotos (opcional).
 
     Returns:
         None
@@ -45,11 +49,13 @@ def register_all_blueprints(app, user_service, dashboard_service,
         dashboard_service,
         station_service,
         active_staff_service,
-        production_lines_service
+        production_lines_service,
+        photo_manifest,
+        photo_derivatives
     ))
 
     # Registra el blueprint de dashboards
     app.register_blueprint(dashboards_bp)
 
     # Registra el blueprint de configuración
-    app.register_blueprint(create_settings_bp(user_service))
+    app.register_blueprint(create_settings_bp(user_service, photo_manifest))
@@ -1,5 +1,10 @@
-from flask import Blueprint, render_template, request, jsonify
+import json
+import time
+from flask import Blueprint, Response, current_app, render_template, request, jsonify, \
+    stream_with_context
 from app.domain.services.dashboard_service import DashboardService
+from app.infra.db.db import close_db
+from app.infra.http.conditional import conditional
 
 # El blueprint ahora tiene el prefijo /dashboards
 dashboards_bp = Blueprint('dashboards', __name__, url_prefix='/dashboards')
@@ -7,56 +12,32 @@ dashboards_bp = Blueprint('dashboards', __name__, url_prefix='/dashboards')
 # Placeholder para el servicio que será inyectado
 dashboard_service: DashboardService
 
+# Los dashboards muestran ocupación, capacidades y nombres de operadores
+DASHBOARD_SCOPES = ("occupancy", "topology", "employees")
+
+
+def _dashboard_validator(*args, **kwargs):
+    """Versión compartida de los datos de los dashboards (ver conditional)."""
+    return dashboards_bp.dashboard_service.get_data_validator(DASHBOARD_SCOPES)
 
-from itertools import groupby
 
 @dashboards_bp.route('/lines')
+@conditional(_dashboard_validator)
 def show_lines_dashboard():
     """
     Renderiza la página PRINCIPAL (nivel 1) que muestra las tarjetas de las ÁREAS.
+    Los totales por área se agregan en la base de datos.
     """
-    lines_data = dashboards_bp.dashboard_service.get_lines_summary()
-    
-    # Sort by area
-    lines_data.sort(key=lambda x: x.get('area', 'Sin Area'))
-    
-    areas_summary = []
-    
-    # Group by area to calculate stats
-    for area, group in groupby(lines_data, key=lambda x: x.get('area', 'Sin Area')):
-        lines_in_group = list(group)
-        total_cap = sum((l.get('capacity') or 0) for l in lines_in_group)
-        total_ops = sum((l.get('operators') or 0) for l in lines_in_group)
-        area_id = lines_in_group[0].get('area_id') if lines_in_group else 0
-        
-        pct = round((total_ops / total_cap) * 100) if total_cap > 0 else 0
-        
-        # Determine strict class
-        status_class = "employee-ok"
-        if pct < 90: # Umbral ejemplo
-             status_class = "employee-nook"
-        elif pct > 100:
-             status_class = "employee-warning"
-
-        areas_summary.append({
-            "name": area,
-            "id": area_id,
-            "percentage": pct,
-            "class": status_class,
-            "lines_count": len(lines_in_group)
-        })
-        
-    return render_template('lines_dashboards.html', areas=areas_summary)
+    summary = dashboards_bp.dashboard_service.get_areas_summary()
+    return render_template('lines_dashboards.html', areas=summary['areas'], plant=summary['plant'])
 
 @dashboards_bp.route('/area/<int:area_id>')
+@conditional(_dashboard_validator)
 def show_area_dashboard(area_id):
     """
     Renderiza la página DETALLE (nivel 2) que muestra las líneas de UNA ÁREA específica.
     """
-    lines_data = dashboards_bp.dashboard_service.get_lines_summary()
-    
-    # Filter by area_id
-    filtered_lines = [l for l in lines_data if l.get('area_id') == area_id]
+    filtered_lines = dashboards_bp.dashboard_service.get_lines_summary_for_area(area_id)
     
     if not filtered_lines:
          return "Area not found or empty", 404
@@ -77,15 +58,24 @@ def show_area_dashboard(area_id):
     return render_template('area_lines_dashboard.html', 
                           lines=main_lines, 
                           afe_lines=afe_lines,
-                          area_name=area_name)
+                          area_name=area_name,
+                          area_id=area_id)
 
 @dashboards_bp.route('/stations')
+@conditional(_dashboard_validator)
 def show_stations_dashboard():
     line_id = request.args.get('line', type=int)
     if not line_id:
         return "Error: Se requiere un ID de línea.", 400
 
-    station_data = dashboards_bp.dashboard_service.get_station_details_for_line(line_id)
+    # HTML cacheado por versión de ocupación/topología de la línea
+    return dashboards_bp.dashboard_service.render_station_view(
+        "stations_dashboard", line_id,
+        lambda station_data: _render_stations_dashboard(line_id, station_data)
+    )
+
+def _render_stations_dashboard(line_id, station_data):
+    """Calcula clases y totales por side/card y renderiza el dashboard de estaciones."""
     cards = station_data.get('cards') or []
 
     # ---- Separar AFE vs no-AFE ----
@@ -96,14 +86,7 @@ def show_stations_dashboard():
         (cards_afe if is_afe else cards_main).append(card)
 
     # ---- Calcular clases por side y por card (agregado) ----
-    def side_status_class(cap: int, act: int) -> str:
-        if act < cap:
-            return "employee-nook"      # amarillo (falta personal)
-        elif act == cap:
-            return "employee-ok"        # verde (justo)
-        else:
-            return "employee-warning"   # rojo (exceso)
-
+    service = dashboards_bp.dashboard_service
     for card in cards:
         # set para cada side
         total_cap, total_act = 0, 0
@@ -114,7 +97,7 @@ def show_stations_dashboard():
             total_act += act
             # si ya traía una clase, respétala; si no, asígnala
             if not side.get('class'):
-                side['class'] = side_status_class(cap, act)
+                side['class'] = service.side_status_class(cap, act)
 
         # clase de card agregada (para pintar el fondo de la tarjeta grande)
         if card.get('status', True) is not False:
@@ -126,28 +109,8 @@ def show_stations_dashboard():
                 card['class'] = (card.get('class') or "") + " card--over"
 
     # ---- Totales (como ya tenías) ----
-    total_capacity, total_active = 0, 0
-    for card in cards:
-        if card.get('status', True) is False:
-            continue
-        for side in card.get('sides', []):
-            total_capacity += int(side.get('employee_capacity') or 0)
-            total_active  += int(side.get('employees_working') or 0)
-
-    if total_capacity > 0:
-        pct_active = round((total_active / total_capacity) * 100)
-        overflow = max(total_active - total_capacity, 0)
-        overflow_pct = round((overflow / total_capacity) * 100) if overflow else 0
-        pct_active_clamped = min(100, pct_active)
-    else:
-        pct_active_clamped, overflow_pct = 0, 0
-
-    station_data['totals'] = {
-        'capacity': total_capacity,
-        'active': total_active,
-        'pct_active': pct_active_clamped,
-        'overflow_pct': overflow_pct,
-    }
+    station_data['totals'] = service.compute_totals(cards)
+    station_data['line_id'] = line_id
     station_data['cards_main'] = cards_main
     station_data['cards_afe']  = cards_afe
     station_data['has_afe']    = len(cards_afe) > 0
@@ -155,6 +118,7 @@ def show_stations_dashboard():
     return render_template('stations_dashboards.html', **station_data)
 
 @dashboards_bp.route('/api/operators')
+@conditional(_dashboard_validator)
 def get_active_operators():
     """
     Endpoint de API que devuelve los operadores activos para una estación.
@@ -166,4 +130,120 @@ def get_active_operators():
 
     # Llama al servicio para obtener los datos y los devuelve como JSON
     operators = dashboards_bp.dashboard_service.get_active_operators_for_station(station_id)
-    return jsonify(operators)
\ No newline at end of file
+    return jsonify(operators)
+
+MAX_BATCH_SIDES = 500
+
+@dashboards_bp.route('/api/operators/batch')
+@conditional(_dashboard_validator)
+def get_active_operators_batch():
+    """
+    Endpoint de API que devuelve los operadores activos de varios sides en
+    una sola consulta: `?line=<id>` (todos los sides de la línea) o
+    `?ids=1,2,3`. Respuesta: {side_id: [nombres]}.
+    """
+    line_id = request.args.get('line', type=int)
+    raw_ids = request.args.get('ids', '')
+    try:
+        side_ids = [int(value) for value in raw_ids.split(',') if value.strip()]
+    except ValueError:
+        return jsonify({"error": "Los IDs de side deben ser numéricos."}), 400
+
+    if line_id is None and not side_ids:
+        return jsonify({"error": "Se requiere una línea o una lista de sides."}), 400
+    if len(side_ids) > MAX_BATCH_SIDES:
+        return jsonify({"error": f"Máximo {MAX_BATCH_SIDES} sides por consulta."}), 400
+
+    rosters = dashboards_bp.dashboard_service.get_active_operators_by_side(
+        side_ids=side_ids, line_id=line_id
+    )
+    return jsonify({str(side_id): names for side_id, names in rosters.items()})
+
+@dashboards_bp.route('/api/stations/<int:line_id>')
+@conditional(_dashboard_validator)
+def get_station_cards_api(line_id):
+    """
+    Endpoint de API con las tarjetas de estación de una línea y su versión
+    de ocupación. Con `?since=<versión>` devuelve sólo los sides cuyo
+    `employees_working` cambió, o 304 si no hubo cambios.
+    """
+    since = request.args.get('since', type=int)
+    delta = dashboards_bp.dashboard_service.get_station_cards_delta(line_id, since)
+    if delta is None:
+        return "", 304
+    return jsonify(delta)
+
+@dashboards_bp.route('/api/cache-stats')
+def get_cache_stats():
+    """
+    Endpoint de API con los contadores de la caché de ocupación del worker
+    que atiende la petición (aciertos, fallos, invalidaciones).
+    """
+    return jsonify(dashboards_bp.dashboard_service.get_cache_stats())
+
+
+# --- Server-Sent Events ---
+def _sse_event(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+def _sse_response(snapshot_fn, event: str) -> Response:
+    """
+    Stream SSE que envía sólo las diferencias de ocupación.
+
+    Cada vuelta toma un snapshot (servido por la caché de ocupación, así que
+    N wallboards en el mismo worker cuestan una consulta por TTL), lo compara
+    con el anterior y emite el diff. Entre vueltas espera una invalidación
+    local o SSE_POLL_SECONDS, lo que ocurra primero; los cambios hechos en
+    otros workers llegan al vencer el TTL de la caché.
+
+    La conexión se cierra tras SSE_MAX_STREAM_SECONDS y EventSource
+    reconecta solo, para que ningún hilo quede ocupado indefinidamente.
+    """
+    service = dashboards_bp.dashboard_service
+    poll_seconds = current_app.config.get('SSE_POLL_SECONDS', 5)
+    max_seconds = current_app.config.get('SSE_MAX_STREAM_SECONDS', 300)
+    retry_ms = current_app.config.get('SSE_RETRY_MS', 3000)
+
+    def generate():
+        deadline = time.monotonic() + max_seconds
+        previous: dict = {}
+        generation = service.get_change_generation()
+        yield f"retry: {retry_ms}\n\n"
+        while time.monotonic() < deadline:
+            try:
+                current = snapshot_fn()
+            finally:
+                # No retener una conexión del pool durante toda la vida del stream
+                close_db()
+            diff = service.diff_snapshots(previous, current)
+            yield _sse_event(event, diff) if diff else ": keep-alive\n\n"
+            previous = current
+            generation = service.wait_for_occupancy_change(generation, poll_seconds)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@dashboards_bp.route('/stream/stations')
+def stream_stations_dashboard():
+    """
+    Stream SSE de ocupación por side y totales de una línea (o grupo).
+    Eventos `occupancy`: {"sides": [...], "totals": {...}}.
+    """
+    line_id = request.args.get('line', type=int)
+    if not line_id:
+        return "Error: Se requiere un ID de línea.", 400
+
+    service = dashboards_bp.dashboard_service
+    return _sse_response(lambda: service.get_line_occupancy_snapshot(line_id), 'occupancy')
+
+@dashboards_bp.route('/stream/area/<int:area_id>')
+def stream_area_dashboard(area_id):
+    """
+    Stream SSE de ocupación por línea de un área.
+    Eventos `occupancy`: {"lines": [...]}.
+    """
+    service = dashboards_bp.dashboard_service
+    return _sse_response(lambda: service.get_area_occupancy_snapshot(area_id), 'occupancy')
@@ -2,6 +2,7 @@
 Fábrica del blueprint principal (Main).
 api/v1/routes/main/__init__.py
 """
+from typing import Optional
 from flask import Blueprint
 
 from app.domain.repositories.IProductionLinesRepository import \
@@ -10,16 +11,21 @@ from app.domain.services.user_service import UserService
 from app.domain.services.dashboard_service import DashboardService
 from app.domain.services.station_service import StationService
 from app.domain.services.active_staff_service import ActiveStaffService
+from app.infra.media.photo_manifest import PhotoManifest
+from app.infra.media.photo_derivatives import PhotoDerivatives
 from .home import register_home
 from .successful import register_successful
 from .menu_station import register_menu_station
 from .employees import register_employees
+from .photos import register_photos
 
 def create_main_bp(user_service: UserService,
     dashboard_service: DashboardService,
     station_service: StationService,
     active_staff_service: ActiveStaffService,
-    production_lines_service: IProductionLinesRepository
+    production_lines_service: IProductionLinesRepository,
+    photo_manifest: Optional[PhotoManifest] = None,
+    photo_derivatives: Optional[PhotoDerivatives] = None
     ) -> Blueprint:
     """
     Crea y configura el blueprint principal de la aplicación.
@@ -34,6 +40,10 @@ def create_main_bp(user_service: UserService,
         lógica de negocio relacionada con estaciones.
         active_staff_service (ActiveStaffService): Servicio para manejar
         la lógica de negocio relacionada con empleados activos.
+        photo_manifest (PhotoManifest): Índice de fotos de empleados;
+        sin él, la pantalla de éxito consulta el disco.
+        photo_derivatives (PhotoDerivatives): Versiones reducidas de las
+        fotos; sin él, se sirven las originales.
 
     Returns:
         Blueprint: El blueprint principal configurado con sus rutas
@@ -44,7 +54,10 @@ def create_main_bp(user_service: UserService,
 
     register_home(bp, user_service, production_lines_service)
     register_menu_station(bp, user_service, dashboard_service)
-    register_successful(bp, user_service, station_service)
+    register_successful(bp, user_service, station_service, photo_manifest,
+                        photo_derivatives)
     register_employees(bp, active_staff_service, production_lines_service)
+    if photo_derivatives is not None:
+        register_photos(bp, photo_derivatives)
 
     return bp
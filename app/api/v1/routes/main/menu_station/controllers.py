@@ -51,27 +51,9 @@ def menu_station_post(*, user_service: UserService,
     if last == "Exit":
         resp = make_response(redirect(url_for("main.successful")))
     else:
-        data = dashboard_service.get_station_details_for_line(line)
-        cards = data.get("cards") or []
-
-        # Separar AFE y normales
-        cards_main, cards_afe = [], []
-        for card in cards:
-            name = (card.get("position_name") or "")
-            is_afe = bool(card.get("is_afe")) or ("afe" in name.lower())
-            (cards_afe if is_afe else cards_main).append(card)
-
-        has_afe = len(cards_afe) > 0
-
-        # Puedes seguir usando tu build_menu_view_model si lo necesitas
-        view_model = build_menu_view_model(data)
-        view_model.update({
-            "cards_main": cards_main,
-            "cards_afe": cards_afe,
-            "has_afe": has_afe
-        })
-
-        resp = make_response(render_template("menu.html", **view_model))
+        # HTML del menú cacheado por versión de ocupación/topología de la línea
+        html = dashboard_service.render_station_view("station_menu", line, _render_menu)
+        resp = make_response(html)
 
     # 5) ESTABLECER LA COOKIE (UN SOLO LUGAR)
     # No importa cuál fue la respuesta (redirect o render),
@@ -82,6 +64,30 @@ def menu_station_post(*, user_service: UserService,
     return resp
 
 
+def _render_menu(data: dict) -> str:
+    """Arma el ViewModel del menú de estaciones y renderiza `menu.html`."""
+    cards = data.get("cards") or []
+
+    # Separar AFE y normales
+    cards_main, cards_afe = [], []
+    for card in cards:
+        name = (card.get("position_name") or "")
+        is_afe = bool(card.get("is_afe")) or ("afe" in name.lower())
+        (cards_afe if is_afe else cards_main).append(card)
+
+    has_afe = len(cards_afe) > 0
+
+    # Puedes seguir usando tu build_menu_view_model si lo necesitas
+    view_model = build_menu_view_model(data)
+    view_model.update({
+        "cards_main": cards_main,
+        "cards_afe": cards_afe,
+        "has_afe": has_afe
+    })
+
+    return render_template("menu.html", **view_model)
+
+
 def afe_menu_get():
     """
     Maneja las solicitudes GET al endpoint /afeMenu.
@@ -0,0 +1,28 @@
+"""
+GET /photos/<name> — Derivados reducidos de las fotos de empleados.
+
+app/api/v1/routes/main/photos.py
+"""
+from flask import Blueprint, abort, send_from_directory
+
+from app.infra.media.photo_derivatives import PhotoDerivatives
+
+# Los nombres llevan hash del contenido: pueden cachearse un año sin revalidar
+PHOTO_MAX_AGE = 365 * 24 * 3600
+
+
+def register_photos(bp: Blueprint, photo_derivatives: PhotoDerivatives) -> None:
+    """
+    Registra la ruta que sirve los derivados de fotos desde la caché en
+    disco, con `Cache-Control: public, max-age=<1 año>, immutable`.
+    """
+
+    @bp.route("/photos/<path:name>", methods=["GET"], endpoint="photo_derivative")
+    def photo_derivative(name: str):
+        if not photo_derivatives.available:
+            abort(404)
+        response = send_from_directory(photo_derivatives.cache_dir, name,
+                                       max_age=PHOTO_MAX_AGE, mimetype="image/jpeg")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
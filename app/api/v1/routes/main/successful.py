@@ -4,11 +4,14 @@ estado/asignación.
 
 app/api/v1/routes/main/successful.py
 """
-from typing import Any, Dict
-from flask import Blueprint, render_template, request, url_for, redirect
+import os
+from typing import Any, Dict, Optional
+from flask import Blueprint, current_app, render_template, request, url_for, redirect
 from app.domain.services.user_service import UserService
 from app.domain.services.station_service import StationService
 from app.api.v1.schemas.main import EmployeeCookie
+from app.infra.media.photo_manifest import PhotoManifest
+from app.infra.media.photo_derivatives import PhotoDerivatives
 import traceback, sys
 import logging
 
@@ -16,13 +19,17 @@ def register_successful(
     bp: Blueprint,
     user_service: UserService,
     station_service: StationService,
+    photo_manifest: Optional[PhotoManifest] = None,
+    photo_derivatives: Optional[PhotoDerivatives] = None,
 ) -> None:
     """
     Registra la ruta `/successful` en el blueprint proporcionado.
 
     - Valida cookie `employee_number`.
     - Si viene `?id=...`, registra asignación/entrada.
-    - Combina info de usuario (UserService) y de pantalla/estado (StationService).
+    - Obtiene usuario, tipo de registro, línea y estación (StationService) en una consulta.
+    - Resuelve la foto contra el índice en memoria (`photo_manifest`) y
+      usa sus versiones reducidas (`photo_derivatives`) si están disponibles.
     - Renderiza `successful.html`.
     """
 
@@ -48,11 +55,15 @@ def register_successful(
         side_id = request.args.get("id", type=int)
         logger.info("EN SUCCESSFUL: side_id recibido = %s", side_id)
         
+        # Clave opcional del kiosco para no duplicar reenvíos (modo write-behind)
+        idempotency_key = request.headers.get("Idempotency-Key")
+
         if side_id:
             try:
                 user_service.register_entry_or_assignment(
                     employee_number=data.employee_number,
                     side_id=side_id,
+                    idempotency_key=idempotency_key,
                 )
             except Exception as e:
                 logger.error("Error al registrar entrada: %s", e)
@@ -61,57 +72,64 @@ def register_successful(
         else:
             try:
                 user_service.register_entry_or_assignment(
-                    employee_number=data.employee_number
+                    employee_number=data.employee_number,
+                    idempotency_key=idempotency_key,
                 )
             except Exception as e:
                 traceback.print_exc()
 
+        # 3) Resultado del escaneo: usuario, tipo, línea y estación en una consulta
         try:
-            info = user_service.get_user_info_for_display(data.employee_number) or {}
-        except Exception as e:
-            print("Error al obtener info de usuario:", e, file=sys.stderr)
-            traceback.print_exc()
-
-        try:
-            display = station_service.get_user_status_for_display(
-                int(data.employee_number)
-            ) or {}
+            if user_service.write_behind_enabled:
+                # El escaneo aún está en el diario local: no leer Postgres para el tipo
+                display = station_service.get_pending_scan_result(
+                    int(data.employee_number), side_id or 0
+                )
+            else:
+                display = station_service.get_scan_result(int(data.employee_number))
         except Exception as e:
-            print("Error al obtener estado para display:", e, file=sys.stderr)
+            print("Error al obtener resultado del escaneo:", e, file=sys.stderr)
             traceback.print_exc()
             display = {}
 
-        print(display)
-
         # 4) Resolver imagen
         image_filename = display.get("image")
-        if not image_filename and "id" in info:
-            image_filename = f"{info['id']}.png"
-
-        import os
-        from flask import current_app
 
         image_url = None
+        image_srcset = None
         if image_filename:
-             # Construir ruta absoluta para verificar existencia
-             static_folder = current_app.static_folder or "app/static"
-             media_path = os.path.join(static_folder, "img", "media", image_filename)
-             
-             if os.path.exists(media_path):
-                 image_url = url_for("static", filename=f"img/media/{image_filename}")
-             else:
-                 # Si no existe, dejamos image_url en None para activar el placeholder
-                 logger.warning("Imagen no encontrada: %s", media_path)
+            if photo_manifest is not None:
+                exists = photo_manifest.contains(image_filename)
+            else:
+                static_folder = current_app.static_folder or "app/static"
+                exists = os.path.exists(
+                    os.path.join(static_folder, "img", "media", image_filename))
+
+            derivatives = photo_derivatives.get(image_filename) \
+                if exists and photo_derivatives is not None else None
+            if derivatives:
+                # El ancho menor es el que muestra la plantilla; el resto, para srcset
+                image_url = url_for("main.photo_derivative", name=derivatives[min(derivatives)])
+                image_srcset = ", ".join(
+                    f'{url_for("main.photo_derivative", name=name)} {width}w'
+                    for width, name in sorted(derivatives.items())
+                )
+            elif exists:
+                image_url = url_for("static", filename=f"img/media/{image_filename}")
+            else:
+                # Si no existe, dejamos image_url en None para activar el placeholder
+                logger.warning("Imagen no encontrada: %s", image_filename)
 
         # 5) Contexto unificado
         ctx: Dict[str, Any] = {
             "css_href": url_for("static", filename="css/styles.css"),
-            "user": info.get("name"),
+            "user": display.get("user"),
             "line": display.get("line_name"),
             "station": display.get("station_name"),
             "tipo": display.get("type"),
             "color_class": display.get("color"),
             "image": image_url,
+            "image_srcset": image_srcset,
             "message": "¡Bienvenido, buen turno!" if display.get("type") == "Entrada" else "Gracias por tu esfuerzo hoy.",
             "animation_type": "anim-entry" if display.get("type") == "Entrada" else "anim-exit",
         }
@@ -3,19 +3,26 @@
     Rutas para la configuración de línea y estación.
 """
 
+from typing import Optional
+
 from flask import Blueprint, render_template, request, make_response, redirect, \
     url_for  # Se importan utilidades de Flask para estructurar rutas, manejar peticiones y respuestas, y facilitar la navegación.
 
 from app.domain.services.user_service import \
     UserService  # Se importa el servicio de usuario para delegar la lógica de negocio y mantener el código desacoplado.
+from app.infra.http.conditional import conditional
+from app.infra.db.db import get_pool_stats
+from app.infra.media.photo_manifest import PhotoManifest
 
 
-def create_settings_bp(user_service: UserService) -> Blueprint:
+def create_settings_bp(user_service: UserService,
+                       photo_manifest: Optional[PhotoManifest] = None) -> Blueprint:
     """
     Crea y configura el blueprint de configuración.
 
     Args:
         user_service (UserService): Servicio para manejar la lógica de negocio relacionada con usuarios.
+        photo_manifest (PhotoManifest): Índice de fotos de empleados (opcional).
 
     Returns:
         Blueprint: El blueprint de configuración con sus rutas registradas.
@@ -132,6 +139,118 @@ def create_settings_bp(user_service: UserService) -> Blueprint:
         except Exception as e:
             return {"success": False, "message": str(e)}, 500
 
+    @settings_bp.route('/general-exit/bulk', methods=['POST'])
+    def general_exit_bulk():
+        """
+        Ejecuta la salida general de varias líneas o de un área completa en
+        una sola operación.
+        Espera un JSON con { "line_ids": [int, ...] } y/o { "business_unit": str }.
+        """
+        data = request.get_json(silent=True) or {}
+        line_ids = data.get('line_ids') or []
+        business_unit = (data.get('business_unit') or '').strip() or None
+        if not isinstance(line_ids, list):
+            return {"success": False, "message": "line_ids debe ser una lista"}, 400
+        try:
+            line_ids = [int(line_id) for line_id in line_ids]
+        except (TypeError, ValueError):
+            return {"success": False, "message": "line_ids debe contener enteros"}, 400
+        if not line_ids and not business_unit:
+            return {"success": False, "message": "Líneas o unidad de negocio no proporcionadas"}, 400
+
+        try:
+            counts = user_service.perform_bulk_logout(line_ids, business_unit)
+        except Exception as e:
+            return {"success": False, "message": str(e)}, 500
+
+        return {
+            "success": True,
+            "message": "Salida registrada exitosamente.",
+            "count": sum(counts.values()),
+            "lines": [{"line_id": line_id, "count": count} for line_id, count in counts.items()]
+        }, 200
+
+    @settings_bp.route('/api/provision-defaults', methods=['POST'])
+    def provision_defaults():
+        """
+        Crea las posiciones/sides por defecto que falten (Inyección y
+        Metalizado, o los grupos de { "groups": [...] }) en una transacción.
+        """
+        data = request.get_json(silent=True) or {}
+        try:
+            created = user_service.provision_missing_defaults(data.get('groups'))
+            return {"success": True, **created}, 200
+        except Exception as e:
+            return {"success": False, "message": str(e)}, 500
+
+    @settings_bp.route('/api/employee-directory', methods=['GET'])
+    def employee_directory_stats():
+        """
+        Estado del directorio de empleados en memoria del worker que
+        atiende la petición (empleados, memoria estimada, aciertos).
+        """
+        return {"directory": user_service.get_employee_directory_stats()}, 200
+
+    @settings_bp.route('/api/employee-directory/refresh', methods=['POST'])
+    def refresh_employee_directory():
+        """
+        Fuerza la recarga completa del directorio de empleados tras altas,
+        bajas o cambios de tarjeta. Sólo afecta al worker que la atiende;
+        el resto se actualiza en su siguiente recarga periódica.
+        """
+        try:
+            user_service.refresh_employee_directory()
+            return {"success": True}, 200
+        except Exception as e:
+            return {"success": False, "message": str(e)}, 500
+
+    @settings_bp.route('/api/scan-journal', methods=['GET'])
+    def scan_journal_backlog():
+        """
+        Métrica del diario de escaneos (modo write-behind): pendientes de
+        aplicar en Postgres, rechazados y antigüedad del más viejo.
+        """
+        return {
+            "enabled": user_service.write_behind_enabled,
+            "backlog": user_service.get_scan_journal_backlog()
+        }, 200
+
+    @settings_bp.route('/api/group-commit', methods=['GET'])
+    def group_commit_stats():
+        """
+        Métrica del group commit de check-ins en este worker: lotes
+        aplicados y tamaño medio/máximo.
+        """
+        stats = user_service.get_group_commit_stats()
+        return {"enabled": stats is not None, "stats": stats}, 200
+
+    @settings_bp.route('/api/db-pool', methods=['GET'])
+    def db_pool_stats():
+        """
+        Pool de conexiones del worker que atiende la petición: tamaño,
+        conexiones en uso, overflow y espera al tomar conexión.
+        """
+        return {"pool": get_pool_stats()}, 200
+
+    @settings_bp.route('/api/photo-manifest', methods=['GET'])
+    def photo_manifest_stats():
+        """Estado del índice de fotos de empleados de este worker."""
+        stats = photo_manifest.stats() if photo_manifest is not None else None
+        return {"manifest": stats}, 200
+
+    @settings_bp.route('/api/photo-manifest/rescan', methods=['POST'])
+    def rescan_photo_manifest():
+        """
+        Relee la carpeta de fotos tras cargar o borrar fotos, sin esperar
+        a la revisión periódica. Sólo afecta al worker que la atiende.
+        """
+        if photo_manifest is None:
+            return {"success": False, "message": "Índice de fotos no disponible"}, 404
+        try:
+            return {"success": True, "manifest": photo_manifest.rescan()}, 200
+        except Exception as e:
+            return {"success": False, "message": str(e)}, 500
+
     @settings_bp.route('/verify-admin', methods=['POST'])
     def verify_admin():
         """
@@ -157,6 +276,7 @@ def create_settings_bp(user_service: UserService) -> Blueprint:
         return render_template("station_config.html")
 
     @settings_bp.route('/api/hierarchy', methods=['GET'])
+    @conditional(lambda: user_service.get_data_validator(("topology",)))
     def get_hierarchy():
         """
         Retorna la estructura jerárquica: Áreas -> Líneas -> Estaciones -> Posiciones
@@ -191,6 +311,7 @@ def create_settings_bp(user_service: UserService) -> Blueprint:
         return {"hierarchy": hierarchy}, 200
 
     @settings_bp.route('/api/stations/<int:line_id>', methods=['GET'])
+    @conditional(lambda line_id: user_service.get_data_validator(("topology", "occupancy")))
     def get_line_stations(line_id):
         """
         Retorna las estaciones asociadas a una línea.
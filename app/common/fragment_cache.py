@@ -0,0 +1,83 @@
+"""
+app/common/fragment_cache.py
+Caché LRU de HTML renderizado para dashboards y menú de estaciones (por proceso).
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+class FragmentCache:
+    """
+    Guarda el HTML ya renderizado de una vista, indexado por una clave que
+    incluye la versión de los datos con los que se renderizó.
+
+    No necesita invalidación: cuando cambia la ocupación o la topología de
+    una línea cambia su versión y, con ella, la clave. Las entradas viejas
+    dejan de pedirse y salen por LRU al llegar a `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 256, enabled: bool = True):
+        """
+        :param max_entries: Número máximo de fragmentos en memoria.
+        :param enabled: Si es False, siempre se renderiza.
+        """
+        self._max_entries = max(1, int(max_entries))
+        self._enabled = bool(enabled)
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def get_or_render(self, key: Hashable, render: Callable[[], str]) -> str:
+        """
+        Devuelve el HTML cacheado para `key` o lo genera con `render`.
+
+        :param key: Clave que debe incluir la versión de los datos.
+        :param render: Función sin argumentos que renderiza la plantilla.
+        """
+        if not self._enabled:
+            return render()
+
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return html
+            self._misses += 1
+
+        html = render()
+
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return html
+
+    def clear(self) -> None:
+        """Vacía la caché (p. ej. tras desplegar plantillas nuevas)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Contadores de aciertos/fallos/desalojos para monitoreo."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self._enabled,
+                "max_entries": self._max_entries,
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,200 @@
+"""
+app/common/occupancy_cache.py
+Caché en memoria de la ocupación de líneas y estaciones (por proceso).
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+
+class OccupancyCache:
+    """
+    Caché de lecturas de ocupación con invalidación dirigida por escrituras.
+
+    Cada entrada recuerda de qué líneas depende su valor. Los repositorios
+    de escritura llaman a `invalidate_lines` tras confirmar la transacción,
+    de modo que sólo se descartan las entradas afectadas. El TTL cubre las
+    escrituras hechas por otros workers de gunicorn, cuya caché no se
+    entera de la invalidación local.
+
+    Las claves salen de la URL (IDs de línea, área, grupo), así que se
+    conservan como mucho `max_keys`: al pasar el límite se descarta la
+    usada hace más tiempo, con su entrada y su versión.
+    """
+
+    def __init__(self, ttl_seconds: float = 15.0, enabled: bool = True, max_keys: int = 4096):
+        """
+        :param ttl_seconds: Vida máxima de una entrada, en segundos.
+        :param enabled: Si es False, todas las lecturas van directo al loader.
+        :param max_keys: Claves distintas que se conservan (LRU).
+        """
+        self._ttl = float(ttl_seconds)
+        self._enabled = bool(enabled)
+        self._max_keys = max(1, int(max_keys))
+        # key -> (expira_en, líneas de las que depende | None, valor)
+        self._entries: dict[Hashable, tuple[float, Optional[frozenset], Any]] = {}
+        self._lock = threading.RLock()
+        # Despierta a los streams SSE del mismo worker tras una invalidación
+        self._changed = threading.Condition(self._lock)
+        # Se incrementa en cada invalidación; evita guardar lecturas que
+        # empezaron antes de una escritura concurrente.
+        self._generation = 0
+        # Generación propia de la topología (líneas, posiciones, sides)
+        self._topology_generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._evictions = 0
+        # Versión de datos por clave: cambia sólo cuando el valor recargado
+        # difiere del anterior. Sobrevive a invalidaciones y TTL; su orden
+        # es el de uso (LRU) y acota también a _entries y _last_values.
+        self._versions: OrderedDict[Hashable, int] = OrderedDict()
+        self._last_values: dict[Hashable, Any] = {}
+        self._last_version = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @property
+    def topology_generation(self) -> int:
+        """Avanza con cada cambio de topología (líneas, posiciones, sides) en este worker."""
+        return self._topology_generation
+
+    def set_enabled(self, enabled: bool) -> None:
+        """Activa o desactiva la caché; al desactivarla se vacía."""
+        with self._lock:
+            self._enabled = bool(enabled)
+            if not self._enabled:
+                self._entries.clear()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any],
+                    depends_on: Optional[Callable[[Any], Iterable[int]]] = None) -> Any:
+        """
+        Devuelve el valor cacheado para `key` o lo carga con `loader`.
+
+        :param key: Clave de la entrada.
+        :param loader: Función sin argumentos que consulta la base de datos.
+        :param depends_on: Función que recibe el valor cargado y devuelve los
+                           IDs de línea de los que depende. Si es None, la
+                           entrada se invalida ante cualquier cambio.
+        :return: Una copia del valor, para que el llamador pueda mutarla.
+        """
+        return self.get_versioned(key, loader, depends_on)[1]
+
+    def get_versioned(self, key: Hashable, loader: Callable[[], Any],
+                      depends_on: Optional[Callable[[Any], Iterable[int]]] = None) -> tuple[int, Any]:
+        """
+        Igual que `get_or_load`, pero devuelve también la versión del valor.
+
+        La versión es monótona creciente dentro del proceso (milisegundos
+        desde epoch o el anterior + 1) y sólo avanza cuando el contenido
+        cambia, así que sirve como validador para respuestas delta.
+
+        :return: Tupla (versión, copia del valor).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key) if self._enabled else None
+            if entry is not None and entry[0] > now:
+                self._hits += 1
+                self._versions.move_to_end(key)
+                return self._versions[key], copy.deepcopy(entry[2])
+            if self._enabled:
+                self._misses += 1
+            generation = self._generation
+
+        value = loader()
+        line_ids = frozenset(depends_on(value)) if depends_on else None
+
+        with self._lock:
+            version = self._record_version(key, value)
+            if self._enabled and generation == self._generation:
+                self._entries[key] = (now + self._ttl, line_ids, copy.deepcopy(value))
+        return version, value
+
+    def _record_version(self, key: Hashable, value: Any) -> int:
+        """Asigna una nueva versión a `key` si su valor cambió (con el lock tomado)."""
+        if key in self._versions and self._last_values.get(key) == value:
+            self._versions.move_to_end(key)
+            return self._versions[key]
+        self._last_version = max(self._last_version + 1, int(time.time() * 1000))
+        self._versions[key] = self._last_version
+        self._versions.move_to_end(key)
+        self._last_values[key] = copy.deepcopy(value)
+        while len(self._versions) > self._max_keys:
+            evicted, _ = self._versions.popitem(last=False)
+            self._last_values.pop(evicted, None)
+            self._entries.pop(evicted, None)
+            self._evictions += 1
+        return self._last_version
+
+    def invalidate_lines(self, line_ids: Iterable[Optional[int]]) -> None:
+        """
+        Descarta las entradas que dependen de alguna de las líneas dadas.
+        Un ID None (línea desconocida) invalida toda la caché.
+        """
+        targets = set(line_ids)
+        if None in targets:
+            self.invalidate_all()
+            return
+        if not targets:
+            return
+
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            self._changed.notify_all()
+            stale = [
+                key for key, (_, deps, _) in self._entries.items()
+                if deps is None or not deps.isdisjoint(targets)
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def invalidate_all(self) -> None:
+        """Vacía la caché completa (p. ej. tras cambios de topología)."""
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            self._changed.notify_all()
+            self._entries.clear()
+
+    def invalidate_topology(self) -> None:
+        """Vacía la caché y avanza la versión de topología."""
+        with self._lock:
+            self._topology_generation += 1
+            self.invalidate_all()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def wait_for_change(self, generation: int, timeout: float) -> int:
+        """
+        Bloquea hasta que haya una invalidación posterior a `generation` o
+        venza `timeout`. Devuelve la generación actual.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self._generation != generation, timeout=timeout)
+            return self._generation
+
+    def stats(self) -> dict:
+        """Contadores de aciertos/fallos para monitoreo."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self._enabled,
+                "ttl_seconds": self._ttl,
+                "entries": len(self._entries),
+                "keys": len(self._versions),
+                "max_keys": self._max_keys,
+                "evictions": self._evictions,
+                "hits": self._hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,34 @@
+"""
+app/common/request_memo.py
+Memo de lecturas con vida de una petición (guardado en `flask.g`).
+"""
+
+from typing import Any, Callable, Hashable
+
+from flask import g, has_app_context
+
+_MEMO_ATTR = "_request_memo"
+
+
+def request_memo(key: Hashable, loader: Callable[[], Any]) -> Any:
+    """
+    Devuelve el valor memorizado para `key` en la petición actual o lo
+    carga con `loader`. Fuera de un contexto de Flask siempre llama al
+    loader, así los servicios siguen funcionando en CLI y pruebas.
+
+    :param key: Clave de la lectura (p. ej. ("scan_result", tarjeta)).
+    :param loader: Función sin argumentos que consulta la base de datos.
+    """
+    if not has_app_context():
+        return loader()
+
+    memo = g.setdefault(_MEMO_ATTR, {})
+    if key not in memo:
+        memo[key] = loader()
+    return memo[key]
+
+
+def clear_request_memo() -> None:
+    """Descarta lo memorizado en la petición (llamar tras una escritura)."""
+    if has_app_context():
+        g.pop(_MEMO_ATTR, None)
@@ -24,6 +24,28 @@ class Settings:
         f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Pool de conexiones, por worker de gunicorn. DB_MAX_CONNECTIONS es el
+    # presupuesto total de la app en Postgres y se reparte entre los workers:
+    # pool_size cubre los hilos del worker y el resto queda como overflow.
+    GUNICORN_WORKERS = int(os.getenv('GUNICORN_WORKERS', 4))
+    GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', 16))
+    DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', 80))
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 0)) or max(
+        1, min(GUNICORN_THREADS, DB_MAX_CONNECTIONS // GUNICORN_WORKERS))
+    DB_MAX_OVERFLOW = int(os.getenv(
+        'DB_MAX_OVERFLOW', max(0, DB_MAX_CONNECTIONS // GUNICORN_WORKERS - DB_POOL_SIZE)))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() in ('true', '1')
+    # Sólo aplica a Postgres (SQLite en pruebas usa su propio pool)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    } if SQLALCHEMY_DATABASE_URI.startswith('postgresql') else {}
     
     # Async URI example
     SQLALCHEMY_ASYNC_DATABASE_URI = os.getenv(
@@ -40,4 +62,58 @@ class Settings:
     # URL Prefix for deployment (e.g., /dle)
     URL_PREFIX = os.getenv('URL_PREFIX', None)
 
+    # Sentencias preparadas para las consultas calientes (desactivar detrás
+    # de PgBouncer en modo transacción)
+    PREPARED_STATEMENTS_ENABLED = os.getenv('PREPARED_STATEMENTS_ENABLED', 'True').lower() in ('true', '1')
+
+    # Caché de ocupación de dashboards (en memoria, por worker)
+    OCCUPANCY_CACHE_ENABLED = os.getenv('OCCUPANCY_CACHE_ENABLED', 'True').lower() in ('true', '1')
+    OCCUPANCY_CACHE_TTL = float(os.getenv('OCCUPANCY_CACHE_TTL', 15))
+    OCCUPANCY_CACHE_MAX_KEYS = int(os.getenv('OCCUPANCY_CACHE_MAX_KEYS', 4096))
+
+    # Caché LRU de HTML renderizado (dashboard de estaciones y menú del kiosco)
+    FRAGMENT_CACHE_ENABLED = os.getenv('FRAGMENT_CACHE_ENABLED', 'True').lower() in ('true', '1')
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.getenv('FRAGMENT_CACHE_MAX_ENTRIES', 256))
+
+    # Directorio de empleados en memoria (por worker). Cada REFRESH_SECONDS
+    # recarga los empleados anotados en employee_changes desde la consulta
+    # anterior; FULL_RELOAD_SECONDS debe ser menor que la retención de esa
+    # bitácora (un día)
+    EMPLOYEE_DIRECTORY_ENABLED = os.getenv('EMPLOYEE_DIRECTORY_ENABLED', 'True').lower() in ('true', '1')
+    EMPLOYEE_DIRECTORY_REFRESH_SECONDS = float(os.getenv('EMPLOYEE_DIRECTORY_REFRESH_SECONDS', 60))
+    EMPLOYEE_DIRECTORY_FULL_RELOAD_SECONDS = float(os.getenv('EMPLOYEE_DIRECTORY_FULL_RELOAD_SECONDS', 3600))
+
+    # Modo write-behind de escaneos: diario local SQLite (WAL) + hilo que
+    # lo aplica en Postgres. Ruta por defecto: <instance>/scan_journal.sqlite3
+    SCAN_JOURNAL_ENABLED = os.getenv('SCAN_JOURNAL_ENABLED', 'False').lower() in ('true', '1')
+    SCAN_JOURNAL_PATH = os.getenv('SCAN_JOURNAL_PATH', None)
+    SCAN_JOURNAL_BATCH_SIZE = int(os.getenv('SCAN_JOURNAL_BATCH_SIZE', 100))
+    SCAN_JOURNAL_FLUSH_SECONDS = float(os.getenv('SCAN_JOURNAL_FLUSH_SECONDS', 1))
+    # Intentos de un escaneo con error transitorio antes de pasarlo a rechazado
+    SCAN_JOURNAL_MAX_ATTEMPTS = int(os.getenv('SCAN_JOURNAL_MAX_ATTEMPTS', 20))
+    # Retención de las claves de idempotencia en Postgres; debe superar
+    # cualquier reenvío posible del diario
+    SCAN_IDEMPOTENCY_RETENTION_HOURS = float(os.getenv('SCAN_IDEMPOTENCY_RETENTION_HOURS', 168))
+    # Límite de la consulta de línea/estación en la pantalla de un escaneo en el diario
+    SCAN_JOURNAL_LOOKUP_TIMEOUT_MS = int(os.getenv('SCAN_JOURNAL_LOOKUP_TIMEOUT_MS', 300))
+
+    # Group commit: check-ins concurrentes del mismo worker en una transacción
+    GROUP_COMMIT_ENABLED = os.getenv('GROUP_COMMIT_ENABLED', 'False').lower() in ('true', '1')
+    GROUP_COMMIT_WINDOW_MS = float(os.getenv('GROUP_COMMIT_WINDOW_MS', 5))
+    GROUP_COMMIT_MAX_BATCH = int(os.getenv('GROUP_COMMIT_MAX_BATCH', 64))
+
+    # Índice en memoria de fotos de empleados (static/img/media)
+    PHOTO_MANIFEST_ENABLED = os.getenv('PHOTO_MANIFEST_ENABLED', 'True').lower() in ('true', '1')
+    PHOTO_MANIFEST_RESCAN_SECONDS = float(os.getenv('PHOTO_MANIFEST_RESCAN_SECONDS', 60))
+
+    # Versiones reducidas de las fotos (requiere Pillow; sin él se sirven las originales)
+    PHOTO_DERIVATIVES_ENABLED = os.getenv('PHOTO_DERIVATIVES_ENABLED', 'True').lower() in ('true', '1')
+    PHOTO_DERIVATIVES_DIR = os.getenv('PHOTO_DERIVATIVES_DIR')  # por defecto instance/photo_cache
+    PHOTO_DERIVATIVES_QUALITY = int(os.getenv('PHOTO_DERIVATIVES_QUALITY', 80))
+
+    # Streams SSE de dashboards
+    SSE_POLL_SECONDS = float(os.getenv('SSE_POLL_SECONDS', 5))
+    SSE_MAX_STREAM_SECONDS = int(os.getenv('SSE_MAX_STREAM_SECONDS', 300))
+    SSE_RETRY_MS = int(os.getenv('SSE_RETRY_MS', 3000))
+
 settings = Settings()
@@ -7,10 +7,18 @@ from app.infra.db.active_staff_repository_sql import ActiveStaffRepositorySQL
 from .infra.db.production_lines_repository_sql import ProductionLineRepositorySQL
 from .infra.db.register_repository_sql import RegisterRepositorySQL
 from .infra.db.user_repository_sql import UserRepositorySQL
+from .infra.db.employee_directory import EmployeeDirectory
+from .infra.db.scan_journal import ScanJournal
+from .infra.db.group_commit import GroupCommitExecutor
+from .infra.db.prepared_statements import PreparedStatementRegistry
+from .infra.media.photo_manifest import PhotoManifest
+from .infra.media.photo_derivatives import PhotoDerivatives
 from .domain.services.user_service import UserService
 from .domain.services.dashboard_service import DashboardService
 from .domain.services.active_staff_service import ActiveStaffService
 from .domain.services.station_service import StationService
+from .common.occupancy_cache import OccupancyCache
+from .common.fragment_cache import FragmentCache
 
 class Container(containers.DeclarativeContainer):
     """
@@ -26,33 +34,114 @@ class Container(containers.DeclarativeContainer):
     # Configuration provider for external settings (e.g., database schema)
     config = providers.Configuration()
 
+    # Singleton provider for the in-memory occupancy cache shared by
+    # the dashboard service (reads) and the repositories (invalidation)
+    occupancy_cache = providers.Singleton(
+        OccupancyCache,
+        ttl_seconds=config.occupancy_cache_ttl,
+        enabled=config.occupancy_cache_enabled,
+        max_keys=config.occupancy_cache_max_keys
+    )
+
+    # Singleton provider for the LRU cache of rendered station views,
+    # keyed by the occupancy versions above
+    fragment_cache = providers.Singleton(
+        FragmentCache,
+        max_entries=config.fragment_cache_max_entries,
+        enabled=config.fragment_cache_enabled
+    )
+
     # Singleton provider for the UserRepositorySQL
-    user_repo = providers.Singleton(
+    user_repo_sql = providers.Singleton(
         UserRepositorySQL,
         schema=config.db_schema
     )
 
+    # Singleton provider for the in-memory employee directory; services
+    # see it as their IUserRepository and it falls back to SQL on a miss
+    user_repo = providers.Singleton(
+        EmployeeDirectory,
+        user_repo_sql,
+        enabled=config.employee_directory_enabled,
+        refresh_seconds=config.employee_directory_refresh_seconds,
+        full_reload_seconds=config.employee_directory_full_reload_seconds
+    )
+
+    # Singleton provider for the registry of prepared hot statements,
+    # shared by the psycopg2 repositories
+    prepared_statements = providers.Singleton(
+        PreparedStatementRegistry,
+        enabled=config.prepared_statements_enabled
+    )
+
     # Singleton provider for the ProductionLineRepositorySQL
     production_line_repo = providers.Singleton(
         ProductionLineRepositorySQL, 
-        schema=config.db_schema
+        schema=config.db_schema,
+        occupancy_cache=occupancy_cache,
+        statements=prepared_statements
+    )
+
+    # Group-commit executor for concurrent check-ins; None unless
+    # config.group_commit_mode is "enabled"
+    group_commit = providers.Selector(
+        config.group_commit_mode,
+        enabled=providers.Singleton(
+            GroupCommitExecutor,
+            window_ms=config.group_commit_window_ms,
+            max_batch=config.group_commit_max_batch
+        ),
+        disabled=providers.Object(None)
     )
 
     # Singleton provider for the RegisterRepositorySQL
     register_repo = providers.Singleton(
         RegisterRepositorySQL,
-        schema=config.db_schema
+        schema=config.db_schema,
+        occupancy_cache=occupancy_cache,
+        group_commit=group_commit,
+        statements=prepared_statements
     )
 
     # Singleton provider for the MockActiveStaffRepository
     active_staff_repo = providers.Singleton(ActiveStaffRepositorySQL, config.db_schema)
 
+    # Local write-behind journal for badge scans; None unless
+    # config.scan_journal_mode is "enabled"
+    scan_journal = providers.Selector(
+        config.scan_journal_mode,
+        enabled=providers.Singleton(
+            ScanJournal,
+            path=config.scan_journal_path,
+            max_attempts=config.scan_journal_max_attempts
+        ),
+        disabled=providers.Object(None)
+    )
+
+    # Singleton provider for the in-memory index of employee photos
+    photo_manifest = providers.Singleton(
+        PhotoManifest,
+        directory=config.photo_media_dir,
+        enabled=config.photo_manifest_enabled,
+        rescan_seconds=config.photo_manifest_rescan_seconds
+    )
+
+    # Singleton provider for the resized photo derivatives served to kiosks
+    photo_derivatives = providers.Singleton(
+        PhotoDerivatives,
+        source_dir=config.photo_media_dir,
+        cache_dir=config.photo_derivatives_dir,
+        enabled=config.photo_derivatives_enabled,
+        quality=config.photo_derivatives_quality
+    )
+
     # Singleton provider for the UserService
     user_service = providers.Singleton(
         UserService, 
         user_repo,
         production_line_repo,
-        register_repo
+        register_repo,
+        scan_journal
     )
 
     # Singleton provider for the ProductionLinesService
@@ -60,10 +149,14 @@ class Container(containers.DeclarativeContainer):
                                                    production_line_repo)
 
     # Singleton provider for the DashboardService
-    dashboard_service = providers.Singleton(DashboardService, user_repo, production_line_repo)
+    dashboard_service = providers.Singleton(DashboardService, user_repo, production_line_repo,
+                                            occupancy_cache, fragment_cache)
 
     # Singleton provider for the StationService
-    station_service = providers.Singleton(StationService, user_repo, register_repo)
+    station_service = providers.Singleton(
+        StationService, user_repo, register_repo,
+        side_lookup_timeout_ms=config.scan_journal_lookup_timeout_ms
+    )
 
     # Singleton provider for the ActiveStaffService
     active_staff_service = providers.Singleton(
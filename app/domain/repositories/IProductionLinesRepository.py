@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Sequence
 
 class IProductionLinesRepository(ABC):
     """Interfaz para el repositorio de líneas de producción y estaciones."""
@@ -14,16 +14,40 @@ class IProductionLinesRepository(ABC):
         """Obtiene un resumen de todas las líneas con sus operadores y capacidad."""
         pass
 
+    @abstractmethod
+    def get_area_rollups(self) -> list[dict]:
+        """Obtiene la ocupación agregada por área, con el total de planta al final."""
+        pass
+
+    @abstractmethod
+    def get_lines_summary_for_area(self, area_id: int) -> list[dict]:
+        """Obtiene el resumen de operadores y capacidad de las líneas de un área."""
+        pass
+
     @abstractmethod
     def get_station_cards_for_line(self, line_id: int) -> List[Dict[str, Any]]:
         """Obtiene los datos estructurados para las tarjetas de estaciones de una línea."""
         pass
 
+    @abstractmethod
+    def get_data_validator(self, scopes: Sequence[str]) -> Optional[tuple[str, float]]:
+        """
+        Obtiene (etag, epoch de modificación) de los datos de los ámbitos
+        indicados ('occupancy', 'topology', 'employees'), o None si no hay.
+        """
+        pass
+
     @abstractmethod
     def get_active_operators(self, station_id: int) -> list:
         """Obtiene una lista de operadores activos en una estación específica."""
         pass
 
+    @abstractmethod
+    def get_active_operators_by_side(self, side_ids: Optional[List[int]] = None,
+                                     line_id: Optional[int] = None) -> Dict[int, list]:
+        """Obtiene los operadores activos de varios sides (o de una línea), agrupados por side."""
+        pass
+
     @abstractmethod
     def get_line_name_by_id(self, line_id: int) -> Optional[str]:
         """Obtiene el nombre completo de una línea dado su ID."""
@@ -42,6 +66,14 @@ class IProductionLinesRepository(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_group_machine_occupancy(self, group_name: str) -> list[dict]:
+        """
+        Obtiene las máquinas visibles de un grupo (Inyección, Metalizado) con
+        su capacidad y operadores activos en una sola consulta.
+        """
+        pass
+
     @abstractmethod
     def update_position_status(self, position_id: int, is_true: bool) -> None:
         """Actualiza o inserta el estado (visible/no visible) de una posición."""
@@ -16,11 +16,69 @@ class IRegisterRepository(ABC):
         pass
 
     @abstractmethod
-    def register_entry_or_assignment(self, user_id: int, side_id: int) -> None:
+    def get_scan_result(self, card_number: int) -> dict:
+        """
+        Obtiene en una sola consulta el empleado, el tipo de su último
+        registro y la línea/estación de ese registro.
+        """
+        pass
+
+    @abstractmethod
+    def register_entry_or_assignment(self, user_id: int, side_id: int) -> Optional[int]:
         """
         Persiste el registro de entrada/asignación para un usuario.
         Cierra registro abierto si existe, o crea uno nuevo.
+        Devuelve el ID del nuevo registro (None si sólo hubo salida).
+        """
+        pass
+
+    @abstractmethod
+    def apply_scans(self, scans: list[dict]) -> list[dict]:
+        """
+        Aplica en orden un lote de escaneos diferidos (modo write-behind),
+        omitiendo los que ya se aplicaron según su clave de idempotencia.
+        """
+        pass
+
+    @abstractmethod
+    def purge_scan_idempotency(self, retention_seconds: float, batch_size: int = 5000) -> int:
+        """
+        Borra las claves de idempotencia más viejas que la ventana de
+        retención. Devuelve cuántas borró.
+        """
+        pass
+
+    @abstractmethod
+    def get_side_location(self, side_id: int, timeout_ms: Optional[int] = None) -> Optional[dict]:
+        """Obtiene la línea y estación de un side (con límite de tiempo opcional)."""
+        pass
+
+    @abstractmethod
+    def logout_active_users_bulk(self, line_ids: Optional[list[int]] = None,
+                                 business_unit: Optional[str] = None) -> dict[int, int]:
+        """
+        Cierra los registros abiertos de varias líneas (o de toda una unidad
+        de negocio) en una sola operación. Devuelve los cerrados por línea.
         """
         pass
 
+    @abstractmethod
+    def rebuild_presence(self) -> int:
+        """
+        Reconstruye la proyección de presencia actual desde los registros.
+        Devuelve el número de empleados presentes.
+        """
+        pass
+
+    @abstractmethod
+    def reconcile_side_occupancy(self) -> int:
+        """
+        Corrige los contadores de ocupación por side que no coincidan con la
+        presencia actual. Devuelve el número de sides corregidos.
+        """
+        pass
 
+    @abstractmethod
+    def get_group_commit_stats(self) -> Optional[dict]:
+        """Estadísticas de agrupación de check-ins; None si está desactivada."""
+        pass
@@ -1,104 +1,373 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Optional, Sequence
+from app.common.fragment_cache import FragmentCache
+from app.common.occupancy_cache import OccupancyCache
 from app.domain.repositories.IUserRepository import IUserRepository
 from app.domain.repositories.IProductionLinesRepository import IProductionLinesRepository
 
 class DashboardService:
-    def __init__(self, user_repo: IUserRepository, production_line_repo: IProductionLinesRepository):
+    def __init__(self, user_repo: IUserRepository, production_line_repo: IProductionLinesRepository,
+                 occupancy_cache: Optional[OccupancyCache] = None,
+                 fragment_cache: Optional[FragmentCache] = None):
         self._user_repo = user_repo
         self._production_line_repo = production_line_repo
+        # Sin caché inyectada se comporta como antes (consulta directa)
+        self._occupancy_cache = occupancy_cache or OccupancyCache(enabled=False)
+        self._fragment_cache = fragment_cache or FragmentCache(enabled=False)
+        # line_id -> deque[(versión, {side_id: employees_working})] para
+        # deltas, en orden de uso (LRU) y sólo para líneas con tarjetas
+        self._cards_history: OrderedDict[int, deque] = OrderedDict()
+        self._history_lock = threading.Lock()
+
+    # Versiones recientes que se conservan por línea para responder `since`
+    CARDS_HISTORY_SIZE = 32
+    # Líneas con historial; la menos consultada se descarta al pasar el límite
+    CARDS_HISTORY_LINES = 256
+
+    # --- Lecturas cacheadas ---
+    def _cached_lines_summary(self) -> list[dict]:
+        return self._occupancy_cache.get_or_load(
+            ("lines_summary",),
+            self._production_line_repo.get_all_lines_summary,
+            depends_on=lambda rows: [row["id"] for row in rows]
+        )
+
+    def _cached_station_cards(self, line_id: int) -> list[dict]:
+        return self._versioned_station_cards(line_id)[1]
+
+    def _versioned_station_cards(self, line_id: int) -> tuple[int, list[dict]]:
+        return self._occupancy_cache.get_versioned(
+            ("station_cards", line_id),
+            lambda: self._production_line_repo.get_station_cards_for_line(line_id),
+            depends_on=lambda _: [line_id]
+        )
+
+    def _versioned_line_name(self, line_id: int) -> tuple[int, Optional[str]]:
+        return self._occupancy_cache.get_versioned(
+            ("line_name", line_id),
+            lambda: self._production_line_repo.get_line_name_by_id(line_id),
+            depends_on=lambda _: [line_id]
+        )
+
+    def _versioned_group_machines(self, group_name: str) -> tuple[int, list[dict]]:
+        return self._occupancy_cache.get_versioned(
+            ("group_machines", group_name),
+            lambda: self._production_line_repo.get_group_machine_occupancy(group_name),
+            depends_on=lambda rows: [row["id"] for row in rows]
+        )
+
+    def get_cache_stats(self) -> dict:
+        """Expone los contadores de la caché de ocupación y de fragmentos."""
+        stats = self._occupancy_cache.stats()
+        stats["fragments"] = self._fragment_cache.stats()
+        return stats
+
+    @staticmethod
+    def _decorate_line(line: dict) -> dict:
+        """Añade porcentaje y clase CSS a un resumen de línea."""
+        operators = line.get('operators', 0) or 0
+        capacity = line.get('capacity', 0) or 0
+
+        # Calcula el porcentaje (evita la división por cero si la capacidad es 0)
+        percentage = round((operators / capacity) * 100) if capacity > 0 else 0
+        line['percentage'] = percentage
+
+        if percentage < 99:
+            line['class'] = 'employee-nook'  # Amarillo
+        elif percentage > 100:
+            line['class'] = 'employee-warning'  # Rojo
+        else:
+            line['class'] = 'employee-ok'  # Verde
+        return line
 
     def get_lines_summary(self) -> list[dict]:
         """Prepara el resumen de todas las líneas, incluyendo el porcentaje."""
+        return [self._decorate_line(line) for line in self._cached_lines_summary()]
 
-        # 1. Obtiene los datos base del repositorio de líneas
-        lines_from_repo = self._production_line_repo.get_all_lines_summary()
+    def get_lines_summary_for_area(self, area_id: int) -> list[dict]:
+        """Resumen (con porcentaje) de las líneas de un área, consultado sólo para ese área."""
+        lines = self._occupancy_cache.get_or_load(
+            ("area_lines", area_id),
+            lambda: self._production_line_repo.get_lines_summary_for_area(area_id),
+            depends_on=lambda rows: [row["id"] for row in rows]
+        )
+        return [self._decorate_line(line) for line in lines]
 
-        processed_lines = []
-        for line in lines_from_repo:
-            operators = line.get('operators', 0)
-            capacity = line.get('capacity', 0) or 0
+    def get_areas_summary(self) -> dict:
+        """
+        Tarjetas de área para el dashboard principal, agregadas en SQL.
 
-            # 2. Calcula el porcentaje
-            if capacity > 0:
-                percentage = round((operators / capacity) * 100)
-            else:
-                percentage = 0  # Evita la división por cero si la capacidad es 0
+        :return: {"areas": [...], "plant": {...}} con porcentaje y clase CSS.
+        """
+        rollups = self._occupancy_cache.get_or_load(
+            ("area_rollups",),
+            self._production_line_repo.get_area_rollups
+        )
 
-            # 3. Añade el porcentaje y otros datos al nuevo diccionario
-            line['percentage'] = percentage
+        areas, plant = [], None
+        for row in rollups:
+            capacity = row.get('capacity') or 0
+            operators = row.get('operators') or 0
+            pct = round((operators / capacity) * 100) if capacity > 0 else 0
 
-            # (Opcional) Puedes añadir la lógica para la clase CSS aquí también
-            if percentage < 99:
-                line['class'] = 'employee-nook'  # Amarillo
-            elif percentage > 100:
-                line['class'] = 'employee-warning'  # Rojo
-            else:
-                line['class'] = 'employee-ok'  # Verde
+            status_class = "employee-ok"
+            if pct < 90:  # Umbral ejemplo
+                status_class = "employee-nook"
+            elif pct > 100:
+                status_class = "employee-warning"
 
-            processed_lines.append(line)
+            summary = {
+                "name": row.get('area'),
+                "id": row.get('area_id'),
+                "percentage": pct,
+                "class": status_class,
+                "lines_count": row.get('lines_count'),
+                "operators": operators,
+                "capacity": capacity
+            }
+            if row.get('area_id') is None:
+                plant = summary
+            else:
+                areas.append(summary)
 
-        return processed_lines
+        return {"areas": areas, "plant": plant}
 
     def get_station_details_for_line(self, line_id: int) -> dict:
         """
         Prepara los detalles de las estaciones para una línea o grupo específico.
         """
+        return self._versioned_station_details(line_id)[1]
+
+    def _versioned_station_details(self, line_id: int) -> tuple[tuple, dict]:
+        """
+        Detalles de estaciones junto con la versión de los datos de los que
+        salen (ocupación y topología de la línea o del grupo).
+        """
         if line_id < 0:
             # Logic for Groups (Inyección=-1, Metalizado=-2)
             group_name = "Inyección" if line_id == -1 else "Metalizado" if line_id == -2 else ""
             
-            # Fetch config status
-            lines_status = self._production_line_repo.get_lines_with_position_status(group_name)
-            # Fetch operational data
-            lines_summary = self._production_line_repo.get_all_lines_summary()
-            
-            # Map summary by ID
-            summary_map = {l['id']: l for l in lines_summary}
-            
+            # Máquinas visibles del grupo con capacidad y operadores, en una consulta
+            version, machines = self._versioned_group_machines(group_name)
+
             cards = []
-            for l in lines_status:
-                if l['is_visible']: # Only show enabled lines
-                    # Restore summ definition for operators check
-                    lid = l['id']
-                    summ = summary_map.get(lid, {})
-                    
-                    # Use retrieved side_id and capacity (which might have been auto-created)
-                    real_side_id = l.get('side_id')
-                    real_capacity = l.get('capacity') or 0
-                    operators = summ.get('operators') or 0 # Ops still come from summary until we link registers properly
-                    
-                    cards.append({
-                        "position_name": l['name'],
-                        "status": True,
-                        "sides": [{
-                            "side_id": real_side_id, 
-                            "side_title": "BP", 
-                            "name_side": "BP",
-                            "employee_capacity": real_capacity,
-                            "employees_working": operators
-                        }], 
-                        "is_afe": "afe" in l['name'].lower()
-                    })
-            
-            return {
+            for m in machines:
+                cards.append({
+                    "position_name": m['name'],
+                    "status": True,
+                    "sides": [{
+                        "side_id": m.get('side_id'),
+                        "side_title": "BP",
+                        "name_side": "BP",
+                        "employee_capacity": m.get('capacity') or 0,
+                        "employees_working": m.get('operators') or 0
+                    }],
+                    "is_afe": "afe" in m['name'].lower()
+                })
+
+            return (version,), {
                 "line": group_name,
                 "cards": cards,
                 "tipo": "Inyectora" if line_id == -1 else "Metalizadora"
             }
 
         # Original Logic
-        cards = self._production_line_repo.get_station_cards_for_line(line_id)
-        line_name = self._production_line_repo.get_line_name_by_id(line_id)
+        cards_version, cards = self._versioned_station_cards(line_id)
+        name_version, line_name = self._versioned_line_name(line_id)
 
-        return {
+        return (cards_version, name_version), {
             "line": line_name,
             "cards": cards,
             "tipo": self._get_station_type_from_line(line_id)
         }
 
+    def render_station_view(self, view: str, line_id: int,
+                            render: Callable[[dict], str]) -> str:
+        """
+        Devuelve el HTML de una vista de estaciones (`view`: dashboard o
+        menú del kiosco) desde la caché de fragmentos. `render` recibe los
+        detalles de la línea y sólo se llama si su versión no está cacheada.
+        """
+        version, details = self._versioned_station_details(line_id)
+        return self._fragment_cache.get_or_render(
+            (view, line_id, version),
+            lambda: render(details)
+        )
+
+    # --- Snapshots de ocupación (stream SSE) ---
+    @staticmethod
+    def side_status_class(capacity: int, working: int) -> str:
+        """Clase CSS de un side según capacidad y personal activo."""
+        if working < capacity:
+            return "employee-nook"      # amarillo (falta personal)
+        if working == capacity:
+            return "employee-ok"        # verde (justo)
+        return "employee-warning"       # rojo (exceso)
+
+    @staticmethod
+    def compute_totals(cards: list[dict]) -> dict:
+        """Totales de capacidad/activos de las tarjetas visibles, con porcentajes."""
+        total_capacity, total_active = 0, 0
+        for card in cards:
+            if card.get('status', True) is False:
+                continue
+            for side in card.get('sides', []):
+                total_capacity += int(side.get('employee_capacity') or 0)
+                total_active += int(side.get('employees_working') or 0)
+
+        if total_capacity > 0:
+            pct_active = round((total_active / total_capacity) * 100)
+            overflow = max(total_active - total_capacity, 0)
+            overflow_pct = round((overflow / total_capacity) * 100) if overflow else 0
+            pct_active_clamped = min(100, pct_active)
+        else:
+            pct_active_clamped, overflow_pct = 0, 0
+
+        return {
+            'capacity': total_capacity,
+            'active': total_active,
+            'pct_active': pct_active_clamped,
+            'overflow_pct': overflow_pct,
+        }
+
+    def get_line_occupancy_snapshot(self, line_id: int) -> dict:
+        """
+        Estado compacto de una línea (o grupo) para el stream de estaciones:
+        ocupación por side más los totales de la línea.
+        """
+        cards = self.get_station_details_for_line(line_id).get('cards') or []
+        sides = {}
+        for card in cards:
+            for side in card.get('sides', []):
+                if side.get('side_id') is None:
+                    continue
+                cap = int(side.get('employee_capacity') or 0)
+                act = int(side.get('employees_working') or 0)
+                sides[side['side_id']] = {
+                    "side_id": side['side_id'],
+                    "employee_capacity": cap,
+                    "employees_working": act,
+                    "class": self.side_status_class(cap, act)
+                }
+        return {"sides": sides, "totals": self.compute_totals(cards)}
+
+    def get_area_occupancy_snapshot(self, area_id: int) -> dict:
+        """Estado compacto de las líneas de un área para el stream de área."""
+        lines = {}
+        for line in self.get_lines_summary_for_area(area_id):
+            lines[line['id']] = {
+                "id": line['id'],
+                "operators": line.get('operators') or 0,
+                "capacity": line.get('capacity') or 0,
+                "percentage": line.get('percentage'),
+                "class": line.get('class')
+            }
+        return {"lines": lines}
+
+    @staticmethod
+    def diff_snapshots(previous: dict, current: dict) -> dict:
+        """
+        Diferencia entre dos snapshots. Las secciones indexadas por ID
+        (sides, lines) devuelven sólo las entradas que cambiaron; las
+        secciones planas (totals) se envían completas si cambiaron.
+        """
+        diff = {}
+        for section, value in current.items():
+            before = previous.get(section)
+            if value == before:
+                continue
+            if value and all(isinstance(v, dict) for v in value.values()):
+                before = before or {}
+                changed = [entry for key, entry in value.items() if before.get(key) != entry]
+                if changed:
+                    diff[section] = changed
+            else:
+                diff[section] = value
+        return diff
+
+    def get_data_validator(self, scopes: Sequence[str]) -> Optional[tuple[str, float]]:
+        """
+        (etag, epoch) de los datos de los ámbitos indicados, compartido por
+        todos los workers; no pasa por la caché de ocupación.
+        """
+        return self._production_line_repo.get_data_validator(scopes)
+
+    def get_change_generation(self) -> int:
+        """Generación actual de invalidaciones de la caché de ocupación."""
+        return self._occupancy_cache.generation
+
+    def wait_for_occupancy_change(self, generation: int, timeout: float) -> int:
+        """Espera una invalidación local (o el timeout) y devuelve la generación."""
+        return self._occupancy_cache.wait_for_change(generation, timeout)
+
+    # --- API delta versionada ---
+    @staticmethod
+    def _working_by_side(cards: list[dict]) -> dict:
+        return {
+            side['side_id']: side.get('employees_working')
+            for card in cards for side in card.get('sides', [])
+        }
+
+    def get_station_cards_delta(self, line_id: int, since: Optional[int] = None) -> Optional[dict]:
+        """
+        Tarjetas de estación de una línea con su versión de ocupación.
+
+        :param line_id: ID de la línea.
+        :param since: Versión que ya tiene el cliente.
+        :return: None si `since` es la versión actual (nada cambió).
+                 Si `since` está en el historial reciente del worker, sólo los
+                 sides cuyo `employees_working` cambió (`full: False`).
+                 En cualquier otro caso (sin `since`, versión desconocida u
+                 otro worker, cambio de topología) el árbol completo.
+        """
+        version, cards = self._versioned_station_cards(line_id)
+        working = self._working_by_side(cards)
+
+        previous = None
+        # Un line_id sin tarjetas (inexistente) no ocupa historial
+        if cards:
+            with self._history_lock:
+                history = self._cards_history.get(line_id)
+                if history is None:
+                    history = self._cards_history[line_id] = deque(maxlen=self.CARDS_HISTORY_SIZE)
+                    while len(self._cards_history) > self.CARDS_HISTORY_LINES:
+                        self._cards_history.popitem(last=False)
+                self._cards_history.move_to_end(line_id)
+                if not history or history[-1][0] != version:
+                    history.append((version, working))
+                previous = next((w for v, w in history if v == since), None) if since else None
+
+        if since == version:
+            return None
+
+        if previous is None or previous.keys() != working.keys():
+            return {"line_id": line_id, "version": version, "full": True, "cards": cards}
+
+        changed = [
+            dict(side, position_id=card.get('position_id'), position_name=card.get('position_name'))
+            for card in cards for side in card.get('sides', [])
+            if previous.get(side['side_id']) != side.get('employees_working')
+        ]
+        return {"line_id": line_id, "version": version, "full": False, "sides": changed}
+
     def get_active_operators_for_station(self, station_id: int) -> list:
         """Obtiene los operadores activos para una estación."""
         return self._production_line_repo.get_active_operators(station_id)
 
+    def get_active_operators_by_side(self, side_ids: Optional[list[int]] = None,
+                                     line_id: Optional[int] = None) -> dict:
+        """
+        Obtiene los operadores activos de varios sides en una sola consulta,
+        para que el dashboard precargue los modales de toda la página.
+        Los grupos (IDs negativos) no son líneas reales: se consultan por side.
+        """
+        if line_id is not None and line_id > 0:
+            return self._production_line_repo.get_active_operators_by_side(line_id=line_id)
+        if not side_ids:
+            return {}
+        return self._production_line_repo.get_active_operators_by_side(side_ids=side_ids)
+
     def _get_station_type_from_line(self, line_id: int) -> str:
         """Determina el nombre del tipo de estación basado en la línea."""
         if line_id == 6:
@@ -1,3 +1,4 @@
+from app.common.request_memo import request_memo
 from app.domain.repositories.IUserRepository import IUserRepository
 from app.domain.repositories.IRegisterRepository import IRegisterRepository
 
@@ -7,15 +8,19 @@ class StationService:
     Depende de las abstracciones IUserRepository e IRegisterRepository (DIP).
     """
 
-    def __init__(self, user_repo: IUserRepository, register_repo: IRegisterRepository):
+    def __init__(self, user_repo: IUserRepository, register_repo: IRegisterRepository,
+                 side_lookup_timeout_ms: int = 300):
         """
         Inicializa el servicio de estaciones con los repositorios necesarios.
 
         :param user_repo: Implementación de IUserRepository.
         :param register_repo: Implementación de IRegisterRepository.
+        :param side_lookup_timeout_ms: Tiempo máximo de la consulta de ubicación
+                                       en la pantalla de un escaneo en el diario.
         """
         self._user_repo = user_repo
         self._register_repo = register_repo
+        self._side_lookup_timeout_ms = side_lookup_timeout_ms
 
     def get_user_status_for_display(self, card_number: int):
         """
@@ -58,3 +63,64 @@ class StationService:
             "color": "employee-warning", "image": user_id_str if user else None,
             "line_name": line_name, "station_name": station_name
         }
+
+    def get_scan_result(self, card_number: int) -> dict:
+        """
+        Prepara la pantalla de resultado de un escaneo con una sola consulta.
+
+        Reemplaza la combinación de `UserService.get_user_info_for_display` y
+        `get_user_status_for_display` (cuatro lecturas del mismo empleado).
+        Se memoriza durante la petición: lecturas repetidas no vuelven a la
+        base de datos.
+
+        :param card_number: Número de tarjeta del usuario.
+        :return: Diccionario con `user`, `user_id`, `type`, `color`, `image`,
+                 `line_name` y `station_name`.
+        """
+        raw = request_memo(("scan_result", card_number),
+                           lambda: self._register_repo.get_scan_result(card_number))
+
+        registered = raw.get("user_id") is not None
+        is_entry = raw.get("register_type") == "Exit"
+        return {
+            "user": f"{raw['name']} {raw['last_name']}" if registered else "Usuario aún no registrado",
+            "user_id": raw.get("user_id"),
+            "type": "Entrada" if is_entry else "Salida",
+            "color": "employee-ok" if is_entry else "employee-warning",
+            "image": f"{raw['user_id']}.png" if registered else None,
+            "line_name": raw.get("line_name") or "Línea desconocida",
+            "station_name": raw.get("station_name") or "Estación desconocida",
+        }
+
+    def get_pending_scan_result(self, card_number: int, side_id: int = 0) -> dict:
+        """
+        Pantalla de resultado para un escaneo aceptado en el diario local
+        (modo write-behind) que aún no llega a Postgres: el tipo se deduce
+        del escaneo en lugar de leer el último registro.
+
+        :param card_number: Número de tarjeta del usuario.
+        :param side_id: Side escaneado (0 = salida).
+        :return: Mismas claves que `get_scan_result`.
+        """
+        user = self._user_repo.find_user_by_card_number(card_number)
+        location = None
+        if side_id > 0:
+            try:
+                # Sides ya vistos salen de memoria; si no, la consulta tiene
+                # un límite corto para no colgar la pantalla si Postgres se atasca
+                location = self._register_repo.get_side_location(
+                    side_id, timeout_ms=self._side_lookup_timeout_ms)
+            except Exception:
+                # Postgres no disponible o lento: el escaneo ya está a salvo en el diario
+                location = None
+
+        is_entry = side_id > 0
+        return {
+            "user": user.full_name if user else "Usuario aún no registrado",
+            "user_id": user.id if user else None,
+            "type": "Entrada" if is_entry else "Salida",
+            "color": "employee-ok" if is_entry else "employee-warning",
+            "image": f"{user.id}.png" if user else None,
+            "line_name": (location or {}).get("line_name") or "Línea desconocida",
+            "station_name": (location or {}).get("station_name") or "Estación desconocida",
+        }
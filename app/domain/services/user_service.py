@@ -3,10 +3,20 @@ src/domain/services/user_service.py
 Servicio para la lógica de negocio relacionada con usuarios.
 """
 
+from app.common.request_memo import clear_request_memo, request_memo
+from app.domain.entities.user import User
 from app.domain.repositories.IUserRepository import IUserRepository
 from app.domain.repositories.IProductionLinesRepository import IProductionLinesRepository
 from app.domain.repositories.IRegisterRepository import IRegisterRepository
-from typing import Optional
+from typing import Optional, Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.infra.db.scan_journal import ScanJournal
+
+# Rangos de las columnas destino: registers.id_employee (BIGINT) y
+# tbl_sides_of_positions.side_id (INTEGER)
+_MAX_EMPLOYEE_NUMBER = 2 ** 63 - 1
+_MAX_SIDE_ID = 2 ** 31 - 1
 
 class UserService:
     """
@@ -20,17 +30,22 @@ class UserService:
 
     def __init__(self, user_repo: IUserRepository, 
                  production_line_repo: IProductionLinesRepository,
-                 register_repo: IRegisterRepository):
+                 register_repo: IRegisterRepository,
+                 scan_journal: Optional["ScanJournal"] = None):
         """
         Inicializa el servicio con un repositorio de usuarios.
 
         :param user_repo: Instancia de un repositorio que implementa la interfaz
                           IUserRepository, utilizada para acceder a los datos
                           relacionados con usuarios.
+        :param scan_journal: Diario local de escaneos. Si se proporciona, los
+                             escaneos se aceptan en el diario (write-behind)
+                             y un hilo los aplica después en Postgres.
         """
         self._user_repo = user_repo
         self._production_line_repo = production_line_repo
         self._register_repo = register_repo
+        self._scan_journal = scan_journal
 
     def get_user_info_for_display(self, card_number: int) -> dict:
         """
@@ -46,6 +61,39 @@ class UserService:
 
         return {'name': user.full_name, 'id': user.id}
 
+    def get_by_id(self, user_id: int) -> Optional[User]:
+        """
+        Obtiene un usuario por su id_empleado (usado por el user_loader de Flask-Login).
+
+        :param user_id: ID primario del empleado.
+        :return: La entidad User, o None si no existe.
+        """
+        return self._user_repo.find_by_id(user_id)
+
+    def get_employee_directory_stats(self) -> Optional[dict]:
+        """
+        Tamaño, memoria estimada y aciertos del directorio de empleados en
+        memoria de este worker. None si el repositorio no es un directorio.
+        """
+        stats = getattr(self._user_repo, "stats", None)
+        return stats() if stats else None
+
+    def refresh_employee_directory(self) -> None:
+        """Fuerza la recarga completa del directorio tras cambios en la plantilla de personal."""
+        invalidate = getattr(self._user_repo, "invalidate", None)
+        if invalidate:
+            invalidate()
+
+    def get_scan_journal_backlog(self) -> Optional[dict]:
+        """Pendientes y antigüedad del diario de escaneos; None si el modo write-behind está apagado."""
+        if self._scan_journal is None:
+            return None
+        return self._scan_journal.backlog()
+
+    def get_group_commit_stats(self) -> Optional[dict]:
+        """Lotes aplicados por el group commit del worker; None si está apagado."""
+        return self._register_repo.get_group_commit_stats()
+
     def get_all_lines_for_settings(self) -> list[dict]:
         """
         Obtiene la lista de líneas para mostrar en la página de configuración.
@@ -61,19 +109,49 @@ class UserService:
         :param card_number: Número de tarjeta del usuario.
         :return: El tipo del último registro como cadena, o None si no hay registros.
         """
-        return self._register_repo.get_last_register_type(card_number)
+        return request_memo(("last_register_type", card_number),
+                            lambda: self._register_repo.get_last_register_type(card_number))
+
+    @property
+    def write_behind_enabled(self) -> bool:
+        """Indica si los escaneos se aceptan en el diario local (write-behind)."""
+        return self._scan_journal is not None
 
     def register_entry_or_assignment(self, employee_number: int,
-                                     side_id: int = 0) -> None:
+                                     side_id: int = 0,
+                                     idempotency_key: Optional[str] = None) -> Optional[int]:
         """
         Registra la entrada o asignación del operador en la estación/side indicado.
 
+        En modo write-behind el escaneo se guarda en el diario local y se
+        confirma de inmediato; el ID del registro aún no existe.
+
         :param employee_number: Número de empleado asociado al usuario.
         :param side_id: Identificador de la estación o side donde se registra la entrada.
-        :raises ValueError: Si el empleado no es encontrado en el repositorio.
+        :param idempotency_key: Clave del escaneo (write-behind); reenvíos con
+                                la misma clave no se duplican.
+        :return: ID del nuevo registro, o None si sólo se cerró el registro
+                 abierto o si el escaneo quedó en el diario.
+        :raises ValueError: Si el empleado no es encontrado en el repositorio,
+                            o si el número de empleado o el side están
+                            fuera de rango (no llegan al diario ni a Postgres).
         """
-        self._register_repo.register_entry_or_assignment(user_id=employee_number,
-                                                         side_id=side_id)
+        side_id = side_id or 0
+        if not 0 < employee_number <= _MAX_EMPLOYEE_NUMBER:
+            raise ValueError(f"Número de empleado fuera de rango: {employee_number}")
+        if not 0 <= side_id <= _MAX_SIDE_ID:
+            raise ValueError(f"Side fuera de rango: {side_id}")
+
+        if self._scan_journal is not None:
+            self._scan_journal.append(employee_number, side_id, idempotency_key)
+            clear_request_memo()
+            return None
+
+        new_id = self._register_repo.register_entry_or_assignment(user_id=employee_number,
+                                                                  side_id=side_id)
+        # Lo memorizado antes de la escritura ya no es válido
+        clear_request_memo()
+        return new_id
 
     def get_line_name_by_id(self, line_int: int) -> Optional[str]:
         return self._production_line_repo.get_line_name_by_id(line_int)
@@ -83,6 +161,20 @@ class UserService:
     def update_position_status(self, position_id: int, is_true: bool) -> None:
         self._production_line_repo.update_position_status(position_id, is_true)
 
+    # Áreas donde cada línea es una máquina con una posición y un side por defecto
+    DEFAULT_PROVISIONED_GROUPS = ("Inyección", "Metalizado")
+
+    def provision_missing_defaults(self, group_names: Optional[list[str]] = None) -> dict:
+        """
+        Crea de una vez las posiciones y sides por defecto que falten.
+
+        :param group_names: Unidades de negocio a revisar; por defecto
+                            Inyección y Metalizado.
+        :return: Conteo de posiciones y sides creados.
+        """
+        groups = list(group_names or self.DEFAULT_PROVISIONED_GROUPS)
+        return self._production_line_repo.provision_missing_defaults(groups)
+
     def perform_line_logout(self, line_id: int) -> int:
         """
         Realiza la salida general de todo el personal activo en una línea.
@@ -91,6 +183,34 @@ class UserService:
         """
         return self._register_repo.logout_active_users_in_line(line_id)
 
+    def perform_bulk_logout(self, line_ids: Optional[list[int]] = None,
+                            business_unit: Optional[str] = None) -> dict[int, int]:
+        """
+        Realiza la salida general de varias líneas o de un área completa.
+        :param line_ids: IDs de las líneas.
+        :param business_unit: Unidad de negocio cuyas líneas se cierran.
+        :return: Número de registros actualizados por línea.
+        """
+        return self._register_repo.logout_active_users_bulk(line_ids, business_unit)
+
+    def rebuild_presence(self) -> int:
+        """
+        Reconstruye la presencia actual (quién está dónde) desde los registros.
+        :return: Número de empleados presentes.
+        """
+        return self._register_repo.rebuild_presence()
+
+    def reconcile_side_occupancy(self) -> int:
+        """
+        Repara los contadores de ocupación por side desviados.
+        :return: Número de sides corregidos.
+        """
+        return self._register_repo.reconcile_side_occupancy()
+
+    def get_data_validator(self, scopes: Sequence[str]) -> Optional[tuple[str, float]]:
+        """(etag, epoch) de los datos de los ámbitos indicados, para respuestas condicionales."""
+        return self._production_line_repo.get_data_validator(scopes)
+
     def get_station_cards_for_line(self, line_id: int) -> list[dict]:
         return self._production_line_repo.get_station_cards_for_line(line_id)
 
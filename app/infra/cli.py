@@ -0,0 +1,61 @@
+"""
+app/infra/cli.py
+Comandos de Flask CLI (`flask <comando>`) para tareas de operación.
+"""
+
+import click
+from flask import Flask
+
+from app.containers import Container
+
+
+def register_cli(app: Flask, container: Container) -> None:
+    """
+    Registra los comandos de mantenimiento en la aplicación.
+
+    Args:
+        app (Flask): La instancia de la aplicación Flask.
+        container (Container): Contenedor de dependencias ya configurado.
+    """
+
+    @app.cli.command("provision-defaults")
+    @click.option("--group", "groups", multiple=True,
+                  help="Unidad de negocio a revisar (repetible). "
+                       "Por defecto: Inyección y Metalizado.")
+    def provision_defaults(groups):
+        """Crea en bloque las posiciones y sides por defecto que falten."""
+        created = container.user_service().provision_missing_defaults(list(groups) or None)
+        click.echo(
+            f"Posiciones creadas: {created['positions_created']}, "
+            f"sides creados: {created['sides_created']}"
+        )
+
+    @app.cli.command("presence-rebuild")
+    def presence_rebuild():
+        """Reconstruye employee_presence desde los registros abiertos."""
+        present = container.user_service().rebuild_presence()
+        click.echo(f"Empleados presentes: {present}")
+
+    @app.cli.command("occupancy-reconcile")
+    def occupancy_reconcile():
+        """Corrige los contadores de side_occupancy desviados de la presencia."""
+        repaired = container.user_service().reconcile_side_occupancy()
+        click.echo(f"Sides corregidos: {repaired}")
+
+    @app.cli.command("photos-derive")
+    @click.option("--force", is_flag=True,
+                  help="Regenera todos los derivados aunque ya existan.")
+    def photos_derive(force):
+        """Genera las versiones reducidas de las fotos de empleados."""
+        derivatives = container.photo_derivatives()
+        if not derivatives.available:
+            raise click.ClickException(
+                "Derivados desactivados o Pillow no instalado (pip install Pillow).")
+        try:
+            result = derivatives.generate_all(force=force)
+        except FileNotFoundError as e:
+            raise click.ClickException(f"Carpeta de fotos no encontrada: {e.filename}")
+        click.echo(
+            f"Fotos procesadas: {result['processed']}, fallidas: {result['failed']} "
+            f"(anchos {', '.join(str(w) for w in derivatives.widths)} px)"
+        )
@@ -1,16 +1,70 @@
 from abc import ABC
 
 from .db import get_db
+from .query_catalog import QueryCatalog
 from app.domain.entities.active_staff import ActiveStaff
 from app.domain.repositories.IActiveStaffRepository import IActiveStaffRepository
 from typing import List, Optional, Tuple
-from psycopg2 import sql
+
+_STAFF_COLUMNS = """
+    SELECT DISTINCT e.id_empleado,
+           e.nombre_empleado,
+           e.apellidos_empleado,
+           CASE WHEN r.entry_hour IS NOT NULL THEN TRUE ELSE FALSE END as is_active,
+           r.entry_hour,
+           TRIM(CONCAT_WS(' ', pl.type_zone, pl.name)) AS line_name
+"""
+
+_STAFF_FROM = """
+    FROM {schema}.table_empleados_tarjeta e
+    LEFT JOIN {schema}.employee_presence r ON e.numero_tarjeta = r.id_employee
+    LEFT JOIN {schema}.production_lines pl ON r.line_id_fk = pl.line_id
+"""
+
+_SEARCH_FILTER = " AND (CAST(e.id_empleado AS TEXT) ILIKE %s OR e.nombre_empleado ILIKE %s OR e.apellidos_empleado ILIKE %s)"
+_LINE_FILTER = " AND r.line_id_fk = %s"
+
+_SORT_COLUMNS = {
+    'id': "e.id_empleado",
+    'name': "e.nombre_empleado",
+    'line': "line_name",
+}
+
+
+def _where(search: bool, line: bool) -> str:
+    return "WHERE 1=1" + (_SEARCH_FILTER if search else "") + (_LINE_FILTER if line else "")
+
+
+def _staff_templates() -> dict:
+    """
+    Los filtros y el orden de get_paginated son combinaciones cerradas: cada
+    una es una variante del catálogo, con clave (tipo, búsqueda, línea[, orden]).
+    """
+    templates = {"all_active": _STAFF_COLUMNS + _STAFF_FROM + "ORDER BY e.id_empleado"}
+    for search in (False, True):
+        for line in (False, True):
+            templates[("count", search, line)] = (
+                "SELECT COUNT(DISTINCT e.id_empleado)" + _STAFF_FROM + _where(search, line)
+            )
+            for sort_by, column in _SORT_COLUMNS.items():
+                for direction in ("ASC", "DESC"):
+                    templates[("page", search, line, sort_by, direction)] = (
+                        _STAFF_COLUMNS + _STAFF_FROM + _where(search, line)
+                        + f"\nORDER BY {column} {direction}\nLIMIT %s OFFSET %s"
+                    )
+    return templates
+
+
+_QUERIES = QueryCatalog(_staff_templates())
+
 
 class ActiveStaffRepositorySQL(IActiveStaffRepository, ABC):
     """Implementación del repositorio de personal activo con Psycopg2."""
 
     def __init__(self, schema: str):
         self.schema = schema
+        # Consultas con el esquema ya resuelto (una vez por esquema y proceso)
+        self._sql = _QUERIES.compile(schema)
 
     @staticmethod
     def _get_cursor():
@@ -20,60 +74,20 @@ class ActiveStaffRepositorySQL(IActiveStaffRepository, ABC):
                       sort_by: str = 'id', sort_order: str = 'asc', line_id: Optional[int] = None) -> Tuple[List[ActiveStaff], int]:
         offset = (page - 1) * per_page
         
-        # Base query conditions
-        where_clause = sql.SQL("WHERE 1=1")
         params = []
-        
         if search_query:
             search_pattern = f"%{search_query}%"
-            where_clause = sql.SQL("{} AND (CAST(e.id_empleado AS TEXT) ILIKE %s OR e.nombre_empleado ILIKE %s OR e.apellidos_empleado ILIKE %s)").format(where_clause)
             params.extend([search_pattern, search_pattern, search_pattern])
-
         if line_id:
-            where_clause = sql.SQL("{} AND r.line_id_fk = %s").format(where_clause)
             params.append(line_id)
 
-        # Sorting
-        sort_column = sql.SQL("e.id_empleado")
-        if sort_by == 'name':
-            sort_column = sql.SQL("e.nombre_empleado")
-        elif sort_by == 'line':
-            sort_column = sql.SQL("line_name")
-        
-        sort_direction = sql.SQL("ASC") if sort_order == 'asc' else sql.SQL("DESC")
-
-        # Main query
-        query = sql.SQL("""
-            SELECT DISTINCT e.id_empleado,
-                   e.nombre_empleado,
-                   e.apellidos_empleado,
-                   CASE WHEN r.entry_hour IS NOT NULL THEN TRUE ELSE FALSE END as is_active,
-                   r.entry_hour,
-                   TRIM(CONCAT_WS(' ', pl.type_zone, pl.name)) AS line_name
-            FROM {schema}.table_empleados_tarjeta e
-            LEFT JOIN {schema}.registers r ON e.numero_tarjeta = r.id_employee AND r.exit_hour IS NULL
-            LEFT JOIN {schema}.production_lines pl ON r.line_id_fk = pl.line_id
-            {where}
-            ORDER BY {sort_col} {sort_dir}
-            LIMIT %s OFFSET %s
-        """).format(
-            schema=sql.Identifier(self.schema),
-            where=where_clause,
-            sort_col=sort_column,
-            sort_dir=sort_direction
-        )
-        
-        # Count query
-        count_query = sql.SQL("""
-            SELECT COUNT(DISTINCT e.id_empleado)
-            FROM {schema}.table_empleados_tarjeta e
-            LEFT JOIN {schema}.registers r ON e.numero_tarjeta = r.id_employee AND r.exit_hour IS NULL
-            LEFT JOIN {schema}.production_lines pl ON r.line_id_fk = pl.line_id
-            {where}
-        """).format(
-            schema=sql.Identifier(self.schema),
-            where=where_clause
-        )
+        # Orden: columna desconocida -> id, como antes
+        sort_key = sort_by if sort_by in _SORT_COLUMNS else 'id'
+        sort_direction = "ASC" if sort_order == 'asc' else "DESC"
+
+        filters = (bool(search_query), bool(line_id))
+        query = self._sql[("page", *filters, sort_key, sort_direction)]
+        count_query = self._sql[("count", *filters)]
 
         cursor = self._get_cursor()
         
@@ -101,18 +115,7 @@ class ActiveStaffRepositorySQL(IActiveStaffRepository, ABC):
         return employees, total_count
 
     def get_all_active(self) -> List[ActiveStaff]:
-        query = sql.SQL("""
-            SELECT DISTINCT e.id_empleado,
-                   e.nombre_empleado,
-                   e.apellidos_empleado,
-                   CASE WHEN r.entry_hour IS NOT NULL THEN TRUE ELSE FALSE END as is_active,
-                   r.entry_hour,
-                   TRIM(CONCAT_WS(' ', pl.type_zone, pl.name)) AS line_name
-            FROM {schema}.table_empleados_tarjeta e
-            LEFT JOIN {schema}.registers r ON e.numero_tarjeta = r.id_employee AND r.exit_hour IS NULL
-            LEFT JOIN {schema}.production_lines pl ON r.line_id_fk = pl.line_id
-            ORDER BY e.id_empleado
-        """).format(schema=sql.Identifier(self.schema))
+        query = self._sql["all_active"]
 
         cursor = self._get_cursor()
         cursor.execute(query)
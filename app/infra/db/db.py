@@ -5,18 +5,32 @@ Redirige a la conexión de SQLAlchemy.
 DEPRECATED: Refactorizar repositorios a usar SQLAlchemy Models.
 """
 
+import time
+
 from flask import g
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from app.extensions import db
+from .pool import pool_monitor
 
 def get_db():
     """
     Obtiene una conexión raw (DBAPI) desde el pool de SQLAlchemy.
     Se almacena en 'g' para reutilizarla en la misma request si se llama varias veces.
+
+    El checkout es perezoso: sólo ocurre en la primera consulta de la
+    request, así que las rutas que no consultan no ocupan conexión. El
+    tiempo de espera por el pool queda en `pool_monitor`.
     """
     if 'db_legacy_conn' not in g:
         # Obtenemos una conexión raw del engine.
         # Esto check-out una conexión del pool.
-        g.db_legacy_conn = db.engine.raw_connection()
+        start = time.perf_counter()
+        try:
+            g.db_legacy_conn = db.engine.raw_connection()
+        except PoolTimeoutError:
+            pool_monitor.record_timeout()
+            raise
+        pool_monitor.record_wait(time.perf_counter() - start)
     return g.db_legacy_conn
 
 def close_db(e=None):
@@ -27,6 +41,10 @@ def close_db(e=None):
     if conn:
         conn.close()
 
+def get_pool_stats() -> dict:
+    """Ocupación del pool y esperas de checkout en este worker."""
+    return pool_monitor.stats(db.engine)
+
 def init_app(app):
     """
     Registra el cierre de la conexión legacy.
@@ -0,0 +1,223 @@
+"""
+app/infra/db/employee_directory.py
+Directorio de empleados en memoria (por worker) indexado por tarjeta e ID.
+"""
+
+import logging
+import sys
+import threading
+import time
+from typing import Optional
+
+from app.domain.entities.user import User
+from app.domain.repositories.IUserRepository import IUserRepository
+from .user_repository_sql import UserRepositorySQL
+
+logger = logging.getLogger(__name__)
+
+
+class EmployeeDirectory(IUserRepository):
+    """
+    Implementación de IUserRepository que responde desde memoria.
+
+    Precarga `table_empleados_tarjeta` en dos diccionarios que comparten las
+    mismas entidades: número de tarjeta (texto, igual que la comparación del
+    ORM) -> User e id_empleado -> User.
+
+    - Cada `refresh_seconds` lee de la bitácora `employee_changes` (la
+      llenan triggers, así que ve los cambios de todos los workers) los
+      empleados dados de alta, editados o borrados desde la lectura
+      anterior, y recarga sólo esas filas.
+    - Cada `full_reload_seconds`, o tras `invalidate()` (sólo este worker),
+      recarga todo. Debe ser menor que la retención de la bitácora (un día).
+    - La consulta y la recarga se hacen fuera del lock, en el hilo de la
+      petición que las dispara; las demás siguen leyendo los índices
+      actuales, que se reemplazan al terminar.
+    - Un fallo de búsqueda consulta la base de datos y, si el empleado
+      existe, lo agrega al directorio.
+    """
+
+    def __init__(self, repository: UserRepositorySQL, enabled: bool = True,
+                 refresh_seconds: float = 60.0, full_reload_seconds: float = 3600.0):
+        """
+        :param repository: Repositorio SQL al que se delega la carga y los fallos.
+        :param enabled: Si es False, todas las búsquedas van a la base de datos.
+        :param refresh_seconds: Intervalo de la consulta de cambios.
+        :param full_reload_seconds: Intervalo de la recarga completa.
+        """
+        self._repository = repository
+        self._enabled = bool(enabled)
+        self._refresh_seconds = float(refresh_seconds)
+        self._full_reload_seconds = float(full_reload_seconds)
+        self._lock = threading.Lock()
+        self._by_card: dict[str, User] = {}
+        self._by_id: dict[int, User] = {}
+        # id_empleado -> tarjeta, para quitar la tarjeta anterior al editar
+        self._card_of: dict[int, str] = {}
+        self._watermark: Optional[int] = None
+        self._loaded_at = 0.0
+        self._refreshed_at = 0.0
+        self._stale = True
+        self._refreshing = False
+        self._hits = 0
+        self._misses = 0
+        self._full_reloads = 0
+        self._change_checks = 0
+        self._changes_applied = 0
+
+    # --- IUserRepository ---
+    def find_user_by_card_number(self, card_number: int) -> Optional[User]:
+        if not self._enabled:
+            return self._repository.find_user_by_card_number(card_number)
+
+        self._ensure_fresh()
+        user = self._by_card.get(str(card_number))
+        if user is not None:
+            self._hits += 1
+            return user
+
+        self._misses += 1
+        user = self._repository.find_user_by_card_number(card_number)
+        if user is not None:
+            self._remember(str(card_number), user)
+        return user
+
+    def find_by_id(self, user_id: int) -> Optional[User]:
+        if not self._enabled:
+            return self._repository.find_by_id(user_id)
+
+        self._ensure_fresh()
+        user = self._by_id.get(user_id)
+        if user is not None:
+            self._hits += 1
+            return user
+
+        self._misses += 1
+        user = self._repository.find_by_id(user_id)
+        if user is not None:
+            with self._lock:
+                self._by_id[user.id] = user
+        return user
+
+    # --- Mantenimiento ---
+    def invalidate(self) -> None:
+        """Marca el directorio para recarga completa (cambios en la plantilla de personal)."""
+        with self._lock:
+            self._stale = True
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        if not self._stale and now - self._refreshed_at < self._refresh_seconds:
+            return
+
+        with self._lock:
+            # Otro hilo ya está refrescando: se sirve lo que hay en memoria
+            if self._refreshing:
+                return
+            if not self._stale and now - self._refreshed_at < self._refresh_seconds:
+                return
+            full = self._stale or now - self._loaded_at >= self._full_reload_seconds
+            watermark = self._watermark
+            self._refreshing = True
+            # Un invalidate() que llegue durante la recarga pide otra
+            self._stale = False
+
+        try:
+            if full:
+                self._full_reload(now)
+            else:
+                self._apply_changes(now, watermark)
+        except Exception as e:
+            logger.warning("No se pudo refrescar el directorio de empleados: %s", e)
+            if full:
+                with self._lock:
+                    self._stale = True
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _full_reload(self, now: float) -> None:
+        """Reconstruye los índices (sin el lock) y los reemplaza de una vez."""
+        # La marca de agua se lee antes que las filas: un cambio intermedio
+        # vuelve a salir en la siguiente consulta en lugar de perderse
+        watermark = self._repository.employee_changes_watermark()
+        by_card: dict[str, User] = {}
+        by_id: dict[int, User] = {}
+        card_of: dict[int, str] = {}
+        for card, user in self._repository.list_employees():
+            by_id[user.id] = user
+            if card:
+                by_card[card] = user
+                card_of[user.id] = card
+
+        with self._lock:
+            self._by_card, self._by_id, self._card_of = by_card, by_id, card_of
+            self._watermark = watermark
+            self._loaded_at = self._refreshed_at = now
+            self._full_reloads += 1
+
+    def _apply_changes(self, now: float, watermark: int) -> None:
+        """Recarga sólo los empleados con cambios desde `watermark` (sin el lock)."""
+        watermark, changed = self._repository.employee_changes_since(watermark)
+        if changed:
+            rows = self._repository.list_employees(changed)
+            with self._lock:
+                by_card, by_id, card_of = dict(self._by_card), dict(self._by_id), dict(self._card_of)
+            # Bajas y ediciones: se quitan las entradas anteriores y se
+            # vuelven a poner las filas que siguen existiendo
+            for user_id in changed:
+                by_id.pop(user_id, None)
+                card = card_of.pop(user_id, None)
+                if card is not None and getattr(by_card.get(card), "id", None) == user_id:
+                    del by_card[card]
+            for card, user in rows:
+                by_id[user.id] = user
+                if card:
+                    by_card[card] = user
+                    card_of[user.id] = card
+
+        with self._lock:
+            if changed:
+                self._by_card, self._by_id, self._card_of = by_card, by_id, card_of
+            self._watermark = watermark
+            self._refreshed_at = now
+            self._change_checks += 1
+            self._changes_applied += len(changed)
+
+    def _remember(self, card: str, user: User) -> None:
+        with self._lock:
+            self._by_card[card] = user
+            self._by_id[user.id] = user
+            self._card_of[user.id] = card
+
+    def memory_bytes(self) -> int:
+        """Estimación del tamaño en memoria: índices, entidades y sus cadenas."""
+        with self._lock:
+            by_card, by_id, card_of = self._by_card, self._by_id, self._card_of
+            users = {id(user): user for user in by_id.values()}
+            users.update({id(user): user for user in by_card.values()})
+            size = sys.getsizeof(by_card) + sys.getsizeof(by_id) + sys.getsizeof(card_of)
+            size += sum(sys.getsizeof(card) for card in by_card)
+            size += sum(sys.getsizeof(user_id) for user_id in by_id)
+            for user in users.values():
+                size += sys.getsizeof(user) + sys.getsizeof(user.__dict__)
+                size += sys.getsizeof(user.name) + sys.getsizeof(user.last_name)
+            return size
+
+    def stats(self) -> dict:
+        """Tamaño, memoria y contadores para monitoreo."""
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self._enabled,
+            "employees": len(self._by_id),
+            "cards": len(self._by_card),
+            "memory_bytes": self.memory_bytes(),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+            "full_reloads": self._full_reloads,
+            "change_checks": self._change_checks,
+            "changes_applied": self._changes_applied,
+            "refresh_seconds": self._refresh_seconds,
+            "full_reload_seconds": self._full_reload_seconds,
+        }
@@ -0,0 +1,121 @@
+"""
+app/infra/db/group_commit.py
+Agrupación de escaneos concurrentes en una sola transacción (group commit).
+"""
+
+import threading
+from typing import Any, Callable, Optional
+
+
+class _Batch:
+    """Lote abierto: escaneos recibidos y, al cerrarse, sus resultados."""
+
+    def __init__(self, seq: int):
+        self.seq = seq
+        self.items: list = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results: Optional[list] = None
+        self.error: Optional[BaseException] = None
+
+
+class GroupCommitExecutor:
+    """
+    Junta los escaneos que llegan dentro de una ventana de pocos
+    milisegundos y los aplica con una sola transacción (un solo fsync de
+    commit en Postgres).
+
+    No usa hilos propios: el primer hilo de petición que llega a un lote
+    vacío es el líder; espera la ventana (o a que el lote se llene), aplica
+    el lote con su propia conexión y reparte los resultados. El resto de los
+    hilos sólo esperan su resultado y no toman conexión del pool.
+
+    Los lotes se aplican en el orden en que se abrieron y cada lote conserva
+    el orden de llegada, así que los escaneos de un mismo empleado se
+    aplican en orden dentro del worker.
+    """
+
+    def __init__(self, window_ms: float = 5.0, max_batch: int = 64):
+        """
+        :param window_ms: Tiempo que el líder espera más escaneos.
+        :param max_batch: Tamaño a partir del cual el lote se cierra sin esperar.
+        """
+        self._window = float(window_ms) / 1000.0
+        self._max_batch = max(1, int(max_batch))
+        self._lock = threading.Lock()
+        self._turn = threading.Condition(self._lock)
+        self._open: Optional[_Batch] = None
+        self._next_seq = 0
+        self._running_seq = 0
+        self._batches = 0
+        self._items = 0
+        self._largest = 0
+
+    def submit(self, item: Any, apply_batch: Callable[[list], list]) -> Any:
+        """
+        Agrega `item` al lote abierto y bloquea hasta que se aplique.
+
+        :param item: Escaneo a aplicar.
+        :param apply_batch: Función que recibe la lista de escaneos y
+                            devuelve un resultado por escaneo, en orden.
+                            Sólo la ejecuta el líder del lote.
+        :return: El resultado correspondiente a `item`.
+        :raises Exception: El error de `apply_batch` si falló el lote completo.
+        """
+        with self._lock:
+            batch = self._open
+            leader = batch is None
+            if leader:
+                batch = _Batch(self._next_seq)
+                self._next_seq += 1
+                self._open = batch
+            index = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self._max_batch:
+                self._close(batch)
+
+        if leader:
+            self._lead(batch, apply_batch)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def _close(self, batch: _Batch) -> None:
+        """Cierra el lote a nuevos escaneos (con el lock tomado)."""
+        batch.full.set()
+        if self._open is batch:
+            self._open = None
+
+    def _lead(self, batch: _Batch, apply_batch: Callable[[list], list]) -> None:
+        batch.full.wait(self._window)
+        with self._lock:
+            self._close(batch)
+            # Los lotes se aplican en orden de apertura
+            self._turn.wait_for(lambda: self._running_seq == batch.seq)
+        try:
+            batch.results = apply_batch(batch.items)
+        except BaseException as e:
+            batch.error = e
+        finally:
+            with self._lock:
+                self._running_seq += 1
+                self._batches += 1
+                self._items += len(batch.items)
+                self._largest = max(self._largest, len(batch.items))
+                self._turn.notify_all()
+            batch.done.set()
+
+    def stats(self) -> dict:
+        """Lotes aplicados y tamaño medio/máximo, para monitoreo."""
+        with self._lock:
+            return {
+                "window_ms": self._window * 1000.0,
+                "max_batch": self._max_batch,
+                "batches": self._batches,
+                "scans": self._items,
+                "avg_batch": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "largest_batch": self._largest,
+            }
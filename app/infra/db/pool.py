@@ -0,0 +1,60 @@
+"""
+app/infra/db/pool.py
+Métricas del pool de conexiones de SQLAlchemy (por worker).
+"""
+
+import threading
+
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMonitor:
+    """
+    Acumula el tiempo de espera al tomar conexiones del pool en `get_db()`
+    y los checkouts que vencieron `pool_timeout`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._checkouts += 1
+            self._wait_total += seconds
+            self._wait_max = max(self._wait_max, seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self._timeouts += 1
+
+    def stats(self, engine) -> dict:
+        """Ocupación actual del pool de `engine` más los tiempos de espera acumulados."""
+        pool = engine.pool
+        with self._lock:
+            waits = {
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "wait_avg_ms": round(self._wait_total / self._checkouts * 1000, 3)
+                if self._checkouts else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+            }
+        if isinstance(pool, QueuePool):
+            occupancy = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "max_overflow": pool._max_overflow,
+                "timeout_seconds": pool.timeout(),
+            }
+        else:
+            occupancy = {"pool_class": type(pool).__name__}
+        return {**occupancy, **waits}
+
+
+# Una instancia por proceso, igual que el pool que mide
+pool_monitor = PoolMonitor()
@@ -0,0 +1,175 @@
+"""
+app/infra/db/prepared_statements.py
+Registro de sentencias preparadas (PREPARE/EXECUTE) para las consultas calientes.
+"""
+
+import hashlib
+import re
+import threading
+import weakref
+from typing import Any, Optional, Union
+
+import psycopg2
+from psycopg2 import extensions, sql
+
+# Marcadores de psycopg2: %(nombre)s, %s y el literal %%
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+
+# Errores tras los que la sentencia debe volver a prepararse:
+# 26000 no existe (reconexión, DISCARD ALL), 42P05 ya existe con ese
+# nombre y 0A000 "cached plan must not change result type" (cambio de esquema)
+_REPREPARE_CODES = {"26000", "42P05", "0A000"}
+
+
+class _Statement:
+    def __init__(self, name: str, prepare_sql: str, param_names: Optional[list], param_count: int):
+        self.name = name
+        self.prepare_sql = prepare_sql
+        self.param_names = param_names
+        self.param_count = param_count
+        self.execute_sql = (
+            f"EXECUTE {name} ({', '.join(['%s'] * param_count)})" if param_count
+            else f"EXECUTE {name}"
+        )
+
+    def ordered(self, params) -> tuple:
+        if self.param_names is not None:
+            return tuple(params[key] for key in self.param_names)
+        return tuple(params or ())
+
+
+class PreparedStatementRegistry:
+    """
+    Prepara cada sentencia una sola vez por conexión del pool y la ejecuta
+    por nombre, ahorrando a Postgres el parseo y la planificación en cada
+    llamada.
+
+    - Las conexiones preparadas se siguen en un WeakKeyDictionary indexado
+      por la conexión DBAPI, que SQLAlchemy reutiliza entre checkouts; una
+      reconexión crea otra conexión y sus sentencias se preparan de nuevo.
+    - El nombre incluye un hash del texto (con el esquema ya resuelto), así
+      que dos esquemas o dos versiones de la consulta no chocan.
+    - Si Postgres responde que la sentencia no existe, ya existe o que su
+      plan cambió de tipo de resultado (cambio de esquema), se vuelve a
+      preparar. Si no había transacción abierta se reintenta en el acto;
+      si la había, se propaga el error (el llamador revierte) y la siguiente
+      llamada prepara de nuevo.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        :param enabled: Si es False, `execute` equivale a `cursor.execute`
+                        (p. ej. detrás de PgBouncer en modo transacción).
+        """
+        self._enabled = bool(enabled)
+        self._lock = threading.Lock()
+        self._statements: dict[tuple[str, str], _Statement] = {}
+        self._prepared: "weakref.WeakKeyDictionary[Any, set[str]]" = weakref.WeakKeyDictionary()
+        self._prepares = 0
+        self._executes = 0
+        self._reprepares = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def execute(self, cursor, name: str, query: Union[str, sql.Composable], params=None) -> None:
+        """
+        Ejecuta `query` como sentencia preparada; el resultado se lee del
+        cursor como con `cursor.execute`.
+
+        :param cursor: Cursor psycopg2 de la conexión de la petición.
+        :param name: Nombre lógico de la consulta (p. ej. "last_register_type").
+        :param query: Consulta con marcadores %s o %(nombre)s (no mezclados).
+        :param params: Tupla o diccionario de parámetros.
+        """
+        if not self._enabled:
+            cursor.execute(query, params)
+            return
+
+        statement = self._statement(cursor, name, query)
+        conn = cursor.connection
+        idle = conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+        try:
+            self._run(cursor, conn, statement, params)
+        except psycopg2.Error as e:
+            if e.pgcode not in _REPREPARE_CODES:
+                raise
+            self._forget(conn, statement.name)
+            self._reprepares += 1
+            if not idle:
+                raise
+            # Sin trabajo previo en la transacción: se puede revertir y reintentar
+            conn.rollback()
+            if e.pgcode != "26000":
+                cursor.execute(f"DEALLOCATE PREPARE {statement.name}")
+            self._run(cursor, conn, statement, params)
+
+    def _run(self, cursor, conn, statement: _Statement, params) -> None:
+        with self._lock:
+            prepared = self._prepared.setdefault(conn, set())
+            needs_prepare = statement.name not in prepared
+        if needs_prepare:
+            cursor.execute(statement.prepare_sql)
+            with self._lock:
+                prepared.add(statement.name)
+            self._prepares += 1
+        cursor.execute(statement.execute_sql, statement.ordered(params))
+        self._executes += 1
+
+    def _forget(self, conn, statement_name: str) -> None:
+        with self._lock:
+            self._prepared.get(conn, set()).discard(statement_name)
+
+    def _statement(self, cursor, name: str, query: Union[str, sql.Composable]) -> _Statement:
+        text = query if isinstance(query, str) else query.as_string(cursor)
+        key = (name, text)
+        statement = self._statements.get(key)
+        if statement is None:
+            statement = self._compile(name, text)
+            with self._lock:
+                self._statements[key] = statement
+        return statement
+
+    @staticmethod
+    def _compile(name: str, text: str) -> _Statement:
+        """Convierte los marcadores de psycopg2 en $1..$n y arma el PREPARE."""
+        names: list[str] = []
+        positional = 0
+
+        def replace(match):
+            nonlocal positional
+            if match.group(0) == "%%":
+                return "%"
+            if match.group(1) is not None:
+                if match.group(1) not in names:
+                    names.append(match.group(1))
+                return f"${names.index(match.group(1)) + 1}"
+            positional += 1
+            return f"${positional}"
+
+        body = _PLACEHOLDER.sub(replace, text).strip().rstrip(";")
+        if names and positional:
+            raise ValueError(f"Consulta {name}: no mezclar %s y %(nombre)s")
+        digest = hashlib.sha1(text.encode()).hexdigest()[:10]
+        statement_name = f"dle_{name}_{digest}"
+        return _Statement(
+            statement_name,
+            f"PREPARE {statement_name} AS {body}",
+            names or None,
+            len(names) or positional,
+        )
+
+    def stats(self) -> dict:
+        """Sentencias conocidas, conexiones con sentencias y contadores."""
+        with self._lock:
+            connections = len(self._prepared)
+            statements = len(self._statements)
+        return {
+            "enabled": self._enabled,
+            "statements": statements,
+            "connections": connections,
+            "prepares": self._prepares,
+            "executes": self._executes,
+            "reprepares": self._reprepares,
+        }
@@ -1,28 +1,316 @@
+import logging
 from abc import ABC
-from typing import Optional, List, Dict, Any
-from psycopg2 import sql
+from typing import Optional, List, Dict, Any, Sequence
+import psycopg2
+from app.common.occupancy_cache import OccupancyCache
 from app.domain.repositories.IProductionLinesRepository import IProductionLinesRepository
 from .db import get_db
+from .prepared_statements import PreparedStatementRegistry
+from .query_catalog import QueryCatalog
+
+logger = logging.getLogger(__name__)
+
+# Capacidad y ocupación por línea, agregadas por separado para que el JOIN
+# final sea 1:1 con production_lines (sin multiplicar filas por operador).
+_LINE_OCCUPANCY_CTES = """
+    WITH line_capacity AS (
+        SELECT p.line_id,
+               SUM(s.employee_capacity) AS capacity
+        FROM {schema}.positions p
+        JOIN {schema}.tbl_sides_of_positions s ON s.position_id_fk = p.position_id
+        GROUP BY p.line_id
+    ),
+    line_occupancy AS (
+        SELECT p.line_id,
+               SUM(so.operators) AS operators
+        FROM {schema}.side_occupancy so
+        JOIN {schema}.tbl_sides_of_positions s ON s.side_id = so.side_id
+        JOIN {schema}.positions p ON p.position_id = s.position_id_fk
+        GROUP BY p.line_id
+    )
+"""
+
+_LINE_DISPLAY_NAME = """
+    CASE
+        WHEN LOWER(pl.type_zone) LIKE 'no definida%%' OR pl.type_zone IS NULL THEN pl.name
+        ELSE pl.type_zone || ' ' || pl.name
+    END
+"""
+
+# Roster de operadores para los sides de un CTE `target_sides`
+_SIDE_ROSTERS = """
+    SELECT ts.side_id, e.nombre_empleado, e.apellidos_empleado
+    FROM target_sides ts
+    LEFT JOIN {schema}.employee_presence ep
+           ON ep.side_id_fk = ts.side_id
+    LEFT JOIN {schema}.table_empleados_tarjeta e
+           ON CAST(e.numero_tarjeta AS BIGINT) = ep.id_employee
+    ORDER BY ts.side_id, e.nombre_empleado, e.apellidos_empleado
+"""
+
+_QUERIES = QueryCatalog({
+    "all_lines": (
+        "SELECT line_id, name, type_zone, bu.bu_name "
+        "FROM {schema}.production_lines pl "
+        "LEFT JOIN {schema}.business_unit bu ON pl.business_unit_fk = bu.bu_id "
+        "ORDER BY bu.bu_name, "
+        "CASE WHEN LOWER(name) = 'afe' THEN 1 ELSE 0 END ASC, "
+        "CAST(SUBSTRING(name FROM '^[0-9]+') AS INTEGER) ASC, "
+        "name ASC"
+    ),
+    "all_lines_summary": _LINE_OCCUPANCY_CTES + """
+        SELECT pl.line_id,
+               """ + _LINE_DISPLAY_NAME + """ AS line_name,
+               COALESCE(lo.operators, 0) AS current_operators,
+               lc.capacity               AS total_capacity,
+               bu.bu_name,
+               bu.bu_id
+        FROM {schema}.production_lines pl
+        JOIN {schema}.business_unit bu ON pl.business_unit_fk = bu.bu_id
+        LEFT JOIN line_capacity lc ON lc.line_id = pl.line_id
+        LEFT JOIN line_occupancy lo ON lo.line_id = pl.line_id
+        ORDER BY bu.bu_name, 
+                 CAST(SUBSTRING(pl.name FROM '[0-9]+') AS INTEGER) ASC NULLS LAST,
+                 pl.name ASC;
+    """,
+    "area_rollups": _LINE_OCCUPANCY_CTES + """
+        SELECT bu.bu_id,
+               bu.bu_name,
+               COUNT(pl.line_id)               AS lines_count,
+               COALESCE(SUM(lo.operators), 0)  AS operators,
+               COALESCE(SUM(lc.capacity), 0)   AS capacity,
+               GROUPING(bu.bu_id)              AS is_total
+        FROM {schema}.production_lines pl
+        JOIN {schema}.business_unit bu ON pl.business_unit_fk = bu.bu_id
+        LEFT JOIN line_capacity lc ON lc.line_id = pl.line_id
+        LEFT JOIN line_occupancy lo ON lo.line_id = pl.line_id
+        GROUP BY ROLLUP ((bu.bu_id, bu.bu_name))
+        ORDER BY GROUPING(bu.bu_id), bu.bu_name;
+    """,
+    "lines_summary_for_area": _LINE_OCCUPANCY_CTES + """
+        SELECT pl.line_id,
+               """ + _LINE_DISPLAY_NAME + """ AS line_name,
+               COALESCE(lo.operators, 0) AS current_operators,
+               lc.capacity               AS total_capacity,
+               bu.bu_name,
+               bu.bu_id
+        FROM {schema}.production_lines pl
+        JOIN {schema}.business_unit bu ON pl.business_unit_fk = bu.bu_id
+        LEFT JOIN line_capacity lc ON lc.line_id = pl.line_id
+        LEFT JOIN line_occupancy lo ON lo.line_id = pl.line_id
+        WHERE bu.bu_id = %s
+        ORDER BY CAST(SUBSTRING(pl.name FROM '[0-9]+') AS INTEGER) ASC NULLS LAST,
+                 pl.name ASC;
+    """,
+    "station_cards_for_line": """
+        WITH line_sides AS (
+            SELECT p.position_id,
+                   p.position_name,
+                   s.side_id,
+                   s.side_title,
+                   s.employee_capacity
+            FROM {schema}.positions p
+            LEFT JOIN {schema}.tbl_sides_of_positions s ON p.position_id = s.position_id_fk
+            WHERE p.line_id = %s
+        )
+        SELECT ls.position_name,
+               ls.side_id,
+               ls.side_title,
+               ls.employee_capacity,
+               COALESCE(so.operators, 0) as operators,
+               ls.position_id
+        FROM line_sides ls
+        LEFT JOIN {schema}.side_occupancy so ON so.side_id = ls.side_id
+        ORDER BY ls.position_name, ls.side_title;
+    """,
+    # Versiones de datos compartidas por todos los workers (migración 0010):
+    # la de ocupación es la suma de las versiones por side
+    "data_versions": """
+        SELECT 'occupancy', COALESCE(SUM(version), 0), MAX(changed_at)
+        FROM {schema}.side_occupancy
+        UNION ALL
+        SELECT scope, version, changed_at FROM {schema}.data_versions
+    """,
+    "active_operators": """
+        SELECT e.nombre_empleado, e.apellidos_empleado
+        FROM {schema}.employee_presence ep
+        JOIN {schema}.table_empleados_tarjeta e ON CAST(e.numero_tarjeta AS BIGINT) = ep.id_employee
+        WHERE ep.side_id_fk = %s;
+    """,
+    "operators_by_side_for_line": """
+        WITH target_sides AS (
+            SELECT s.side_id
+            FROM {schema}.tbl_sides_of_positions s
+            JOIN {schema}.positions p ON p.position_id = s.position_id_fk
+            WHERE p.line_id = %s
+        )
+    """ + _SIDE_ROSTERS,
+    "operators_by_side_for_sides": """
+        WITH target_sides AS (SELECT UNNEST(%s::int[]) AS side_id)
+    """ + _SIDE_ROSTERS,
+    "line_name_by_id": """
+        SELECT 
+            CASE 
+                WHEN LOWER(type_zone) = 'no definida' THEN 
+                    CASE WHEN LOWER(name) = 'afe' THEN UPPER(name) ELSE name END
+                ELSE 
+                    TRIM(CONCAT_WS(' ', type_zone, CASE WHEN LOWER(name) = 'afe' THEN UPPER(name) ELSE name END))
+            END AS full_name
+        FROM {schema}.production_lines
+        WHERE line_id = %s
+        LIMIT 1
+    """,
+    "line_by_id": """
+        SELECT * FROM {schema}.production_lines
+        WHERE line_id = %s
+        LIMIT 1
+    """,
+    "lines_with_position_status": """
+        SELECT 
+            pl.line_id, 
+            pl.name, 
+            pl.type_zone,
+            p.position_id,
+            ps.is_active,
+            s.side_id,
+            s.employee_capacity
+        FROM {schema}.production_lines pl
+        JOIN {schema}.business_unit bu ON pl.business_unit_fk = bu.bu_id
+        LEFT JOIN {schema}.positions p ON pl.line_id = p.line_id
+        LEFT JOIN {schema}.position_status ps ON p.position_id = ps.position_id_fk
+        LEFT JOIN {schema}.tbl_sides_of_positions s ON p.position_id = s.position_id_fk
+        WHERE LOWER(bu.bu_name) = LOWER(%s)
+        ORDER BY 
+            CASE WHEN LOWER(pl.name) = 'afe' THEN 1 ELSE 0 END ASC,
+            CAST(SUBSTRING(pl.name FROM '^[0-9]+') AS INTEGER) ASC, 
+            pl.name ASC
+    """,
+    "group_machine_occupancy": """
+        WITH group_machines AS (
+            SELECT pl.line_id,
+                   pl.name,
+                   pl.type_zone,
+                   p.position_id,
+                   s.side_id,
+                   s.employee_capacity
+            FROM {schema}.production_lines pl
+            JOIN {schema}.business_unit bu ON pl.business_unit_fk = bu.bu_id
+            JOIN {schema}.positions p ON pl.line_id = p.line_id
+            JOIN {schema}.position_status ps ON p.position_id = ps.position_id_fk
+            LEFT JOIN {schema}.tbl_sides_of_positions s ON p.position_id = s.position_id_fk
+            WHERE LOWER(bu.bu_name) = LOWER(%s)
+              AND ps.is_active
+        ),
+        line_occupancy AS (
+            SELECT p.line_id,
+                   SUM(so.operators) AS operators
+            FROM {schema}.side_occupancy so
+            JOIN {schema}.tbl_sides_of_positions s ON s.side_id = so.side_id
+            JOIN {schema}.positions p ON p.position_id = s.position_id_fk
+            WHERE p.line_id IN (SELECT line_id FROM group_machines)
+            GROUP BY p.line_id
+        )
+        SELECT gm.line_id,
+               gm.name,
+               gm.type_zone,
+               gm.position_id,
+               gm.side_id,
+               gm.employee_capacity,
+               COALESCE(lo.operators, 0) AS operators
+        FROM group_machines gm
+        LEFT JOIN line_occupancy lo ON lo.line_id = gm.line_id
+        ORDER BY
+            CASE WHEN LOWER(gm.name) = 'afe' THEN 1 ELSE 0 END ASC,
+            CAST(SUBSTRING(gm.name FROM '^[0-9]+') AS INTEGER) ASC,
+            gm.name ASC
+    """,
+    "provision_positions": """
+        INSERT INTO {schema}.positions (line_id, position_name)
+        SELECT pl.line_id, 'Default'
+        FROM {schema}.production_lines pl
+        JOIN {schema}.business_unit bu ON pl.business_unit_fk = bu.bu_id
+        WHERE LOWER(bu.bu_name) = ANY(%s)
+          AND NOT EXISTS (
+              SELECT 1 FROM {schema}.positions p WHERE p.line_id = pl.line_id
+          )
+    """,
+    "provision_sides": """
+        INSERT INTO {schema}.tbl_sides_of_positions (position_id_fk, side_title, employee_capacity)
+        SELECT p.position_id, 'BP', 1
+        FROM {schema}.positions p
+        JOIN {schema}.production_lines pl ON pl.line_id = p.line_id
+        JOIN {schema}.business_unit bu ON pl.business_unit_fk = bu.bu_id
+        WHERE LOWER(bu.bu_name) = ANY(%s)
+          AND NOT EXISTS (
+              SELECT 1 FROM {schema}.tbl_sides_of_positions s WHERE s.position_id_fk = p.position_id
+          )
+    """,
+    "create_position": """
+        INSERT INTO {schema}.positions (line_id, position_name)
+        VALUES (%s, %s)
+        RETURNING position_id
+    """,
+    "position_status_check": """
+        SELECT position_status_id FROM {schema}.position_status 
+        WHERE position_id_fk = %s
+    """,
+    "position_status_update": """
+        UPDATE {schema}.position_status 
+        SET is_active = %s 
+        WHERE position_id_fk = %s
+    """,
+    "position_status_insert": """
+        INSERT INTO {schema}.position_status (is_active, position_id_fk)
+        VALUES (%s, %s)
+    """,
+    "create_side": """
+        INSERT INTO {schema}.tbl_sides_of_positions (position_id_fk, side_title, employee_capacity)
+        VALUES (%s, %s, %s)
+        RETURNING side_id
+    """,
+    "update_side": """
+        UPDATE {schema}.tbl_sides_of_positions
+        SET side_title = %s, employee_capacity = %s
+        WHERE side_id = %s
+    """,
+    "delete_side": "DELETE FROM {schema}.tbl_sides_of_positions WHERE side_id = %s",
+    "update_position": """
+        UPDATE {schema}.positions
+        SET position_name = %s
+        WHERE position_id = %s
+    """,
+    "delete_position": "DELETE FROM {schema}.positions WHERE position_id = %s",
+})
 
 class ProductionLineRepositorySQL(IProductionLinesRepository, ABC):
     """Implementación del repositorio de líneas de producción con Psycopg2."""
 
-    def __init__(self, schema: str):
+    def __init__(self, schema: str, occupancy_cache: Optional[OccupancyCache] = None,
+                 statements: Optional[PreparedStatementRegistry] = None):
         self.schema = schema
+        # Consultas con el esquema ya resuelto (una vez por esquema y proceso)
+        self._sql = _QUERIES.compile(schema)
+        self._occupancy_cache = occupancy_cache
+        # Si se proporciona, las consultas calientes se ejecutan preparadas
+        self._statements = statements
 
     def _get_cursor(self):
         return get_db().cursor()
 
+    def _execute(self, cursor, name: str, query, params) -> None:
+        """Ejecuta como sentencia preparada si hay registro; si no, directo."""
+        if self._statements is not None:
+            self._statements.execute(cursor, name, query, params)
+        else:
+            cursor.execute(query, params)
+
+    def _invalidate_topology(self) -> None:
+        """Los cambios de estaciones/sides alteran capacidades: vacía la caché."""
+        if self._occupancy_cache is not None:
+            self._occupancy_cache.invalidate_topology()
+
     def get_all_lines(self) -> list[dict]:
-        query = sql.SQL(
-            "SELECT line_id, name, type_zone, bu.bu_name "
-            "FROM {schema}.production_lines pl "
-            "LEFT JOIN {schema}.business_unit bu ON pl.business_unit_fk = bu.bu_id "
-            "ORDER BY bu.bu_name, "
-            "CASE WHEN LOWER(name) = 'afe' THEN 1 ELSE 0 END ASC, "
-            "CAST(SUBSTRING(name FROM '^[0-9]+') AS INTEGER) ASC, "
-            "name ASC"
-        ).format(schema=sql.Identifier(self.schema))
+        query = self._sql["all_lines"]
 
         cursor = self._get_cursor()
         cursor.execute(query)
@@ -39,26 +327,10 @@ class ProductionLineRepositorySQL(IProductionLinesRepository, ABC):
         return lines
 
     def get_all_lines_summary(self) -> list[dict]:
-        query = sql.SQL("""
-            SELECT pl.line_id,
-                   CASE 
-                        WHEN LOWER(pl.type_zone) LIKE 'no definida%' OR pl.type_zone IS NULL THEN pl.name 
-                        ELSE pl.type_zone || ' ' || pl.name 
-                   END as line_name,
-                   COUNT(DISTINCT r.id_employee) as current_operators,
-                   SUM(s.employee_capacity)      as total_capacity,
-                   bu.bu_name,
-                   bu.bu_id
-            FROM {schema}.production_lines pl
-            JOIN {schema}.business_unit bu ON pl.business_unit_fk = bu.bu_id
-            LEFT JOIN {schema}.positions p ON pl.line_id = p.line_id
-            LEFT JOIN {schema}.tbl_sides_of_positions s ON p.position_id = s.position_id_fk
-            LEFT JOIN {schema}.registers r ON p.position_id = r.position_id_fk AND r.exit_hour IS NULL
-            GROUP BY pl.line_id, line_name, bu.bu_name, bu.bu_id
-            ORDER BY bu.bu_name, 
-                     CAST(SUBSTRING(pl.name FROM '[0-9]+') AS INTEGER) ASC NULLS LAST,
-                     pl.name ASC;
-        """).format(schema=sql.Identifier(self.schema))
+        # Capacidad y operadores se pre-agregan por línea (ver
+        # _LINE_OCCUPANCY_CTES): el coste crece linealmente con los
+        # registros abiertos y la capacidad no se suma una vez por registro.
+        query = self._sql["all_lines_summary"]
 
         cursor = self._get_cursor()
         cursor.execute(query)
@@ -77,30 +349,62 @@ class ProductionLineRepositorySQL(IProductionLinesRepository, ABC):
             for row in results
         ]
 
+    def get_area_rollups(self) -> list[dict]:
+        """
+        Ocupación agregada por unidad de negocio (área), más el total de
+        planta vía ROLLUP (fila con `area_id` None, siempre al final).
+        """
+        query = self._sql["area_rollups"]
+
+        cursor = self._get_cursor()
+        try:
+            cursor.execute(query)
+            results = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        return [
+            {
+                "area_id": None if row[5] else row[0],
+                "area": "Planta" if row[5] else row[1],
+                "lines_count": row[2],
+                "operators": row[3],
+                "capacity": row[4]
+            }
+            for row in results
+        ]
+
+    def get_lines_summary_for_area(self, area_id: int) -> list[dict]:
+        """Resumen de ocupación de las líneas de una sola unidad de negocio."""
+        query = self._sql["lines_summary_for_area"]
+
+        cursor = self._get_cursor()
+        try:
+            cursor.execute(query, (area_id,))
+            results = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        return [
+            {
+                "id": row[0],
+                "name": row[1],
+                "operators": row[2],
+                "capacity": row[3],
+                "area": row[4],
+                "area_id": row[5]
+            }
+            for row in results
+        ]
+
     def get_station_cards_for_line(self, line_id: int) -> List[Dict[str, Any]]:
-        query = sql.SQL("""
-            WITH employees_working AS (
-                SELECT r.side_id_fk,
-                       COUNT(r.id_register) as employee_count
-                FROM {schema}.registers r
-                WHERE r.exit_hour IS NULL AND r.side_id_fk IS NOT NULL
-                GROUP BY r.side_id_fk
-            )
-            SELECT p.position_name,
-                   s.side_id,
-                   s.side_title,
-                   s.employee_capacity,
-                   COALESCE(ew.employee_count, 0) as operators,
-                   p.position_id
-            FROM {schema}.positions p
-            LEFT JOIN {schema}.tbl_sides_of_positions s ON p.position_id = s.position_id_fk
-            LEFT JOIN employees_working ew ON s.side_id = ew.side_id_fk
-            WHERE p.line_id = %s
-            ORDER BY p.position_name, s.side_title;
-        """).format(schema=sql.Identifier(self.schema))
+        # Los operadores por side salen de side_occupancy (una fila por
+        # side, mantenida por triggers): una búsqueda por clave primaria por
+        # side, sin agregar registros.
+        query = self._sql["station_cards_for_line"]
 
         cursor = self._get_cursor()
-        cursor.execute(query, (line_id,))
+        self._execute(cursor, "station_cards_for_line", query, (line_id,))
         results = cursor.fetchall()
         cursor.close()
 
@@ -126,13 +430,35 @@ class ProductionLineRepositorySQL(IProductionLinesRepository, ABC):
 
         return list(cards.values())
 
+    def get_data_validator(self, scopes: Sequence[str]) -> Optional[tuple[str, float]]:
+        """
+        Validador HTTP de los datos de los ámbitos indicados ('occupancy',
+        'topology', 'employees'), leído de las versiones que mantienen los
+        triggers en Postgres, así que es el mismo en todos los workers.
+
+        :return: (etag, epoch de la última modificación), o None si las
+                 versiones no están disponibles (migración 0010 sin aplicar).
+        """
+        cursor = self._get_cursor()
+        try:
+            self._execute(cursor, "data_versions", self._sql["data_versions"], None)
+            versions = {scope: (version, changed_at)
+                        for scope, version, changed_at in cursor.fetchall()}
+        except psycopg2.Error as e:
+            cursor.connection.rollback()
+            logger.warning("No se pudieron leer las versiones de datos: %s", e)
+            return None
+        finally:
+            cursor.close()
+
+        if any(scope not in versions for scope in scopes):
+            return None
+        etag = ".".join(f"{scope[0]}{versions[scope][0]}" for scope in scopes)
+        modified = [versions[scope][1] for scope in scopes if versions[scope][1] is not None]
+        return etag, max(modified).timestamp() if modified else 0.0
+
     def get_active_operators(self, station_id: int) -> list:
-        query = sql.SQL("""
-            SELECT e.nombre_empleado, e.apellidos_empleado
-            FROM {schema}.registers r
-            JOIN {schema}.table_empleados_tarjeta e ON r.id_employee = CAST(e.numero_tarjeta AS BIGINT)
-            WHERE r.side_id_fk = %s AND r.exit_hour IS NULL;
-        """).format(schema=sql.Identifier(self.schema))
+        query = self._sql["active_operators"]
 
         cursor = self._get_cursor()
         cursor.execute(query, (station_id,))
@@ -141,34 +467,51 @@ class ProductionLineRepositorySQL(IProductionLinesRepository, ABC):
 
         return [f"{row[0]} {row[1]}" for row in results]
 
+    def get_active_operators_by_side(self, side_ids: Optional[List[int]] = None,
+                                     line_id: Optional[int] = None) -> Dict[int, list]:
+        """
+        Operadores activos agrupados por side, en una sola consulta.
+        Recibe una lista de sides o una línea (todos sus sides); los sides
+        sin operadores se devuelven con lista vacía.
+
+        El JOIN usa la misma expresión que el índice
+        ix_empleados_numero_tarjeta_bigint, para no recorrer la tabla de
+        empleados completa.
+        """
+        if line_id is not None:
+            query = self._sql["operators_by_side_for_line"]
+            params = (line_id,)
+        else:
+            query = self._sql["operators_by_side_for_sides"]
+            params = (list(side_ids or []),)
+
+        cursor = self._get_cursor()
+        try:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        rosters: Dict[int, list] = {}
+        for side_id, first_name, last_name in rows:
+            names = rosters.setdefault(side_id, [])
+            if first_name is not None:
+                names.append(f"{first_name} {last_name}")
+        return rosters
+
     def get_line_name_by_id(self, line_id: int) -> Optional[str]:
-        query = sql.SQL("""
-            SELECT 
-                CASE 
-                    WHEN LOWER(type_zone) = 'no definida' THEN 
-                        CASE WHEN LOWER(name) = 'afe' THEN UPPER(name) ELSE name END
-                    ELSE 
-                        TRIM(CONCAT_WS(' ', type_zone, CASE WHEN LOWER(name) = 'afe' THEN UPPER(name) ELSE name END))
-                END AS full_name
-            FROM {schema}.production_lines
-            WHERE line_id = %s
-            LIMIT 1
-        """).format(schema=sql.Identifier(self.schema))
+        query = self._sql["line_name_by_id"]
 
         cursor = self._get_cursor()
         try:
-            cursor.execute(query, (line_id,))
+            self._execute(cursor, "line_name_by_id", query, (line_id,))
             row = cursor.fetchone()
             return row[0] if row and row[0] else None
         finally:
             cursor.close()
 
     def get_line_by_id(self, line_id: int) -> Optional[dict]:
-        query = sql.SQL("""
-            SELECT * FROM {schema}.production_lines
-            WHERE line_id = %s
-            LIMIT 1
-        """).format(schema=sql.Identifier(self.schema))
+        query = self._sql["line_by_id"]
         
         cursor = self._get_cursor()
         try:
@@ -178,126 +521,108 @@ class ProductionLineRepositorySQL(IProductionLinesRepository, ABC):
             cursor.close()
 
     def get_lines_with_position_status(self, group_name: str) -> list[dict]:
-        query = sql.SQL("""
-            SELECT 
-                pl.line_id, 
-                pl.name, 
-                pl.type_zone,
-                p.position_id,
-                ps.is_active,
-                s.side_id,
-                s.employee_capacity
-            FROM {schema}.production_lines pl
-            JOIN {schema}.business_unit bu ON pl.business_unit_fk = bu.bu_id
-            LEFT JOIN {schema}.positions p ON pl.line_id = p.line_id
-            LEFT JOIN {schema}.position_status ps ON p.position_id = ps.position_id_fk
-            LEFT JOIN {schema}.tbl_sides_of_positions s ON p.position_id = s.position_id_fk
-            WHERE LOWER(bu.bu_name) = LOWER(%s)
-            ORDER BY 
-                CASE WHEN LOWER(pl.name) = 'afe' THEN 1 ELSE 0 END ASC,
-                CAST(SUBSTRING(pl.name FROM '^[0-9]+') AS INTEGER) ASC, 
-                pl.name ASC
-        """).format(schema=sql.Identifier(self.schema))
+        """
+        Lectura pura: las líneas sin posición o sin side se devuelven con
+        `position_id` / `side_id` en None. Los valores por defecto se crean
+        con `provision_missing_defaults`, nunca desde aquí.
+        """
+        query = self._sql["lines_with_position_status"]
 
         cursor = self._get_cursor()
         try:
             cursor.execute(query, (group_name,))
             rows = cursor.fetchall()
-            print(f"DEBUG: Retrieved {len(rows)} lines for group {group_name} (Raw)")
-            
-            results = []
-            for r in rows:
-                line_id = r[0]
-                line_name = r[1]
-                type_zone = r[2]
-                pos_id = r[3]
-                is_active = r[4]
-                side_id = r[5]
-                capacity = r[6]
-
-                # Auto-create position if missing
-                if pos_id is None:
-                    print(f"DEBUG: Missing position for Line {line_name} (ID: {line_id}). Creating default...")
-                    pos_id = self._create_default_position(line_id)
-                
-                # Auto-create Side if missing (requires position)
-                if side_id is None and pos_id is not None:
-                     print(f"DEBUG: Missing side for Position {pos_id}. Creating default Side...")
-                     side_id = self._create_default_side(pos_id)
-                     capacity = 1 # Default
-
-                is_visible = is_active if is_active is not None else False 
-                
-                results.append({
-                    "id": line_id,
-                    "name": line_name,
-                    "type_zone": type_zone,
-                    "position_id": pos_id,
-                    "side_id": side_id,
-                    "capacity": capacity,
-                    "is_visible": is_visible
-                })
-            
-            return results
         finally:
             cursor.close()
 
-    def _create_default_position(self, line_id: int) -> int:
-        """Crea una posición por defecto para una línea y retorna su ID."""
-        return self.create_position(line_id, 'Default')
+        return [
+            {
+                "id": line_id,
+                "name": line_name,
+                "type_zone": type_zone,
+                "position_id": pos_id,
+                "side_id": side_id,
+                "capacity": capacity,
+                "is_visible": is_active if is_active is not None else False
+            }
+            for line_id, line_name, type_zone, pos_id, is_active, side_id, capacity in rows
+        ]
+
+    def get_group_machine_occupancy(self, group_name: str) -> list[dict]:
+        """
+        Máquinas visibles (líneas con posición activa) de una unidad de
+        negocio, con la capacidad de su side y los operadores activos de la
+        línea, en un solo viaje a la base de datos. La agregación de
+        registros abiertos se limita a las líneas del grupo.
+        """
+        query = self._sql["group_machine_occupancy"]
 
-    def create_position(self, line_id: int, name: str) -> int:
-        """Crea una posición (estación) en la base de datos."""
         cursor = self._get_cursor()
         try:
-            insert_q = sql.SQL("""
-                INSERT INTO {schema}.positions (line_id, position_name)
-                VALUES (%s, %s)
-                RETURNING position_id
-            """).format(schema=sql.Identifier(self.schema))
-            cursor.execute(insert_q, (line_id, name))
-            new_id = cursor.fetchone()[0]
+            cursor.execute(query, (group_name,))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        return [
+            {
+                "id": line_id,
+                "name": name,
+                "type_zone": type_zone,
+                "position_id": pos_id,
+                "side_id": side_id,
+                "capacity": capacity,
+                "operators": operators
+            }
+            for line_id, name, type_zone, pos_id, side_id, capacity, operators in rows
+        ]
+
+    def provision_missing_defaults(self, group_names: list[str]) -> dict:
+        """
+        Crea, en una sola transacción y con INSERT ... SELECT, la posición
+        'Default' de cada línea sin posiciones y el side 'BP' (capacidad 1)
+        de cada posición sin sides, para las unidades de negocio indicadas.
+
+        :param group_names: Nombres de unidad de negocio (sin distinguir mayúsculas).
+        :return: {"positions_created": int, "sides_created": int}
+        """
+        groups = [name.lower() for name in group_names]
+        q_positions = self._sql["provision_positions"]
+        q_sides = self._sql["provision_sides"]
+
+        cursor = self._get_cursor()
+        try:
+            # Serializa provisiones concurrentes (CLI y endpoint) para no duplicar
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('dle.provision_missing_defaults'))")
+            cursor.execute(q_positions, (groups,))
+            positions_created = cursor.rowcount
+            cursor.execute(q_sides, (groups,))
+            sides_created = cursor.rowcount
             cursor.connection.commit()
-            print(f"DEBUG: Created Position {new_id} ({name}) for Line {line_id}")
-            return new_id
+            self._invalidate_topology()
+            print(f"DEBUG: Provisioned {positions_created} positions and {sides_created} sides for {group_names}")
+            return {"positions_created": positions_created, "sides_created": sides_created}
         except Exception as e:
             cursor.connection.rollback()
-            print(f"ERROR creating position: {e}")
+            print(f"ERROR provisioning defaults: {e}")
             raise
         finally:
             cursor.close()
 
-    def _create_default_side(self, position_id: int) -> int:
-        """Crea un Side por defecto para una posición y retorna su ID (idempotente)."""
+    def create_position(self, line_id: int, name: str) -> int:
+        """Crea una posición (estación) en la base de datos."""
         cursor = self._get_cursor()
         try:
-            # 1. Check if already exists to avoid duplicates
-            check_q = sql.SQL("""
-                SELECT side_id FROM {schema}.tbl_sides_of_positions
-                WHERE position_id_fk = %s
-                LIMIT 1
-            """).format(schema=sql.Identifier(self.schema))
-            cursor.execute(check_q, (position_id,))
-            existing = cursor.fetchone()
-            
-            if existing:
-                print(f"DEBUG: Side already exists for Position {position_id} (ID: {existing[0]})")
-                return existing[0]
-
-            # 2. Insert if not exists
-            insert_q = sql.SQL("""
-                INSERT INTO {schema}.tbl_sides_of_positions (position_id_fk, side_title, employee_capacity)
-                VALUES (%s, 'BP', 1)
-                RETURNING side_id
-            """).format(schema=sql.Identifier(self.schema))
-            cursor.execute(insert_q, (position_id,))
+            insert_q = self._sql["create_position"]
+            cursor.execute(insert_q, (line_id, name))
             new_id = cursor.fetchone()[0]
             cursor.connection.commit()
-            print(f"DEBUG: Created Side {new_id} for Position {position_id}")
+            self._invalidate_topology()
+            print(f"DEBUG: Created Position {new_id} ({name}) for Line {line_id}")
             return new_id
         except Exception as e:
             cursor.connection.rollback()
-            print(f"ERROR creating default side: {e}")
+            print(f"ERROR creating position: {e}")
             raise
         finally:
             cursor.close()
@@ -307,32 +632,23 @@ class ProductionLineRepositorySQL(IProductionLinesRepository, ABC):
         cursor = self._get_cursor()
         try:
             # Check if exists
-            q_check = sql.SQL("""
-                SELECT position_status_id FROM {schema}.position_status 
-                WHERE position_id_fk = %s
-            """).format(schema=sql.Identifier(self.schema))
+            q_check = self._sql["position_status_check"]
             cursor.execute(q_check, (position_id,))
             res = cursor.fetchone()
 
             if res:
                 print(f"DEBUG: Record exists for PID {position_id}. Updating...")
                 # Update
-                q_update = sql.SQL("""
-                    UPDATE {schema}.position_status 
-                    SET is_active = %s 
-                    WHERE position_id_fk = %s
-                """).format(schema=sql.Identifier(self.schema))
+                q_update = self._sql["position_status_update"]
                 cursor.execute(q_update, (is_true, position_id))
             else:
                 print(f"DEBUG: No record for PID {position_id}. Inserting...")
                 # Insert
-                q_insert = sql.SQL("""
-                    INSERT INTO {schema}.position_status (is_active, position_id_fk)
-                    VALUES (%s, %s)
-                """).format(schema=sql.Identifier(self.schema))
+                q_insert = self._sql["position_status_insert"]
                 cursor.execute(q_insert, (is_true, position_id))
             
             cursor.connection.commit()
+            self._invalidate_topology()
             print(f"DEBUG: Commit successful for PID {position_id}")
         except Exception as e:
             print(f"ERROR in update_position_status for PID {position_id}: {e}")
@@ -345,14 +661,11 @@ class ProductionLineRepositorySQL(IProductionLinesRepository, ABC):
     def create_side(self, position_id: int, title: str, capacity: int) -> int:
         cursor = self._get_cursor()
         try:
-            q = sql.SQL("""
-                INSERT INTO {schema}.tbl_sides_of_positions (position_id_fk, side_title, employee_capacity)
-                VALUES (%s, %s, %s)
-                RETURNING side_id
-            """).format(schema=sql.Identifier(self.schema))
+            q = self._sql["create_side"]
             cursor.execute(q, (position_id, title, capacity))
             new_id = cursor.fetchone()[0]
             cursor.connection.commit()
+            self._invalidate_topology()
             print(f"DEBUG: Created Side {new_id} for Position {position_id}")
             return new_id
         except Exception as e:
@@ -365,13 +678,10 @@ class ProductionLineRepositorySQL(IProductionLinesRepository, ABC):
     def update_side(self, side_id: int, title: str, capacity: int) -> None:
         cursor = self._get_cursor()
         try:
-            q = sql.SQL("""
-                UPDATE {schema}.tbl_sides_of_positions
-                SET side_title = %s, employee_capacity = %s
-                WHERE side_id = %s
-            """).format(schema=sql.Identifier(self.schema))
+            q = self._sql["update_side"]
             cursor.execute(q, (title, capacity, side_id))
             cursor.connection.commit()
+            self._invalidate_topology()
             print(f"DEBUG: Updated Side {side_id}")
         except Exception as e:
             cursor.connection.rollback()
@@ -383,9 +693,10 @@ class ProductionLineRepositorySQL(IProductionLinesRepository, ABC):
     def delete_side(self, side_id: int) -> None:
         cursor = self._get_cursor()
         try:
-            q = sql.SQL("DELETE FROM {schema}.tbl_sides_of_positions WHERE side_id = %s").format(schema=sql.Identifier(self.schema))
+            q = self._sql["delete_side"]
             cursor.execute(q, (side_id,))
             cursor.connection.commit()
+            self._invalidate_topology()
             print(f"DEBUG: Deleted Side {side_id}")
         except Exception as e:
             cursor.connection.rollback()
@@ -398,13 +709,10 @@ class ProductionLineRepositorySQL(IProductionLinesRepository, ABC):
     def update_position(self, position_id: int, new_name: str) -> None:
         cursor = self._get_cursor()
         try:
-            q = sql.SQL("""
-                UPDATE {schema}.positions
-                SET position_name = %s
-                WHERE position_id = %s
-            """).format(schema=sql.Identifier(self.schema))
+            q = self._sql["update_position"]
             cursor.execute(q, (new_name, position_id))
             cursor.connection.commit()
+            self._invalidate_topology()
             print(f"DEBUG: Updated Position {position_id} name to {new_name}")
         except Exception as e:
             cursor.connection.rollback()
@@ -421,9 +729,10 @@ class ProductionLineRepositorySQL(IProductionLinesRepository, ABC):
             # If not, we might need to delete sides first manually.
             # Let's try direct delete and let DB constraints logic apply (or error out).
             
-            q = sql.SQL("DELETE FROM {schema}.positions WHERE position_id = %s").format(schema=sql.Identifier(self.schema))
+            q = self._sql["delete_position"]
             cursor.execute(q, (position_id,))
             cursor.connection.commit()
+            self._invalidate_topology()
             print(f"DEBUG: Deleted Position {position_id}")
         except Exception as e:
             cursor.connection.rollback()
@@ -0,0 +1,64 @@
+"""
+app/infra/db/query_catalog.py
+Catálogo de consultas SQL compiladas una vez por esquema.
+"""
+
+import threading
+from collections.abc import Mapping
+from typing import Hashable
+
+
+def quote_ident(name: str) -> str:
+    """Cita un identificador de Postgres igual que sql.Identifier ("a""b")."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class CompiledQueries(Mapping):
+    """Consultas de un catálogo con el esquema ya resuelto, listas para `cursor.execute`."""
+
+    def __init__(self, schema: str, queries: dict):
+        self.schema = schema
+        self._queries = queries
+
+    def __getitem__(self, name: Hashable) -> str:
+        return self._queries[name]
+
+    def __iter__(self):
+        return iter(self._queries)
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+
+class QueryCatalog:
+    """
+    Plantillas SQL de un repositorio con el marcador `{schema}`.
+
+    `compile(schema)` las resuelve todas de una vez (al construir el
+    repositorio) y devuelve cadenas listas para ejecutar, en lugar de armar
+    `sql.SQL(...).format(schema=sql.Identifier(...))` en cada llamada. Las
+    compilaciones se guardan por esquema, así que varios repositorios o
+    esquemas en el mismo proceso comparten el resultado.
+
+    Las plantillas sólo admiten `{schema}`: las partes variables (filtros,
+    orden) se declaran como variantes con su propia clave.
+    """
+
+    def __init__(self, templates: dict):
+        """:param templates: {nombre: texto SQL con {schema}}."""
+        self._templates = dict(templates)
+        self._lock = threading.Lock()
+        self._compiled: dict[str, CompiledQueries] = {}
+
+    def compile(self, schema: str) -> CompiledQueries:
+        """Consultas con `schema` resuelto; se compilan la primera vez que se pide el esquema."""
+        compiled = self._compiled.get(schema)
+        if compiled is None:
+            quoted = quote_ident(schema)
+            compiled = CompiledQueries(schema, {
+                name: template.format(schema=quoted)
+                for name, template in self._templates.items()
+            })
+            with self._lock:
+                compiled = self._compiled.setdefault(schema, compiled)
+        return compiled
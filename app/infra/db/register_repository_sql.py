@@ -1,33 +1,335 @@
+import logging
+import time
 from abc import ABC
 from typing import Optional
-from psycopg2 import sql
 from datetime import datetime
+import psycopg2
+from psycopg2 import extensions
+from app.common.occupancy_cache import OccupancyCache
+from .group_commit import GroupCommitExecutor
+from .prepared_statements import PreparedStatementRegistry
+from .query_catalog import QueryCatalog
 from app.domain.repositories.IRegisterRepository import IRegisterRepository
 from .db import get_db
 
+logger = logging.getLogger(__name__)
+
+# Vida máxima de la caché de ubicaciones de side: cubre los cambios de
+# topología hechos en otros workers, que no avanzan la generación local
+_SIDE_LOCATION_MAX_AGE = 300.0
+
+# Rangos de integer/bigint: ids fuera de rango no se envían al bloqueo previo
+_MAX_INT4 = 2 ** 31 - 1
+_MAX_INT8 = 2 ** 63 - 1
+
+# Clases SQLSTATE que afectan a la conexión o al servidor, no a un escaneo:
+# 08 conexión, 53 recursos, 57P apagado/recuperación, 58 error de sistema
+_BATCH_ERROR_CLASSES = ("08", "53", "57P", "58")
+
+
+def _is_batch_error(error: psycopg2.Error) -> bool:
+    """Indica si el error invalida la transacción del lote completo."""
+    if isinstance(error, psycopg2.InterfaceError):
+        return True
+    if isinstance(error, (extensions.QueryCanceledError, extensions.TransactionRollbackError)):
+        # Timeout, deadlock o fallo de serialización: sólo la sentencia
+        return False
+    if isinstance(error, psycopg2.OperationalError):
+        # Sin pgcode: la conexión se cayó antes de que el servidor respondiera
+        return error.pgcode is None or error.pgcode.startswith(_BATCH_ERROR_CLASSES)
+    return False
+
+_QUERIES = QueryCatalog({
+    # Presente (registro abierto) -> el siguiente escaneo es una salida
+    "last_register_type": """
+        SELECT CASE
+            WHEN EXISTS (SELECT 1 FROM {schema}.employee_presence WHERE id_employee = %s)
+            THEN 'Exit'
+            ELSE 'Entry'
+            END AS register_type
+    """,
+    # Estación actual desde la presencia; si no está presente, la del último
+    # registro cerrado
+    "last_station_for_user": """
+        WITH current AS (
+            SELECT position_id_fk
+            FROM {schema}.employee_presence
+            WHERE id_employee = %(user_id)s
+        ),
+        last_station AS (
+            SELECT position_id_fk FROM current
+            UNION ALL
+            (SELECT r.position_id_fk
+             FROM {schema}.registers r
+             WHERE r.id_employee = %(user_id)s
+               AND NOT EXISTS (SELECT 1 FROM current)
+             ORDER BY r.id_register DESC
+             LIMIT 1)
+        )
+        SELECT p.position_name, pl.name, pl.type_zone
+        FROM last_station ls
+        JOIN {schema}.positions p ON ls.position_id_fk = p.position_id
+        JOIN {schema}.production_lines pl ON p.line_id = pl.line_id
+        LIMIT 1
+    """,
+    "scan_result": """
+        WITH current AS (
+            SELECT TRUE AS is_open, position_id_fk
+            FROM {schema}.employee_presence
+            WHERE id_employee = %(card_number)s
+        ),
+        last_register AS (
+            SELECT is_open, position_id_fk FROM current
+            UNION ALL
+            (SELECT FALSE, r.position_id_fk
+             FROM {schema}.registers r
+             WHERE r.id_employee = %(card_number)s
+               AND NOT EXISTS (SELECT 1 FROM current)
+             ORDER BY r.id_register DESC
+             LIMIT 1)
+        ),
+        employee AS (
+            SELECT e.id_empleado, e.nombre_empleado, e.apellidos_empleado
+            FROM {schema}.table_empleados_tarjeta e
+            WHERE e.numero_tarjeta = %(card_text)s
+            LIMIT 1
+        )
+        SELECT emp.id_empleado,
+               emp.nombre_empleado,
+               emp.apellidos_empleado,
+               COALESCE(lr.is_open, FALSE) AS is_open,
+               p.position_name,
+               pl.name,
+               pl.type_zone
+        FROM (SELECT 1) AS anchor
+        LEFT JOIN employee emp ON TRUE
+        LEFT JOIN last_register lr ON TRUE
+        LEFT JOIN {schema}.positions p ON p.position_id = lr.position_id_fk
+        LEFT JOIN {schema}.production_lines pl ON pl.line_id = p.line_id
+    """,
+    # Un solo viaje: el registro abierto se bloquea (FOR UPDATE) para que
+    # dos escaneos simultáneos del mismo gafete no lo cierren dos veces.
+    "checkin": """
+        WITH open_register AS (
+            SELECT id_register
+            FROM {schema}.registers
+            WHERE id_employee = %(user_id)s AND exit_hour IS NULL
+            ORDER BY id_register DESC
+            LIMIT 1
+            FOR UPDATE
+        ),
+        closed AS (
+            UPDATE {schema}.registers r
+            SET exit_hour = %(now_time)s
+            FROM open_register o
+            WHERE r.id_register = o.id_register
+            RETURNING r.id_register, r.line_id_fk
+        ),
+        target AS (
+            SELECT p.line_id, p.position_id
+            FROM {schema}.tbl_sides_of_positions s
+            JOIN {schema}.positions p ON p.position_id = s.position_id_fk
+            WHERE s.side_id = %(side_id)s AND %(side_id)s > 0
+            LIMIT 1
+        ),
+        inserted AS (
+            INSERT INTO {schema}.registers
+                (id_employee, date_register, entry_hour, line_id_fk, position_id_fk, side_id_fk)
+            SELECT %(user_id)s, %(today)s, %(now_time)s, t.line_id, t.position_id, %(side_id)s
+            FROM target t
+            RETURNING id_register, side_id_fk, position_id_fk, line_id_fk, date_register, entry_hour
+        ),
+        -- Presencia en la misma sentencia: el nuevo registro la reemplaza;
+        -- sin registro nuevo (salida) se elimina
+        presence_set AS (
+            INSERT INTO {schema}.employee_presence
+                (id_employee, id_register, side_id_fk, position_id_fk, line_id_fk, date_register, entry_hour)
+            SELECT %(user_id)s, id_register, side_id_fk, position_id_fk, line_id_fk, date_register, entry_hour
+            FROM inserted
+            ON CONFLICT (id_employee) DO UPDATE
+            SET id_register = EXCLUDED.id_register,
+                side_id_fk = EXCLUDED.side_id_fk,
+                position_id_fk = EXCLUDED.position_id_fk,
+                line_id_fk = EXCLUDED.line_id_fk,
+                date_register = EXCLUDED.date_register,
+                entry_hour = EXCLUDED.entry_hour
+        ),
+        presence_cleared AS (
+            DELETE FROM {schema}.employee_presence
+            WHERE id_employee = %(user_id)s
+              AND NOT EXISTS (SELECT 1 FROM inserted)
+        )
+        SELECT (SELECT id_register FROM closed),
+               (SELECT line_id_fk FROM closed),
+               (SELECT id_register FROM inserted),
+               (SELECT line_id_fk FROM inserted)
+    """,
+    # Bloquea (creándolas si faltan) las filas de side_occupancy que tocará
+    # un lote: los sides destino y los actuales de sus empleados, en orden de
+    # side_id. Así dos lotes concurrentes no se bloquean en orden cruzado
+    "lock_side_counters": """
+        INSERT INTO {schema}.side_occupancy AS so (side_id, operators)
+        SELECT side_id, 0
+        FROM (
+            SELECT side_id FROM {schema}.tbl_sides_of_positions
+            WHERE side_id = ANY(%(side_ids)s::int[])
+            UNION
+            SELECT side_id_fk FROM {schema}.employee_presence
+            WHERE id_employee = ANY(%(user_ids)s::bigint[]) AND side_id_fk IS NOT NULL
+        ) sides
+        ORDER BY side_id
+        ON CONFLICT (side_id) DO UPDATE SET operators = so.operators
+    """,
+    "claim_idempotency": """
+        INSERT INTO {schema}.scan_idempotency (idempotency_key)
+        VALUES (%s)
+        ON CONFLICT (idempotency_key) DO NOTHING
+        RETURNING idempotency_key
+    """,
+    "link_idempotency": """
+        UPDATE {schema}.scan_idempotency SET register_id = %s
+        WHERE idempotency_key = %s
+    """,
+    # Por tandas para no retener muchos bloqueos ni un WAL enorme de una vez
+    "purge_idempotency": """
+        DELETE FROM {schema}.scan_idempotency
+        WHERE idempotency_key IN (
+            SELECT idempotency_key FROM {schema}.scan_idempotency
+            WHERE applied_at < now() - %(retention_seconds)s * interval '1 second'
+            LIMIT %(batch_size)s
+        )
+    """,
+    # Límite de tiempo sólo para el resto de la transacción; devuelve el anterior
+    "set_statement_timeout": "SELECT current_setting('statement_timeout'), set_config('statement_timeout', %s, true)",
+    "restore_statement_timeout": "SELECT set_config('statement_timeout', %s, true)",
+    "side_location": """
+        SELECT p.position_name, pl.name, pl.type_zone
+        FROM {schema}.tbl_sides_of_positions s
+        JOIN {schema}.positions p ON p.position_id = s.position_id_fk
+        JOIN {schema}.production_lines pl ON pl.line_id = p.line_id
+        WHERE s.side_id = %s
+    """,
+    "logout_line": """
+        WITH closed AS (
+            UPDATE {schema}.registers
+            SET exit_hour = %s
+            WHERE line_id_fk = %s AND exit_hour IS NULL
+            RETURNING id_register
+        ),
+        presence_cleared AS (
+            DELETE FROM {schema}.employee_presence ep
+            USING closed c
+            WHERE ep.id_register = c.id_register
+        )
+        SELECT COUNT(*) FROM closed
+    """,
+    "logout_lines_bulk": """
+        WITH target_lines AS (
+            SELECT pl.line_id
+            FROM {schema}.production_lines pl
+            LEFT JOIN {schema}.business_unit bu ON pl.business_unit_fk = bu.bu_id
+            WHERE pl.line_id = ANY(%(line_ids)s::int[])
+               OR LOWER(bu.bu_name) = LOWER(%(business_unit)s)
+        ),
+        closed AS (
+            UPDATE {schema}.registers r
+            SET exit_hour = %(now)s
+            FROM target_lines t
+            WHERE r.line_id_fk = t.line_id AND r.exit_hour IS NULL
+            RETURNING r.line_id_fk, r.id_register
+        ),
+        presence_cleared AS (
+            DELETE FROM {schema}.employee_presence ep
+            USING closed c
+            WHERE ep.id_register = c.id_register
+        )
+        SELECT t.line_id, COUNT(c.line_id_fk)
+        FROM target_lines t
+        LEFT JOIN closed c ON c.line_id_fk = t.line_id
+        GROUP BY t.line_id
+        ORDER BY t.line_id
+    """,
+    "lock_registers": "LOCK TABLE {schema}.registers IN SHARE MODE",
+    "lock_presence": "LOCK TABLE {schema}.employee_presence IN SHARE MODE",
+    # Sides cuyo contador no coincide con los presentes: se fijan al valor real
+    "reconcile_side_occupancy": """
+        WITH actual AS (
+            SELECT side_id_fk AS side_id, COUNT(*) AS operators
+            FROM {schema}.employee_presence
+            WHERE side_id_fk IS NOT NULL
+            GROUP BY side_id_fk
+        ),
+        drift AS (
+            SELECT COALESCE(a.side_id, so.side_id) AS side_id,
+                   COALESCE(a.operators, 0) AS operators
+            FROM actual a
+            FULL JOIN {schema}.side_occupancy so ON so.side_id = a.side_id
+            WHERE COALESCE(a.operators, 0) <> COALESCE(so.operators, 0)
+        )
+        INSERT INTO {schema}.side_occupancy AS so (side_id, operators, version)
+        SELECT side_id, operators, 1 FROM drift
+        ON CONFLICT (side_id) DO UPDATE
+        SET operators = EXCLUDED.operators,
+            version = so.version + 1,
+            changed_at = clock_timestamp()
+    """,
+    "clear_presence": "DELETE FROM {schema}.employee_presence",
+    # Presencia = último registro de cada empleado, si está abierto
+    "rebuild_presence": """
+        INSERT INTO {schema}.employee_presence
+            (id_employee, id_register, side_id_fk, position_id_fk, line_id_fk, date_register, entry_hour)
+        SELECT id_employee, id_register, side_id_fk, position_id_fk, line_id_fk, date_register, entry_hour
+        FROM (
+            SELECT DISTINCT ON (id_employee) *
+            FROM {schema}.registers
+            ORDER BY id_employee, id_register DESC
+        ) last_register
+        WHERE exit_hour IS NULL
+    """,
+})
+
+
 class RegisterRepositorySQL(IRegisterRepository, ABC):
     """Implementación del repositorio de registros con Psycopg2."""
 
-    def __init__(self, schema: str):
+    def __init__(self, schema: str, occupancy_cache: Optional[OccupancyCache] = None,
+                 group_commit: Optional[GroupCommitExecutor] = None,
+                 statements: Optional[PreparedStatementRegistry] = None):
         self.schema = schema
+        # Consultas con el esquema ya resuelto (una vez por esquema y proceso)
+        self._sql = _QUERIES.compile(schema)
+        self._occupancy_cache = occupancy_cache
+        # Si se proporciona, los check-ins concurrentes comparten transacción
+        self._group_commit = group_commit
+        # Si se proporciona, las consultas calientes se ejecutan preparadas
+        self._statements = statements
+        # (generación de topología, cargado en, {side_id: ubicación})
+        self._side_locations: tuple[Optional[int], float, dict] = (None, 0.0, {})
 
     def _get_cursor(self):
         return get_db().cursor()
 
+    def get_group_commit_stats(self) -> Optional[dict]:
+        """Estadísticas del group commit; None si está desactivado."""
+        return self._group_commit.stats() if self._group_commit is not None else None
+
+    def _execute(self, cursor, name: str, query, params) -> None:
+        """Ejecuta como sentencia preparada si hay registro; si no, directo."""
+        if self._statements is not None:
+            self._statements.execute(cursor, name, query, params)
+        else:
+            cursor.execute(query, params)
+
+    def _invalidate_lines(self, line_ids) -> None:
+        """Invalida la caché de ocupación para las líneas tocadas (post-commit)."""
+        if self._occupancy_cache is not None:
+            self._occupancy_cache.invalidate_lines(line_ids)
+
     def get_last_register_type(self, card_number: int) -> str:
-        query = sql.SQL("""
-            SELECT CASE
-                WHEN exit_hour IS NULL THEN 'Exit'
-                ELSE 'Entry'
-                END AS register_type
-            FROM {schema}.registers
-            WHERE id_employee = %s
-            ORDER BY id_register DESC
-            LIMIT 1
-        """).format(schema=sql.Identifier(self.schema))
+        query = self._sql["last_register_type"]
 
         cursor = self._get_cursor()
-        cursor.execute(query, (card_number,))
+        self._execute(cursor, "last_register_type", query, (card_number,))
         result = cursor.fetchone()
         cursor.close()
 
@@ -41,18 +343,10 @@ class RegisterRepositorySQL(IRegisterRepository, ABC):
         return result[0]
 
     def get_last_station_for_user(self, user_id: int) -> Optional[dict]:
-        query = sql.SQL("""
-            SELECT p.position_name, pl.name, pl.type_zone
-            FROM {schema}.registers r
-            JOIN {schema}.positions p ON r.position_id_fk = p.position_id
-            JOIN {schema}.production_lines pl ON p.line_id = pl.line_id
-            WHERE r.id_employee = %s
-            ORDER BY r.id_register DESC
-            LIMIT 1
-        """).format(schema=sql.Identifier(self.schema))
+        query = self._sql["last_station_for_user"]
 
         cursor = self._get_cursor()
-        cursor.execute(query, (user_id,))
+        cursor.execute(query, {"user_id": user_id})
         result = cursor.fetchone()
         cursor.close()
 
@@ -67,85 +361,296 @@ class RegisterRepositorySQL(IRegisterRepository, ABC):
             "line_name": line_name
         }
 
-    def register_entry_or_assignment(self, user_id: int, side_id: int) -> None:
+    def get_scan_result(self, card_number: int) -> dict:
+        """
+        Datos de la pantalla de resultado de un escaneo en una sola consulta:
+        empleado, tipo del último registro y línea/estación del último
+        registro.
+
+        :return: Diccionario con `user_id`, `name`, `last_name` (None si la
+                 tarjeta no está registrada), `register_type` ('Exit' si hay
+                 un registro abierto, 'Entry' si no) y `station_name` /
+                 `line_name` (None si el empleado no tiene registros).
+        """
+        query = self._sql["scan_result"]
+
+        cursor = self._get_cursor()
+        try:
+            cursor.execute(query, {"card_number": card_number, "card_text": str(card_number)})
+            user_id, name, last_name, is_open, station, line, type_zone = cursor.fetchone()
+        finally:
+            cursor.close()
+
+        return {
+            "user_id": user_id,
+            "name": name,
+            "last_name": last_name,
+            "register_type": "Exit" if is_open else "Entry",
+            "station_name": station,
+            # Mismo formato que get_last_station_for_user
+            "line_name": f"{type_zone} {line}".strip() if line is not None else None,
+        }
+
+    def _execute_checkin(self, cur, user_id: int, side_id: int,
+                         scanned_at: datetime) -> tuple[Optional[int], list]:
+        """
+        Ejecuta el check-in sin confirmar la transacción.
+
+        :return: (ID del nuevo registro, líneas tocadas).
+        :raises ValueError: Si el side no existe; el llamador debe revertir.
+        """
+        self._execute(cur, "checkin", self._sql["checkin"], {
+            "user_id": user_id,
+            "side_id": side_id,
+            "now_time": scanned_at.strftime("%H:%M:%S"),
+            "today": scanned_at.strftime("%Y-%m-%d"),
+        })
+        closed_id, closed_line, new_id, new_line = cur.fetchone()
+        logger.debug("Check-in user %s: closed %s, inserted %s", user_id, closed_id, new_id)
+
+        if side_id > 0 and new_id is None:
+            # Misma semántica que antes: sin side válido no se cierra nada
+            raise ValueError(f"Side con ID {side_id} no encontrado")
+
+        touched = [
+            line for line, register in ((closed_line, closed_id), (new_line, new_id))
+            if register is not None
+        ]
+        return new_id, touched
+
+    def register_entry_or_assignment(self, user_id: int, side_id: int) -> Optional[int]:
+        """
+        Cierra el registro abierto del usuario (si existe) y, si `side_id` es
+        válido, abre uno nuevo en ese side, todo en una sola sentencia
+        (CTE con UPDATE/INSERT ... RETURNING).
+
+        Con group commit activo, el escaneo se aplica junto con los que
+        lleguen en la misma ventana, en una sola transacción; el fallo de
+        otro escaneo del lote no afecta a éste.
+
+        :return: ID del nuevo registro, o None si sólo se cerró el abierto.
+        :raises ValueError: Si el side no existe (no se cierra nada).
+        :raises RuntimeError: Con group commit, si este escaneo falló por un
+                              error transitorio de Postgres (timeout, deadlock).
+        """
+        if self._group_commit is not None:
+            scan = {"key": None, "user_id": user_id, "side_id": side_id,
+                    "scanned_at": datetime.now()}
+            result = self._group_commit.submit(scan, self.apply_scans)
+            if result["status"] == "rejected":
+                raise ValueError(result["error"])
+            if result["status"] in ("failed", "deferred"):
+                raise RuntimeError(result["error"])
+            return result["register_id"]
+
         cur = self._get_cursor()
+        try:
+            new_id, touched_lines = self._execute_checkin(cur, user_id, side_id, datetime.now())
+            cur.connection.commit()
+            self._invalidate_lines(touched_lines)
+            return new_id
+
+        except Exception:
+            cur.connection.rollback()
+            raise
+        finally:
+            cur.close()
+
+    def apply_scans(self, scans: list[dict]) -> list[dict]:
+        """
+        Aplica en orden un lote de escaneos diferidos, en una sola transacción.
+
+        Cada escaneo (`key`, `user_id`, `side_id`, `scanned_at`) corre en su
+        propio SAVEPOINT y, si trae `key`, registra su clave de idempotencia
+        en `scan_idempotency`. Un escaneo cuya clave ya existe se omite, y
+        uno con un side inexistente o con datos que Postgres rechaza
+        (DataError/IntegrityError) se revierte solo, sin tumbar el lote.
+        Cualquier otro error de Postgres que no sea de conexión (timeout,
+        deadlock, ...) también se revierte solo y el escaneo queda como
+        'failed' para reintentarlo; los escaneos siguientes del mismo
+        empleado en el lote quedan como 'deferred' (no cuentan como intento)
+        para no alterar su orden. Un lote de
+        varios escaneos bloquea antes sus contadores de side_occupancy en
+        orden de side_id (ver `_lock_side_counters`).
 
+        :return: Un resultado por escaneo: `key`, `status` ('applied',
+                 'duplicate', 'rejected', 'failed' o 'deferred'),
+                 `register_id` y `error`.
+        :raises Exception: Errores de conexión/servidor: se revierte el lote
+                           completo para reintentarlo.
+        """
+        q_claim = self._sql["claim_idempotency"]
+        q_link = self._sql["link_idempotency"]
+
+        results = []
+        touched_lines = set()
+        # Empleados con un escaneo fallido en este lote
+        deferred = set()
+        cur = self._get_cursor()
         try:
-            # 1) Buscar registro abierto (usuario actualmente trabajando)
-            q_open = sql.SQL("""
-                SELECT id_register
-                FROM {schema}.registers
-                WHERE id_employee = %s AND exit_hour IS NULL
-                ORDER BY id_register DESC
-                LIMIT 1
-            """).format(schema=sql.Identifier(self.schema))
-            cur.execute(q_open, (user_id,))
-            open_row = cur.fetchone()
-            print(f"DEBUG_REPO: Open register search for user {user_id}. Found: {open_row}")
+            if len(scans) > 1:
+                self._lock_side_counters(cur, scans)
+            for scan in scans:
+                key = scan.get("key")
+                if scan["user_id"] in deferred:
+                    results.append({"key": key, "status": "deferred", "register_id": None,
+                                    "error": "Pospuesto: falló un escaneo anterior del empleado"})
+                    continue
+
+                cur.execute("SAVEPOINT scan")
+                try:
+                    if key is not None:
+                        cur.execute(q_claim, (key,))
+                        if cur.fetchone() is None:
+                            cur.execute("RELEASE SAVEPOINT scan")
+                            results.append({"key": key, "status": "duplicate",
+                                            "register_id": None, "error": None})
+                            continue
+
+                    new_id, touched = self._execute_checkin(
+                        cur, scan["user_id"], scan["side_id"], scan["scanned_at"])
+                    if key is not None:
+                        cur.execute(q_link, (new_id, key))
+                    cur.execute("RELEASE SAVEPOINT scan")
+                except (ValueError, psycopg2.DataError, psycopg2.IntegrityError) as e:
+                    # Errores propios del escaneo (side inexistente, valor
+                    # fuera de rango): se rechaza sólo éste, no el lote
+                    cur.execute("ROLLBACK TO SAVEPOINT scan")
+                    results.append({"key": key, "status": "rejected",
+                                    "register_id": None, "error": str(e)})
+                    continue
+                except psycopg2.Error as e:
+                    if _is_batch_error(e):
+                        raise
+                    # Error transitorio de este escaneo: se reintenta después
+                    cur.execute("ROLLBACK TO SAVEPOINT scan")
+                    deferred.add(scan["user_id"])
+                    results.append({"key": key, "status": "failed",
+                                    "register_id": None, "error": str(e)})
+                    continue
+
+                touched_lines.update(touched)
+                results.append({"key": key, "status": "applied",
+                                "register_id": new_id, "error": None})
 
-            now_time = datetime.now().strftime("%H:%M:%S")
-            today_date = datetime.now().strftime("%Y-%m-%d")
-
-            # Si hay un registro abierto, lo cerramos primero
-            if open_row:
-                q_close = sql.SQL("""
-                    UPDATE {schema}.registers
-                    SET exit_hour = %s WHERE id_register = %s
-                """).format(schema=sql.Identifier(self.schema))
-                cur.execute(q_close, (now_time, open_row[0]))
-                # NO hacemos return aquí para permitir el "Clock In" inmediato en la nueva estación
-                print(f"DEBUG_REPO: Closed previous register {open_row[0]}")
-
-            # Si se proporcionó un side_id válido, creamos el NUEVO registro de entrada
-            if side_id > 0:
-                q_side = sql.SQL("""
-                    SELECT p.line_id, p.position_id
-                    FROM {schema}.tbl_sides_of_positions s
-                    JOIN {schema}.positions p ON p.position_id = s.position_id_fk
-                    WHERE s.side_id = %s
-                    LIMIT 1
-                """).format(schema=sql.Identifier(self.schema))
-                cur.execute(q_side, (side_id,))
-                side_row = cur.fetchone()
-                
-                if not side_row:
-                    raise ValueError(f"Side con ID {side_id} no encontrado")
-
-                line_id, position_id = side_row[0], side_row[1]
-
-                q_insert = sql.SQL("""
-                    INSERT INTO {schema}.registers
-                        (id_employee, date_register, entry_hour, line_id_fk, position_id_fk, side_id_fk)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    RETURNING id_register
-                """).format(schema=sql.Identifier(self.schema))
-                cur.execute(q_insert, (user_id, today_date, now_time, line_id, position_id, side_id))
-                new_id = cur.fetchone()[0]
-                print(f"DEBUG_REPO: Inserted new register with ID: {new_id}")
-            
             cur.connection.commit()
+            self._invalidate_lines(touched_lines)
+            return results
+
+        except Exception:
+            cur.connection.rollback()
+            raise
+        finally:
+            cur.close()
+
+    def _lock_side_counters(self, cur, scans: list[dict]) -> None:
+        """
+        Toma al inicio del lote, en orden de side_id, los bloqueos de
+        side_occupancy que los triggers tomarían escaneo por escaneo. Sin
+        esto, dos lotes que cruzan los mismos sides (5→3 y 3→5) se
+        bloquean mutuamente. Si falla por algo que no es de conexión, el
+        lote sigue sin el bloqueo previo.
+        """
+        side_ids = sorted({s["side_id"] for s in scans if 0 < s["side_id"] <= _MAX_INT4})
+        user_ids = sorted({s["user_id"] for s in scans if 0 < s["user_id"] <= _MAX_INT8})
+        try:
+            cur.execute(self._sql["lock_side_counters"],
+                        {"side_ids": side_ids, "user_ids": user_ids})
+        except psycopg2.Error as e:
+            if _is_batch_error(e):
+                raise
+            # Aún no hay nada aplicado en la transacción
+            cur.connection.rollback()
 
+    def purge_scan_idempotency(self, retention_seconds: float, batch_size: int = 5000) -> int:
+        """
+        Borra las claves de idempotencia aplicadas hace más de
+        `retention_seconds`, en tandas de `batch_size` confirmadas por
+        separado. La ventana debe superar cualquier reenvío posible del
+        diario; pasada, una clave ya no protege de nada.
+
+        :return: Claves borradas.
+        """
+        params = {"retention_seconds": float(retention_seconds), "batch_size": int(batch_size)}
+        deleted = 0
+        cur = self._get_cursor()
+        try:
+            while True:
+                cur.execute(self._sql["purge_idempotency"], params)
+                count = cur.rowcount
+                cur.connection.commit()
+                deleted += count
+                if count < params["batch_size"]:
+                    return deleted
         except Exception:
             cur.connection.rollback()
             raise
         finally:
             cur.close()
 
+    def get_side_location(self, side_id: int, timeout_ms: Optional[int] = None) -> Optional[dict]:
+        """
+        Línea y estación de un side, con el mismo formato que get_last_station_for_user.
+
+        Con caché de ocupación, las ubicaciones encontradas se guardan en
+        memoria hasta el siguiente cambio de topología del worker (o
+        `_SIDE_LOCATION_MAX_AGE`), así que un side ya visto no consulta
+        Postgres.
+
+        :param timeout_ms: Si se indica, `statement_timeout` para la consulta;
+                           al vencer se lanza QueryCanceled.
+        """
+        generation = self._occupancy_cache.topology_generation \
+            if self._occupancy_cache is not None else None
+        cached_generation, loaded_at, locations = self._side_locations
+        fresh = (generation is not None and cached_generation == generation
+                 and time.monotonic() - loaded_at < _SIDE_LOCATION_MAX_AGE)
+        if fresh and side_id in locations:
+            return dict(locations[side_id])
+
+        cursor = self._get_cursor()
+        try:
+            if timeout_ms is not None:
+                cursor.execute(self._sql["set_statement_timeout"], (f"{int(timeout_ms)}ms",))
+                previous_timeout = cursor.fetchone()[0]
+            cursor.execute(self._sql["side_location"], (side_id,))
+            result = cursor.fetchone()
+            if timeout_ms is not None:
+                cursor.execute(self._sql["restore_statement_timeout"], (previous_timeout,))
+        except psycopg2.Error:
+            # La transacción quedó abortada (p. ej. por el timeout)
+            cursor.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        if not result:
+            return None
+        location = {
+            "station_name": result[0],
+            "line_name": f"{result[2]} {result[1]}".strip()
+        }
+        if generation is not None:
+            if not fresh:
+                locations = {}
+                self._side_locations = (generation, time.monotonic(), locations)
+            locations[side_id] = location
+        return dict(location)
+
     def logout_active_users_in_line(self, line_id: int) -> int:
         cur = self._get_cursor()
         try:
             now_time = datetime.now().strftime("%H:%M:%S")
             
             # Update all active registers (exit_hour IS NULL) for the given line
-            query = sql.SQL("""
-                UPDATE {schema}.registers
-                SET exit_hour = %s
-                WHERE line_id_fk = %s AND exit_hour IS NULL
-            """).format(schema=sql.Identifier(self.schema))
+            # (and clear their presence rows in the same statement)
+            query = self._sql["logout_line"]
             
             cur.execute(query, (now_time, line_id))
-            affected_rows = cur.rowcount
+            affected_rows = cur.fetchone()[0]
             cur.connection.commit()
+            if affected_rows:
+                self._invalidate_lines([line_id])
             
             print(f"DEBUG_REPO: Logout general line {line_id}. Affected rows: {affected_rows}")
             return affected_rows
@@ -156,3 +661,94 @@ class RegisterRepositorySQL(IRegisterRepository, ABC):
             raise
         finally:
             cur.close()
+
+    def logout_active_users_bulk(self, line_ids: Optional[list[int]] = None,
+                                 business_unit: Optional[str] = None) -> dict[int, int]:
+        """
+        Salida general de varias líneas (las indicadas y/o todas las de una
+        unidad de negocio) con un solo UPDATE ... RETURNING y un solo commit.
+
+        :param line_ids: IDs de línea a cerrar.
+        :param business_unit: Nombre de la unidad de negocio (sin distinguir
+                              mayúsculas); se cierran todas sus líneas.
+        :return: Registros cerrados por línea, incluidas las líneas con 0.
+        """
+        query = self._sql["logout_lines_bulk"]
+
+        cur = self._get_cursor()
+        try:
+            cur.execute(query, {
+                "line_ids": list(line_ids or []),
+                "business_unit": business_unit,
+                "now": datetime.now().strftime("%H:%M:%S"),
+            })
+            counts = {line_id: count for line_id, count in cur.fetchall()}
+            cur.connection.commit()
+        except Exception as e:
+            cur.connection.rollback()
+            print(f"ERROR_REPO: logout_active_users_bulk failed: {e}")
+            raise
+        finally:
+            cur.close()
+
+        # Una sola invalidación para todas las líneas afectadas
+        touched = [line_id for line_id, count in counts.items() if count]
+        if touched:
+            self._invalidate_lines(touched)
+        print(f"DEBUG_REPO: Logout general bulk {len(counts)} lines. Affected rows: {sum(counts.values())}")
+        return counts
+
+    def rebuild_presence(self) -> int:
+        """
+        Reconstruye `employee_presence` desde `registers` (el último registro
+        de cada empleado, si está abierto), en una sola transacción.
+
+        Bloquea las escrituras en `registers` mientras tanto para que ningún
+        check-in quede fuera de la proyección; las lecturas siguen.
+
+        :return: Empleados presentes tras la reconstrucción.
+        """
+        cur = self._get_cursor()
+        try:
+            cur.execute(self._sql["lock_registers"])
+            cur.execute(self._sql["clear_presence"])
+            cur.execute(self._sql["rebuild_presence"])
+            present = cur.rowcount
+            cur.connection.commit()
+        except Exception as e:
+            cur.connection.rollback()
+            print(f"ERROR_REPO: rebuild_presence failed: {e}")
+            raise
+        finally:
+            cur.close()
+
+        # La presencia alimenta la ocupación: se vacía la caché completa
+        if self._occupancy_cache is not None:
+            self._occupancy_cache.invalidate_all()
+        return present
+
+    def reconcile_side_occupancy(self) -> int:
+        """
+        Repara los contadores de `side_occupancy` que se hayan desviado de
+        `employee_presence` (p. ej. tras ediciones manuales con los triggers
+        desactivados). Bloquea las escrituras de presencia mientras compara.
+
+        :return: Número de sides corregidos.
+        """
+        cur = self._get_cursor()
+        try:
+            cur.execute(self._sql["lock_presence"])
+            cur.execute(self._sql["reconcile_side_occupancy"])
+            repaired = cur.rowcount
+            cur.connection.commit()
+        except Exception as e:
+            cur.connection.rollback()
+            print(f"ERROR_REPO: reconcile_side_occupancy failed: {e}")
+            raise
+        finally:
+            cur.close()
+
+        if repaired and self._occupancy_cache is not None:
+            self._occupancy_cache.invalidate_all()
+        print(f"DEBUG_REPO: reconcile_side_occupancy repaired {repaired} sides")
+        return repaired
@@ -0,0 +1,287 @@
+"""
+app/infra/db/scan_journal.py
+Diario local (SQLite en modo WAL) de escaneos pendientes de escribir en Postgres.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS scans (
+        seq             INTEGER PRIMARY KEY AUTOINCREMENT,
+        idempotency_key TEXT NOT NULL UNIQUE,
+        user_id         INTEGER NOT NULL,
+        side_id         INTEGER NOT NULL,
+        scanned_at      TEXT NOT NULL,
+        status          TEXT NOT NULL DEFAULT 'pending',
+        attempts        INTEGER NOT NULL DEFAULT 0,
+        last_error      TEXT
+    );
+    CREATE INDEX IF NOT EXISTS ix_scans_pending ON scans (status, seq);
+    CREATE TABLE IF NOT EXISTS flusher_lease (
+        id         INTEGER PRIMARY KEY CHECK (id = 1),
+        owner      TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+"""
+
+
+class ScanJournal:
+    """
+    Cola durable de escaneos de gafete (write-behind).
+
+    `append` confirma con fsync (WAL + synchronous=FULL) antes de volver, así
+    que un escaneo aceptado sobrevive a la caída del worker. Todos los
+    workers de gunicorn comparten el mismo archivo; el orden de llegada
+    (`seq`) es el orden de aplicación en Postgres.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 30.0, max_attempts: int = 20):
+        """
+        :param path: Ruta del archivo SQLite (se crea si no existe).
+        :param lease_seconds: Vigencia del turno de un flusher antes de que
+                              otro worker pueda tomarlo.
+        :param max_attempts: Intentos fallidos de un escaneo antes de pasarlo
+                             a rechazado.
+        """
+        self._path = path
+        self._lease_seconds = float(lease_seconds)
+        self._max_attempts = int(max_attempts)
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+
+    def append(self, user_id: int, side_id: int, idempotency_key: Optional[str] = None,
+               scanned_at: Optional[datetime] = None) -> str:
+        """
+        Guarda un escaneo y devuelve su clave de idempotencia. Reenviar la
+        misma clave (doble envío del kiosco) no duplica el escaneo.
+        """
+        key = idempotency_key or uuid.uuid4().hex
+        scanned_at = scanned_at or datetime.now()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO scans (idempotency_key, user_id, side_id, scanned_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, user_id, side_id, scanned_at.isoformat()),
+            )
+        return key
+
+    def pending(self, limit: int) -> list[dict]:
+        """Escaneos pendientes más antiguos, en orden de llegada."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, idempotency_key, user_id, side_id, scanned_at FROM scans "
+                "WHERE status = 'pending' ORDER BY seq LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {"seq": seq, "key": key, "user_id": user_id, "side_id": side_id,
+             "scanned_at": datetime.fromisoformat(scanned_at)}
+            for seq, key, user_id, side_id, scanned_at in rows
+        ]
+
+    def complete(self, results: list[dict]) -> None:
+        """
+        Registra el resultado de un lote: los aplicados o duplicados se
+        borran, los rechazados (p. ej. side inexistente) se conservan con
+        su error para revisión y ya no se reintentan, y los fallidos por un
+        error transitorio siguen pendientes con el intento anotado hasta
+        `max_attempts`, tras lo cual pasan a rechazados. Los pospuestos
+        ('deferred') siguen pendientes sin contar intento.
+        """
+        done = [(r["key"],) for r in results if r["status"] in ("applied", "duplicate")]
+        rejected = [(r["error"], r["key"]) for r in results if r["status"] == "rejected"]
+        failed = [(r["error"], self._max_attempts, r["key"])
+                  for r in results if r["status"] == "failed"]
+        exhausted = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("DELETE FROM scans WHERE idempotency_key = ?", done)
+                self._conn.executemany(
+                    "UPDATE scans SET status = 'rejected', last_error = ? WHERE idempotency_key = ?",
+                    rejected,
+                )
+                self._conn.executemany(
+                    "UPDATE scans SET attempts = attempts + 1, last_error = ?, "
+                    "status = CASE WHEN attempts + 1 >= ? THEN 'rejected' ELSE status END "
+                    "WHERE idempotency_key = ?",
+                    failed,
+                )
+                if failed:
+                    marks = ",".join("?" * len(failed))
+                    exhausted = self._conn.execute(
+                        f"SELECT idempotency_key, last_error FROM scans "
+                        f"WHERE status = 'rejected' AND idempotency_key IN ({marks})",
+                        [key for _, _, key in failed],
+                    ).fetchall()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        for key, error in exhausted:
+            logger.error("Escaneo %s rechazado tras %d intentos fallidos: %s",
+                         key, self._max_attempts, error)
+
+    def record_failure(self, seqs: list[int], error: str) -> None:
+        """
+        Anota el error de un lote que no llegó a aplicarse (Postgres no
+        disponible). No cuenta como intento del escaneo: una caída larga de
+        Postgres no debe agotar `max_attempts`.
+        """
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE scans SET last_error = ? WHERE seq = ?",
+                [(error, seq) for seq in seqs],
+            )
+
+    def acquire_lease(self) -> bool:
+        """Toma o renueva el turno de flusher; sólo un worker vacía el diario a la vez."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT owner, expires_at FROM flusher_lease WHERE id = 1").fetchone()
+                if row is None or row[0] == self._owner or row[1] < now:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO flusher_lease (id, owner, expires_at) VALUES (1, ?, ?)",
+                        (self._owner, now + self._lease_seconds),
+                    )
+                    acquired = True
+                else:
+                    acquired = False
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return acquired
+
+    def backlog(self) -> dict:
+        """Métrica del diario: pendientes, rechazados y antigüedad del más viejo."""
+        with self._lock:
+            pending, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(scanned_at) FROM scans WHERE status = 'pending'").fetchone()
+            rejected = self._conn.execute(
+                "SELECT COUNT(*) FROM scans WHERE status = 'rejected'").fetchone()[0]
+        age = (datetime.now() - datetime.fromisoformat(oldest)).total_seconds() if oldest else 0.0
+        return {
+            "pending": pending,
+            "rejected": rejected,
+            "oldest_pending_seconds": round(age, 1),
+        }
+
+
+class ScanJournalFlusher:
+    """
+    Hilo en segundo plano que reproduce el diario en Postgres por lotes.
+
+    Cada worker arranca uno, pero sólo el que tiene el turno (lease) aplica
+    escaneos. Un escaneo que falla por un error transitorio se revierte solo
+    y se reintenta en el siguiente ciclo; si falla la conexión, el lote
+    completo se revierte y se reintenta con espera exponencial. Las claves
+    de idempotencia evitan duplicados si un lote se confirmó en Postgres
+    pero no alcanzó a marcarse en el diario.
+
+    Cada `purge_interval_seconds` el flusher con el turno borra de Postgres
+    las claves más viejas que `retention_seconds`, salvo que el diario
+    tenga un escaneo pendiente más viejo que esa ventana (podría ser un
+    reenvío de una clave ya aplicada).
+    """
+
+    def __init__(self, app, journal: ScanJournal, register_repo,
+                 batch_size: int = 100, interval_seconds: float = 1.0,
+                 max_backoff_seconds: float = 60.0,
+                 retention_seconds: float = 7 * 24 * 3600,
+                 purge_interval_seconds: float = 3600.0):
+        self._app = app
+        self._journal = journal
+        self._register_repo = register_repo
+        self._batch_size = int(batch_size)
+        self._interval = float(interval_seconds)
+        self._max_backoff = float(max_backoff_seconds)
+        self._retention = float(retention_seconds)
+        self._purge_interval = float(purge_interval_seconds)
+        self._purged_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="scan-journal-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def flush_once(self) -> int:
+        """Aplica lotes hasta vaciar el diario. Devuelve cuántos escaneos procesó."""
+        processed = 0
+        while True:
+            # Se renueva el turno en cada lote; si otro worker lo tomó, se cede
+            if not self._journal.acquire_lease():
+                return processed
+            batch = self._journal.pending(self._batch_size)
+            if not batch:
+                return processed
+            try:
+                with self._app.app_context():
+                    results = self._register_repo.apply_scans(batch)
+            except Exception as e:
+                self._journal.record_failure([scan["seq"] for scan in batch], str(e))
+                raise
+            self._journal.complete(results)
+            processed += len(batch)
+            if any(r["status"] in ("failed", "deferred") for r in results):
+                # Los fallidos siguen al frente del diario: se reintentan en el siguiente ciclo
+                return processed
+
+    def purge_once(self) -> Optional[int]:
+        """
+        Borra las claves de idempotencia vencidas si toca y se tiene el turno.
+
+        :return: Claves borradas, o None si no se purgó.
+        """
+        now = time.monotonic()
+        if self._purged_at and now - self._purged_at < self._purge_interval:
+            return None
+        if not self._journal.acquire_lease():
+            return None
+        self._purged_at = now
+        oldest = self._journal.backlog()["oldest_pending_seconds"]
+        if oldest >= self._retention:
+            logger.error("Purga de claves de idempotencia omitida: hay un escaneo "
+                         "pendiente de hace %.0f s (retención %.0f s)", oldest, self._retention)
+            return None
+        with self._app.app_context():
+            return self._register_repo.purge_scan_idempotency(self._retention)
+
+    def _run(self) -> None:
+        backoff = self._interval
+        while not self._stop.is_set():
+            try:
+                self.flush_once()
+                self.purge_once()
+                backoff = self._interval
+            except Exception as e:
+                logger.error("Fallo al vaciar el diario de escaneos: %s", e)
+                backoff = min(backoff * 2, self._max_backoff)
+            self._stop.wait(backoff)
@@ -3,6 +3,7 @@ src/infra/db/user_repository_sql.py
 Implementación del repositorio de usuarios usando SQLAlchemy.
 """
 
+from sqlalchemy import text
 from app.extensions import db
 from app.domain.entities.user import User
 from app.domain.repositories.IUserRepository import IUserRepository
@@ -34,3 +35,45 @@ class UserRepositorySQL(IUserRepository):
             return None
 
         return model.to_entity()
+
+    def list_employees(self, ids: Optional[list[int]] = None) -> list[tuple[Optional[str], User]]:
+        """
+        Lista empleados como pares (numero_tarjeta tal como está guardado,
+        entidad), ordenados por id_empleado.
+
+        :param ids: Si se indica, sólo esos id_empleado (los que no existen
+                    se omiten).
+        """
+        query = db.session.query(UserModel)
+        if ids is not None:
+            query = query.filter(UserModel.id_empleado.in_(ids))
+        models = query.order_by(UserModel.id_empleado).all()
+
+        return [(model.numero_tarjeta, model.to_entity()) for model in models]
+
+    def employee_changes_watermark(self) -> int:
+        """
+        Marca de agua para `employee_changes_since`: el xmin de la
+        instantánea actual. Toda transacción anterior ya terminó, así que
+        sus cambios se ven en cualquier lectura posterior.
+        """
+        return db.session.execute(text(
+            "SELECT txid_snapshot_xmin(txid_current_snapshot())"
+        )).scalar_one()
+
+    def employee_changes_since(self, watermark: int) -> tuple[int, list[int]]:
+        """
+        Empleados insertados, editados o borrados desde `watermark`, según
+        la bitácora `employee_changes` que llenan los triggers de la tabla.
+
+        :return: (nueva marca de agua, id_empleado afectados). La marca y
+                 los cambios salen de la misma instantánea; un cambio de una
+                 transacción aún abierta vuelve a salir en la siguiente llamada.
+        """
+        schema = UserModel.__table__.schema
+        watermark_now, ids = db.session.execute(text(
+            f'SELECT txid_snapshot_xmin(txid_current_snapshot()), '
+            f'ARRAY(SELECT DISTINCT id_empleado FROM "{schema}".employee_changes '
+            f'WHERE txid >= :watermark)'
+        ), {"watermark": watermark}).one()
+        return watermark_now, list(ids)
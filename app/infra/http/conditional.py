@@ -0,0 +1,69 @@
+# app/infra/http/conditional.py
+
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Optional
+
+from flask import current_app, make_response, request
+
+# (etag, epoch de la última modificación) o None si no hay validador
+Validator = Optional[tuple[str, float]]
+
+
+def conditional(validator: Callable[..., Validator]):
+    """
+    Decorador de vistas que responde con ETag / Last-Modified.
+
+    `validator` recibe los mismos argumentos que la vista y devuelve la
+    versión de los datos sin leerlos: las versiones que los triggers
+    mantienen en Postgres, iguales en todos los workers. Si el cliente ya
+    tiene esa versión (If-None-Match, o If-Modified-Since cuando no manda
+    ETag) se devuelve 304 sin ejecutar la vista, es decir, sin renderizar
+    ni consultar los datos.
+
+    Args:
+        validator (Callable): Función que devuelve (etag, epoch) o None.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+            # Se lee antes que los datos: si cambian entre medias, la
+            # respuesta lleva datos más nuevos que su ETag y el cliente
+            # sólo vuelve a descargarla en la siguiente revalidación
+            current = validator(*args, **kwargs)
+            if current is None:
+                return view(*args, **kwargs)
+
+            etag, modified = current
+            last_modified = datetime.fromtimestamp(int(modified), tz=timezone.utc)
+
+            if _is_fresh(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            # Last-Modified tiene resolución de segundos: si el último cambio
+            # es de este mismo segundo, otro cambio en él no se distinguiría
+            # con If-Modified-Since, así que esa respuesta sólo lleva ETag
+            if int(time.time()) > int(modified):
+                response.last_modified = last_modified
+            # El navegador y el proxy pueden guardarla, pero deben revalidar
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+def _is_fresh(etag: str, last_modified: datetime) -> bool:
+    """Indica si la copia del cliente sigue vigente (RFC 9110: ETag primero)."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
@@ -0,0 +1,193 @@
+"""
+app/infra/media/photo_derivatives.py
+Versiones reducidas y comprimidas de las fotos de empleados.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+try:  # Pillow es opcional: sin él se sirven las fotos originales
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - depende del entorno
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# Anchos usados por successful.html: 300 px (styles.css) y 2x para pantallas densas
+DEFAULT_WIDTHS = (300, 600)
+
+
+class PhotoDerivatives:
+    """
+    Genera y cachea en disco derivados JPEG de las fotos de `img/media`.
+
+    - Nombres con hash del contenido (`<foto>-<ancho>w-<hash>.jpg`, con la
+      extensión de la original: `42.png-300w-<hash>.jpg`), así que pueden
+      servirse con caché de larga duración: si la foto cambia, cambia el
+      nombre, y `42.png` y `42.jpg` no comparten derivados.
+    - Se generan bajo demanda en la primera petición o en bloque con
+      `flask photos-derive`.
+    - El mtime de la foto original se revisa a lo sumo cada
+      `recheck_seconds`; si cambió, se regeneran y se borran los anteriores.
+    - La escritura es atómica (archivo temporal + os.replace), así que
+      varios workers pueden generar el mismo derivado sin corromperlo.
+    """
+
+    def __init__(self, source_dir: str, cache_dir: str, enabled: bool = True,
+                 widths=DEFAULT_WIDTHS, quality: int = 80, recheck_seconds: float = 60.0):
+        """
+        :param source_dir: Carpeta de fotos originales.
+        :param cache_dir: Carpeta donde se guardan los derivados.
+        :param enabled: Si es False (o falta Pillow) se usan las originales.
+        :param widths: Anchos a generar, en píxeles.
+        :param quality: Calidad JPEG (1-95).
+        :param recheck_seconds: Intervalo mínimo entre revisiones del mtime de una foto.
+        """
+        self._source_dir = source_dir
+        self._cache_dir = cache_dir
+        self._enabled = bool(enabled)
+        self._widths = tuple(sorted(int(w) for w in widths))
+        self._quality = int(quality)
+        self._recheck_seconds = float(recheck_seconds)
+        self._lock = threading.Lock()
+        # foto -> (mtime_ns, hash del contenido, revisado en)
+        self._index: dict[str, tuple[int, str, float]] = {}
+        # Derivados que ya se sabe que existen en disco (evita un stat por petición)
+        self._ready: set[str] = set()
+        self._generated = 0
+        self._failures = 0
+
+    @property
+    def available(self) -> bool:
+        """True si está activado y Pillow está instalado."""
+        return self._enabled and Image is not None
+
+    @property
+    def cache_dir(self) -> str:
+        return self._cache_dir
+
+    @property
+    def widths(self) -> tuple:
+        return self._widths
+
+    def get(self, filename: str) -> Optional[dict[int, str]]:
+        """
+        Derivados de una foto, generándolos si faltan.
+
+        :return: {ancho: nombre del archivo en `cache_dir`}, o None si no
+                 están disponibles (sin Pillow, foto inexistente o ilegible).
+        """
+        if not self.available:
+            return None
+        try:
+            digest = self._digest(filename)
+            names = {width: self._name(filename, width, digest) for width in self._widths}
+            missing = [w for w, name in names.items()
+                       if name not in self._ready
+                       and not os.path.exists(os.path.join(self._cache_dir, name))]
+            if missing:
+                self._generate(filename, {w: names[w] for w in missing})
+                # Borra los derivados de versiones anteriores de la foto
+                self._remove_derivatives(filename, keep=set(names.values()))
+            with self._lock:
+                self._ready.update(names.values())
+            return names
+        except Exception as e:
+            self._failures += 1
+            logger.warning("No se pudo generar el derivado de %s: %s", filename, e)
+            return None
+
+    def generate_all(self, force: bool = False) -> dict:
+        """
+        Genera los derivados de todas las fotos (comando CLI).
+
+        :param force: Regenerar aunque ya existan.
+        :return: Conteo de fotos procesadas y fallidas.
+        """
+        if force:
+            with self._lock:
+                self._index.clear()
+                self._ready.clear()
+        processed = failed = 0
+        with os.scandir(self._source_dir) as entries:
+            filenames = sorted(e.name for e in entries if e.is_file())
+        for filename in filenames:
+            if force:
+                self._remove_derivatives(filename, keep=set())
+            if self.get(filename) is None:
+                failed += 1
+            else:
+                processed += 1
+        return {"processed": processed, "failed": failed}
+
+    def _digest(self, filename: str) -> str:
+        """Hash del contenido, recalculado sólo si cambió el mtime."""
+        now = time.monotonic()
+        cached = self._index.get(filename)
+        if cached and now - cached[2] < self._recheck_seconds:
+            return cached[1]
+
+        path = os.path.join(self._source_dir, filename)
+        mtime = os.stat(path).st_mtime_ns
+        if cached and cached[0] == mtime:
+            digest = cached[1]
+        else:
+            hasher = hashlib.sha1()
+            hasher.update(f"{self._quality}:".encode())
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(65536), b""):
+                    hasher.update(chunk)
+            digest = hasher.hexdigest()[:12]
+        with self._lock:
+            self._index[filename] = (mtime, digest, now)
+        return digest
+
+    @staticmethod
+    def _name(filename: str, width: int, digest: str) -> str:
+        return f"{filename}-{width}w-{digest}.jpg"
+
+    def _generate(self, filename: str, targets: dict[int, str]) -> None:
+        os.makedirs(self._cache_dir, exist_ok=True)
+        with Image.open(os.path.join(self._source_dir, filename)) as source:
+            image = ImageOps.exif_transpose(source).convert("RGB")
+        for width, name in targets.items():
+            resized = image.copy()
+            # Nunca se amplía: las fotos pequeñas sólo se recomprimen
+            resized.thumbnail((width, width * 4), Image.LANCZOS)
+            final = os.path.join(self._cache_dir, name)
+            tmp = f"{final}.{os.getpid()}.{threading.get_ident()}.tmp"
+            resized.save(tmp, "JPEG", quality=self._quality, optimize=True, progressive=True)
+            os.replace(tmp, final)
+            self._generated += 1
+
+    def _remove_derivatives(self, filename: str, keep: set) -> None:
+        # Sólo los derivados de esta foto: `7.png` no debe borrar los de `7-b.png`
+        pattern = re.compile(rf"^{re.escape(filename)}-\d+w-[0-9a-f]+\.jpg$")
+        try:
+            with os.scandir(self._cache_dir) as entries:
+                stale = [e.path for e in entries
+                         if pattern.match(e.name) and e.name not in keep]
+        except FileNotFoundError:
+            return
+        for path in stale:
+            self._ready.discard(os.path.basename(path))
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Estado y contadores para monitoreo."""
+        return {
+            "enabled": self._enabled,
+            "pillow": Image is not None,
+            "widths": list(self._widths),
+            "indexed": len(self._index),
+            "generated": self._generated,
+            "failures": self._failures,
+        }
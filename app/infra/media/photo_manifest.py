@@ -0,0 +1,104 @@
+"""
+app/infra/media/photo_manifest.py
+Índice en memoria de las fotos de empleados (static/img/media).
+"""
+
+import os
+import threading
+import time
+
+
+class PhotoManifest:
+    """
+    Conjunto de nombres de archivo presentes en la carpeta de fotos.
+
+    La pantalla de éxito resuelve la foto por pertenencia al conjunto en
+    lugar de hacer un `os.path.exists` por escaneo (costoso en la carpeta
+    estática montada en red).
+
+    - Se construye completo con `rescan()` (al arrancar la app).
+    - Cada `rescan_seconds` se consulta el mtime de la carpeta (un solo
+      stat); si cambió (altas o bajas de fotos) se vuelve a listar.
+    - Si el listado falla (p. ej. un corte del montaje de red) se conserva
+      el conjunto anterior y el mtime anterior, así que la siguiente
+      revisión lo reintenta.
+    - `rescan()` fuerza la relectura (endpoint de administración).
+    """
+
+    def __init__(self, directory: str, enabled: bool = True, rescan_seconds: float = 60.0):
+        """
+        :param directory: Carpeta de fotos.
+        :param enabled: Si es False, cada consulta hace stat del archivo.
+        :param rescan_seconds: Intervalo mínimo entre revisiones del mtime.
+        """
+        self._directory = directory
+        self._enabled = bool(enabled)
+        self._rescan_seconds = float(rescan_seconds)
+        self._lock = threading.Lock()
+        self._files: frozenset[str] = frozenset()
+        self._dir_mtime = None
+        self._checked_at = 0.0
+        self._loaded = False
+        self._rescans = 0
+        self._failures = 0
+
+    def contains(self, filename: str) -> bool:
+        """True si la foto existe en la carpeta."""
+        if not self._enabled:
+            return os.path.exists(os.path.join(self._directory, filename))
+
+        self._ensure_fresh()
+        return filename in self._files
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < self._rescan_seconds:
+            return
+
+        with self._lock:
+            if self._loaded and now - self._checked_at < self._rescan_seconds:
+                return
+            self._checked_at = now
+            if not self._loaded or self._current_mtime() != self._dir_mtime:
+                self._load()
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self._directory).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self) -> None:
+        """Lista la carpeta (con el lock tomado) y reemplaza el conjunto de una vez."""
+        mtime = self._current_mtime()
+        try:
+            with os.scandir(self._directory) as entries:
+                files = frozenset(entry.name for entry in entries if entry.is_file())
+        except OSError:
+            # Sin tocar `_files` ni `_dir_mtime`: un fallo pasajero no deja
+            # sin fotos hasta que la carpeta vuelva a cambiar
+            self._failures += 1
+            self._loaded = True
+            return
+        self._files = files
+        self._dir_mtime = mtime
+        self._loaded = True
+        self._rescans += 1
+
+    def rescan(self) -> dict:
+        """Relee la carpeta sin esperar al siguiente intervalo."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            self._load()
+        return self.stats()
+
+    def stats(self) -> dict:
+        """Fotos indexadas y contadores para monitoreo."""
+        return {
+            "enabled": self._enabled,
+            "directory": self._directory,
+            "photos": len(self._files),
+            "rescans": self._rescans,
+            "failures": self._failures,
+            "rescan_seconds": self._rescan_seconds,
+        }
@@ -4,6 +4,7 @@ Fábrica de la aplicación Flask.
 Refactorizada para usar Flask-SQLAlchemy, Flask-Migrate y limpiar imports.
 """
 
+import os
 from flask import Flask
 from .config.settings import settings
 from .containers import Container
@@ -11,6 +12,8 @@ from .extensions import db, migrate
 from .api.v1.blueprints import register_all_blueprints
 from .infra.http.auth import register_login
 from .infra.db.db import init_app as init_legacy_db
+from .infra.cli import register_cli
+from .infra.db.scan_journal import ScanJournalFlusher
 
 def create_app(config=settings):
     """
@@ -31,6 +34,74 @@ def create_app(config=settings):
     container.config.db_schema.from_value(
         app.config.get('DB_SCHEMA', 'public')
     )
+    container.config.prepared_statements_enabled.from_value(
+        app.config.get('PREPARED_STATEMENTS_ENABLED', True)
+    )
+    container.config.occupancy_cache_ttl.from_value(
+        app.config.get('OCCUPANCY_CACHE_TTL', 15)
+    )
+    container.config.occupancy_cache_max_keys.from_value(
+        app.config.get('OCCUPANCY_CACHE_MAX_KEYS', 4096)
+    )
+    container.config.occupancy_cache_enabled.from_value(
+        app.config.get('OCCUPANCY_CACHE_ENABLED', True)
+    )
+    container.config.fragment_cache_enabled.from_value(
+        app.config.get('FRAGMENT_CACHE_ENABLED', True)
+    )
+    container.config.fragment_cache_max_entries.from_value(
+        app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 256)
+    )
+    container.config.employee_directory_enabled.from_value(
+        app.config.get('EMPLOYEE_DIRECTORY_ENABLED', True)
+    )
+    container.config.employee_directory_refresh_seconds.from_value(
+        app.config.get('EMPLOYEE_DIRECTORY_REFRESH_SECONDS', 60)
+    )
+    container.config.employee_directory_full_reload_seconds.from_value(
+        app.config.get('EMPLOYEE_DIRECTORY_FULL_RELOAD_SECONDS', 3600)
+    )
+    container.config.scan_journal_mode.from_value(
+        "enabled" if app.config.get('SCAN_JOURNAL_ENABLED') else "disabled"
+    )
+    container.config.scan_journal_path.from_value(
+        app.config.get('SCAN_JOURNAL_PATH')
+        or os.path.join(app.instance_path, 'scan_journal.sqlite3')
+    )
+    container.config.scan_journal_max_attempts.from_value(
+        app.config.get('SCAN_JOURNAL_MAX_ATTEMPTS', 20)
+    )
+    container.config.scan_journal_lookup_timeout_ms.from_value(
+        app.config.get('SCAN_JOURNAL_LOOKUP_TIMEOUT_MS', 300)
+    )
+    container.config.group_commit_mode.from_value(
+        "enabled" if app.config.get('GROUP_COMMIT_ENABLED') else "disabled"
+    )
+    container.config.group_commit_window_ms.from_value(
+        app.config.get('GROUP_COMMIT_WINDOW_MS', 5)
+    )
+    container.config.group_commit_max_batch.from_value(
+        app.config.get('GROUP_COMMIT_MAX_BATCH', 64)
+    )
+    container.config.photo_media_dir.from_value(
+        os.path.join(app.static_folder, 'img', 'media')
+    )
+    container.config.photo_manifest_enabled.from_value(
+        app.config.get('PHOTO_MANIFEST_ENABLED', True)
+    )
+    container.config.photo_manifest_rescan_seconds.from_value(
+        app.config.get('PHOTO_MANIFEST_RESCAN_SECONDS', 60)
+    )
+    container.config.photo_derivatives_dir.from_value(
+        app.config.get('PHOTO_DERIVATIVES_DIR')
+        or os.path.join(app.instance_path, 'photo_cache')
+    )
+    container.config.photo_derivatives_enabled.from_value(
+        app.config.get('PHOTO_DERIVATIVES_ENABLED', True)
+    )
+    container.config.photo_derivatives_quality.from_value(
+        app.config.get('PHOTO_DERIVATIVES_QUALITY', 80)
+    )
     app.container = container
 
     # Auth
@@ -43,9 +114,29 @@ def create_app(config=settings):
         container.dashboard_service(),
         container.station_service(),
         container.active_staff_service(),
-        container.production_lines_service()
+        container.production_lines_service(),
+        container.photo_manifest(),
+        container.photo_derivatives()
     )
 
+    # Índice de fotos construido al arrancar
+    if app.config.get('PHOTO_MANIFEST_ENABLED', True):
+        container.photo_manifest().rescan()
+
+    # Hilo que aplica en Postgres el diario de escaneos (modo write-behind)
+    if app.config.get('SCAN_JOURNAL_ENABLED'):
+        ScanJournalFlusher(
+            app,
+            container.scan_journal(),
+            container.register_repo(),
+            batch_size=app.config.get('SCAN_JOURNAL_BATCH_SIZE', 100),
+            interval_seconds=app.config.get('SCAN_JOURNAL_FLUSH_SECONDS', 1),
+            retention_seconds=app.config.get('SCAN_IDEMPOTENCY_RETENTION_HOURS', 168) * 3600
+        ).start()
+
+    # Comandos CLI de mantenimiento
+    register_cli(app, container)
+
     # Middleware to handle URL Prefix
     if app.config.get('URL_PREFIX'):
         prefix = app.config['URL_PREFIX'].rstrip('/')
@@ -0,0 +1,78 @@
+// Actualización en vivo de los dashboards vía Server-Sent Events.
+// El servidor envía eventos `occupancy` con sólo lo que cambió:
+//   { sides: [...], totals: {...} }  (dashboard de estaciones)
+//   { lines: [...] }                  (dashboard de área)
+
+var STATUS_CLASSES = ["employee-ok", "employee-nook", "employee-warning"];
+
+function setStatusClass(element, statusClass) {
+  if (!element || !statusClass) return;
+  STATUS_CLASSES.forEach(function (cls) {
+    element.classList.remove(cls);
+  });
+  element.classList.add(statusClass);
+}
+
+function setField(root, field, value) {
+  var target = root.querySelector('[data-field="' + field + '"]');
+  if (target && value !== undefined && value !== null) {
+    target.textContent = value;
+  }
+}
+
+function patchSides(sides) {
+  sides.forEach(function (side) {
+    var cards = document.querySelectorAll(
+      '[data-side-id="' + side.side_id + '"]'
+    );
+    cards.forEach(function (card) {
+      setField(card, "employee_capacity", side.employee_capacity);
+      setField(card, "employees_working", side.employees_working);
+      setStatusClass(card, side.class);
+    });
+  });
+}
+
+function patchTotals(totals) {
+  Object.keys(totals).forEach(function (key) {
+    document
+      .querySelectorAll('[data-total="' + key + '"]')
+      .forEach(function (el) {
+        el.textContent = totals[key];
+      });
+    document
+      .querySelectorAll('[data-total-width="' + key + '"]')
+      .forEach(function (el) {
+        el.style.width = totals[key] + "%";
+      });
+  });
+}
+
+function patchLines(lines) {
+  lines.forEach(function (line) {
+    var card = document.querySelector('[data-line-id="' + line.id + '"]');
+    if (!card) return;
+    setField(card, "percentage", line.percentage);
+    setStatusClass(card, line.class);
+  });
+}
+
+function connectLiveDashboard(url) {
+  if (!window.EventSource) return null;
+
+  var source = new EventSource(url);
+  source.addEventListener("occupancy", function (event) {
+    var diff;
+    try {
+      diff = JSON.parse(event.data);
+    } catch (e) {
+      console.error("Evento de ocupación inválido:", e);
+      return;
+    }
+    if (diff.sides) patchSides(diff.sides);
+    if (diff.totals) patchTotals(diff.totals);
+    if (diff.lines) patchLines(diff.lines);
+    document.dispatchEvent(new CustomEvent("occupancy-updated", { detail: diff }));
+  });
+  return source;
+}
@@ -13,6 +13,13 @@ function openModal(id) {
     return;
   }
 
+  // Roster precargado: el modal abre sin esperar al servidor
+  var cached = operatorRosters[String(id)];
+  if (cached !== undefined) {
+    renderOperators(cached);
+    return;
+  }
+
   // Realizar petición AJAX a la ruta correcta del blueprint
   fetch("api/operators?id=" + encodeURIComponent(id))
     .then(async (response) => {
@@ -23,36 +30,7 @@ function openModal(id) {
       return response.json();
     })
     .then((data) => {
-      var modalContent = document.getElementById("modal-content");
-
-      // Industrial Render
-      var htmlContent = `
-        <div class="modal-header">
-          <h2>Operadores activos</h2>
-        </div>
-        <div class="modal-body">
-          <ul class="operator-list">
-      `;
-
-      var listItems = Array.isArray(data) ? data : [];
-      if (listItems.length === 0) {
-        htmlContent += `<li class="operator-item" style="justify-content:center; color: #a0aec0;">No hay operadores activos</li>`;
-      } else {
-        listItems.forEach((item) => {
-          htmlContent += `
-              <li class="operator-item">
-                <i class="fi fi-sr-user operator-icon"></i>
-                <span>${item}</span>
-              </li>`;
-        });
-      }
-
-      htmlContent += `
-          </ul>
-        </div>
-      `;
-      if (modalContent) modalContent.innerHTML = htmlContent;
-      if (modal) modal.style.display = "block";
+      renderOperators(data);
     })
     .catch((error) => {
       console.error("Fallo al obtener operadores:", error);
@@ -65,6 +43,72 @@ function openModal(id) {
     });
 }
 
+function renderOperators(data) {
+  var modal = document.getElementById("myModal");
+  var modalContent = document.getElementById("modal-content");
+
+  // Industrial Render
+  var htmlContent = `
+    <div class="modal-header">
+      <h2>Operadores activos</h2>
+    </div>
+    <div class="modal-body">
+      <ul class="operator-list">
+  `;
+
+  var listItems = Array.isArray(data) ? data : [];
+  if (listItems.length === 0) {
+    htmlContent += `<li class="operator-item" style="justify-content:center; color: #a0aec0;">No hay operadores activos</li>`;
+  } else {
+    listItems.forEach((item) => {
+      htmlContent += `
+          <li class="operator-item">
+            <i class="fi fi-sr-user operator-icon"></i>
+            <span>${item}</span>
+          </li>`;
+    });
+  }
+
+  htmlContent += `
+      </ul>
+    </div>
+  `;
+  if (modalContent) modalContent.innerHTML = htmlContent;
+  if (modal) modal.style.display = "block";
+}
+
+// Rosters por side_id, precargados en una sola petición para toda la página
+var operatorRosters = {};
+
+function prefetchOperatorRosters() {
+  var ids = [];
+  document.querySelectorAll("[data-side-id]").forEach(function (el) {
+    var id = el.getAttribute("data-side-id");
+    if (id && !Number.isNaN(Number(id)) && ids.indexOf(id) === -1) {
+      ids.push(id);
+    }
+  });
+  if (ids.length === 0) return;
+
+  fetch("api/operators/batch?ids=" + encodeURIComponent(ids.join(",")))
+    .then((response) => (response.ok ? response.json() : {}))
+    .then((data) => {
+      operatorRosters = data || {};
+    })
+    .catch((error) => {
+      // Sin precarga, openModal consulta cada side por separado
+      console.error("Fallo al precargar operadores:", error);
+      operatorRosters = {};
+    });
+}
+
+document.addEventListener("DOMContentLoaded", prefetchOperatorRosters);
+// live_dashboard.js avisa cuando cambia la ocupación: el roster quedó viejo
+document.addEventListener("occupancy-updated", function () {
+  operatorRosters = {};
+  prefetchOperatorRosters();
+});
+
 function closeModal() {
   var modal = document.getElementById("myModal");
   modal.style.display = "none";
@@ -0,0 +1,72 @@
+"""
+benchmarks/bench_query_catalog.py
+Coste por llamada de armar las consultas de los repositorios: composición
+con psycopg2.sql en cada llamada (como antes) frente a la consulta ya
+compilada del QueryCatalog.
+
+No necesita base de datos. Con BENCH_DATABASE_URL mide además el coste de
+serializar el Composed (as_string), que psycopg2 paga en cada execute.
+
+Uso:
+    python -m benchmarks.bench_query_catalog
+"""
+
+import os
+import statistics
+import sys
+import time
+
+from psycopg2 import sql
+
+CALLS = 20_000
+SCHEMA = "dle"
+
+
+def _per_call_us(fn) -> float:
+    rounds = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(CALLS):
+            fn()
+        rounds.append((time.perf_counter() - start) * 1_000_000 / CALLS)
+    return statistics.median(rounds)
+
+
+def main() -> int:
+    from app.infra.db import production_lines_repository_sql, register_repository_sql
+    from app.infra.db.production_lines_repository_sql import ProductionLineRepositorySQL
+    from app.infra.db.register_repository_sql import RegisterRepositorySQL
+
+    cases = [
+        ("checkin", register_repository_sql._QUERIES, RegisterRepositorySQL(SCHEMA)),
+        ("station_cards_for_line", production_lines_repository_sql._QUERIES,
+         ProductionLineRepositorySQL(SCHEMA)),
+        ("all_lines_summary", production_lines_repository_sql._QUERIES,
+         ProductionLineRepositorySQL(SCHEMA)),
+    ]
+
+    conn = None
+    if os.environ.get("BENCH_DATABASE_URL"):
+        from benchmarks.synthetic import connect
+        conn = connect()
+
+    print(f"{'consulta':<24} {'sql.SQL µs':>11} {'catálogo µs':>12} {'as_string µs':>13}")
+    for name, catalog, repo in cases:
+        template = catalog._templates[name]
+
+        def compose():
+            return sql.SQL(template).format(schema=sql.Identifier(SCHEMA))
+
+        composed_us = _per_call_us(compose)
+        lookup_us = _per_call_us(lambda: repo._sql[name])
+        as_string = f"{_per_call_us(lambda: compose().as_string(conn)):>13.2f}" if conn else f"{'-':>13}"
+        print(f"{name:<24} {composed_us:>11.2f} {lookup_us:>12.3f} {as_string}")
+
+    if conn is not None:
+        conn.close()
+    print(f"\n{CALLS} llamadas por ronda, mediana de 5 rondas")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+benchmarks/synthetic.py
+Esquema sintético de Postgres para benchmarks y verificación de planes.
+
+Crea en un esquema aislado (por defecto `dle_bench`) las tablas que usan
+los repositorios, con datos generados vía generate_series. Requiere una
+base de datos Postgres accesible en BENCH_DATABASE_URL (o DATABASE_URL).
+"""
+
+import os
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import sql
+
+BENCH_SCHEMA = os.getenv('BENCH_SCHEMA', 'dle_bench')
+
+
+def database_url() -> str:
+    url = os.getenv('BENCH_DATABASE_URL') or os.getenv('DATABASE_URL')
+    if not url:
+        raise SystemExit("Define BENCH_DATABASE_URL (o DATABASE_URL) apuntando a un Postgres de pruebas.")
+    return url
+
+
+@contextmanager
+def connect():
+    conn = psycopg2.connect(database_url())
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+_DDL = """
+    DROP SCHEMA IF EXISTS {schema} CASCADE;
+    CREATE SCHEMA {schema};
+
+    CREATE TABLE {schema}.business_unit (
+        bu_id   SERIAL PRIMARY KEY,
+        bu_name TEXT NOT NULL
+    );
+    CREATE TABLE {schema}.production_lines (
+        line_id           SERIAL PRIMARY KEY,
+        name              TEXT NOT NULL,
+        type_zone         TEXT,
+        business_unit_fk  INTEGER REFERENCES {schema}.business_unit (bu_id)
+    );
+    CREATE TABLE {schema}.positions (
+        position_id   SERIAL PRIMARY KEY,
+        line_id       INTEGER REFERENCES {schema}.production_lines (line_id),
+        position_name TEXT
+    );
+    CREATE TABLE {schema}.position_status (
+        position_status_id SERIAL PRIMARY KEY,
+        position_id_fk     INTEGER REFERENCES {schema}.positions (position_id),
+        is_active          BOOLEAN
+    );
+    CREATE TABLE {schema}.tbl_sides_of_positions (
+        side_id           SERIAL PRIMARY KEY,
+        position_id_fk    INTEGER REFERENCES {schema}.positions (position_id),
+        side_title        TEXT,
+        employee_capacity INTEGER
+    );
+    CREATE TABLE {schema}.table_empleados_tarjeta (
+        id_empleado        SERIAL PRIMARY KEY,
+        nombre_empleado    TEXT,
+        apellidos_empleado TEXT,
+        numero_tarjeta     VARCHAR(32)
+    );
+    CREATE TABLE {schema}.registers (
+        id_register    SERIAL PRIMARY KEY,
+        id_employee    BIGINT,
+        date_register  DATE,
+        entry_hour     TIME,
+        exit_hour      TIME,
+        line_id_fk     INTEGER,
+        position_id_fk INTEGER,
+        side_id_fk     INTEGER
+    );
+    CREATE TABLE {schema}.employee_presence (
+        id_employee    BIGINT PRIMARY KEY,
+        id_register    BIGINT NOT NULL,
+        side_id_fk     INTEGER,
+        position_id_fk INTEGER,
+        line_id_fk     INTEGER,
+        date_register  DATE,
+        entry_hour     TIME
+    );
+
+    -- Igual que la migración 0006_side_occupancy
+    CREATE TABLE {schema}.side_occupancy (
+        side_id   INTEGER PRIMARY KEY,
+        operators INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE FUNCTION {schema}.apply_side_occupancy() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO {schema}.side_occupancy AS so (side_id, operators)
+            SELECT side_id_fk, COUNT(*) FROM new_rows
+            WHERE side_id_fk IS NOT NULL
+            GROUP BY side_id_fk ORDER BY side_id_fk
+            ON CONFLICT (side_id) DO UPDATE SET operators = so.operators + EXCLUDED.operators;
+        ELSIF TG_OP = 'DELETE' THEN
+            INSERT INTO {schema}.side_occupancy AS so (side_id, operators)
+            SELECT side_id_fk, -COUNT(*) FROM old_rows
+            WHERE side_id_fk IS NOT NULL
+            GROUP BY side_id_fk ORDER BY side_id_fk
+            ON CONFLICT (side_id) DO UPDATE SET operators = so.operators + EXCLUDED.operators;
+        ELSE
+            INSERT INTO {schema}.side_occupancy AS so (side_id, operators)
+            SELECT side_id_fk, SUM(delta)
+            FROM (SELECT side_id_fk, 1 AS delta FROM new_rows
+                  UNION ALL
+                  SELECT side_id_fk, -1 FROM old_rows) d
+            WHERE side_id_fk IS NOT NULL
+            GROUP BY side_id_fk
+            HAVING SUM(delta) <> 0
+            ORDER BY side_id_fk
+            ON CONFLICT (side_id) DO UPDATE SET operators = so.operators + EXCLUDED.operators;
+        END IF;
+        RETURN NULL;
+    END
+    $$;
+    CREATE TRIGGER trg_side_occupancy_insert AFTER INSERT ON {schema}.employee_presence
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION {schema}.apply_side_occupancy();
+    CREATE TRIGGER trg_side_occupancy_update AFTER UPDATE ON {schema}.employee_presence
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION {schema}.apply_side_occupancy();
+    CREATE TRIGGER trg_side_occupancy_delete AFTER DELETE ON {schema}.employee_presence
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION {schema}.apply_side_occupancy();
+"""
+
+_SEED_TOPOLOGY = """
+    INSERT INTO {schema}.business_unit (bu_name)
+    VALUES ('Ensamble'), ('Inyección'), ('Metalizado'), ('Antifog');
+
+    INSERT INTO {schema}.production_lines (name, type_zone, business_unit_fk)
+    SELECT g::text, 'Línea', 1 + (g %% 4)
+    FROM generate_series(1, %(lines)s) g;
+
+    INSERT INTO {schema}.positions (line_id, position_name)
+    SELECT pl.line_id, 'Estación ' || g
+    FROM {schema}.production_lines pl, generate_series(1, %(positions_per_line)s) g;
+
+    INSERT INTO {schema}.position_status (position_id_fk, is_active)
+    SELECT position_id, TRUE FROM {schema}.positions;
+
+    INSERT INTO {schema}.tbl_sides_of_positions (position_id_fk, side_title, employee_capacity)
+    SELECT p.position_id, t.title, 2
+    FROM {schema}.positions p, (VALUES ('LH'), ('RH')) t(title);
+
+    INSERT INTO {schema}.table_empleados_tarjeta (nombre_empleado, apellidos_empleado, numero_tarjeta)
+    SELECT 'Nombre ' || g, 'Apellido ' || g, (100000 + g)::text
+    FROM generate_series(1, %(employees)s) g;
+"""
+
+# Historial cerrado + una fracción de registros abiertos (exit_hour NULL),
+# con su proyección de presencia (los triggers llenan side_occupancy)
+_SEED_REGISTERS = """
+    INSERT INTO {schema}.registers
+        (id_employee, date_register, entry_hour, exit_hour, line_id_fk, position_id_fk, side_id_fk)
+    SELECT 100000 + 1 + (g %% %(employees)s),
+           CURRENT_DATE - (g %% 30),
+           TIME '06:00',
+           CASE WHEN g %% 100 < %(open_pct)s THEN NULL ELSE TIME '14:00' END,
+           p.line_id, p.position_id, s.side_id
+    FROM generate_series(1, %(registers)s) g
+    JOIN {schema}.tbl_sides_of_positions s
+      ON s.side_id = 1 + (g %% (SELECT COUNT(*) FROM {schema}.tbl_sides_of_positions))
+    JOIN {schema}.positions p ON p.position_id = s.position_id_fk;
+
+    INSERT INTO {schema}.employee_presence
+        (id_employee, id_register, side_id_fk, position_id_fk, line_id_fk, date_register, entry_hour)
+    SELECT id_employee, id_register, side_id_fk, position_id_fk, line_id_fk, date_register, entry_hour
+    FROM (
+        SELECT DISTINCT ON (id_employee) *
+        FROM {schema}.registers
+        ORDER BY id_employee, id_register DESC
+    ) last_register
+    WHERE exit_hour IS NULL;
+"""
+
+
+def build_schema(conn, lines: int = 60, positions_per_line: int = 8, employees: int = 2000,
+                 schema_name: str = BENCH_SCHEMA) -> None:
+    """(Re)crea el esquema sintético con la topología de planta."""
+    schema = sql.Identifier(schema_name)
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL(_DDL).format(schema=schema))
+        cur.execute(sql.SQL(_SEED_TOPOLOGY).format(schema=schema), {
+            "lines": lines, "positions_per_line": positions_per_line, "employees": employees,
+        })
+    conn.commit()
+
+
+def seed_registers(conn, registers: int, open_pct: int = 5, employees: int = 2000,
+                   schema_name: str = BENCH_SCHEMA) -> None:
+    """Reemplaza el contenido de `registers` (y su presencia) y actualiza estadísticas."""
+    schema = sql.Identifier(schema_name)
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("TRUNCATE {schema}.registers, {schema}.employee_presence, "
+                                "{schema}.side_occupancy RESTART IDENTITY").format(schema=schema))
+        cur.execute(sql.SQL(_SEED_REGISTERS).format(schema=schema), {
+            "registers": registers, "open_pct": open_pct, "employees": employees,
+        })
+        cur.execute(sql.SQL("ANALYZE {schema}.registers").format(schema=schema))
+        cur.execute(sql.SQL("ANALYZE {schema}.employee_presence").format(schema=schema))
+        cur.execute(sql.SQL("ANALYZE {schema}.side_occupancy").format(schema=schema))
+    conn.commit()
+
+
+def drop_schema(conn, schema_name: str = BENCH_SCHEMA) -> None:
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("DROP SCHEMA IF EXISTS {schema} CASCADE").format(
+            schema=sql.Identifier(schema_name)))
+    conn.commit()
+
+
+@contextmanager
+def app_context():
+    """
+    Contexto de aplicación Flask apuntando a la base de benchmarks, para
+    medir los repositorios reales (que usan get_db()).
+    """
+    os.environ['DATABASE_URL'] = database_url()
+    os.environ['DB_SCHEMA'] = BENCH_SCHEMA
+    from app.main import create_app  # importar tras fijar el entorno
+
+    app = create_app()
+    with app.app_context():
+        yield app
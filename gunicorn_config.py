@@ -1,7 +1,13 @@
-workers = 4
+import os
+
+workers = int(os.getenv("GUNICORN_WORKERS", 4))
 bind = "127.0.0.1:8000"
 accesslog = "/var/log/dle_app/access.log"
 errorlog = "/var/log/dle_app/error.log"
 loglevel = "info"
-worker_class = "sync"
+# gthread: los streams SSE de /dashboards/stream/* ocupan un hilo, no un
+# worker completo. Cada stream se cierra tras SSE_MAX_STREAM_SECONDS y el
+# navegador reconecta, así que los hilos se reciclan.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 16))
 timeout = 120
@@ -0,0 +1,48 @@
+"""Índices para la ocupación por side de una línea
+
+Respaldan get_station_cards_for_line: positions por línea, sides por
+posición y registros abiertos por side (índice parcial exit_hour IS NULL).
+
+Revision ID: 0001_open_register_indexes
+Revises:
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_open_register_indexes'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _schema():
+    return current_app.config.get('DB_SCHEMA') or 'public'
+
+
+INDEXES = [
+    ("ix_positions_line_id", "positions", "(line_id)"),
+    ("ix_sides_position_id_fk", "tbl_sides_of_positions", "(position_id_fk)"),
+    ("ix_registers_open_side", "registers", "(side_id_fk) WHERE exit_hour IS NULL"),
+]
+
+
+def upgrade():
+    schema = _schema()
+    # CONCURRENTLY: registers es una tabla viva; no bloquear los fichajes
+    with op.get_context().autocommit_block():
+        for name, table, definition in INDEXES:
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON "{schema}".{table} {definition}'
+            )
+
+
+def downgrade():
+    schema = _schema()
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{schema}".{name}')
@@ -0,0 +1,47 @@
+"""Índice de expresión sobre el número de tarjeta como BIGINT
+
+registers.id_employee es BIGINT y table_empleados_tarjeta.numero_tarjeta es
+texto; los JOIN de operadores activos usan CAST(numero_tarjeta AS BIGINT),
+que sin este índice obliga a recorrer toda la tabla de empleados.
+
+Revision ID: 0002_employee_card_index
+Revises: 0001_open_register_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_employee_card_index'
+down_revision = '0001_open_register_indexes'
+branch_labels = None
+depends_on = None
+
+
+def _schema():
+    return current_app.config.get('DB_SCHEMA') or 'public'
+
+
+INDEXES = [
+    ("ix_empleados_numero_tarjeta_bigint", "table_empleados_tarjeta",
+     "((CAST(numero_tarjeta AS BIGINT)))"),
+]
+
+
+def upgrade():
+    schema = _schema()
+    with op.get_context().autocommit_block():
+        for name, table, definition in INDEXES:
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON "{schema}".{table} {definition}'
+            )
+
+
+def downgrade():
+    schema = _schema()
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{schema}".{name}')
@@ -0,0 +1,40 @@
+"""Claves de idempotencia de escaneos diferidos
+
+El diario local de escaneos (modo write-behind) puede reenviar un lote que
+ya se confirmó en Postgres si el worker cae antes de marcarlo. Cada
+escaneo aplicado deja aquí su clave para que el reintento se omita.
+
+Revision ID: 0003_scan_idempotency
+Revises: 0002_employee_card_index
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_scan_idempotency'
+down_revision = '0002_employee_card_index'
+branch_labels = None
+depends_on = None
+
+
+def _schema():
+    return current_app.config.get('DB_SCHEMA') or 'public'
+
+
+def upgrade():
+    schema = _schema()
+    op.execute(f'''
+        CREATE TABLE IF NOT EXISTS "{schema}".scan_idempotency (
+            idempotency_key TEXT PRIMARY KEY,
+            register_id     BIGINT,
+            applied_at      TIMESTAMP NOT NULL DEFAULT now()
+        )
+    ''')
+
+
+def downgrade():
+    schema = _schema()
+    op.execute(f'DROP TABLE IF EXISTS "{schema}".scan_idempotency')
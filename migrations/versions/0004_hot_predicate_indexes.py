@@ -0,0 +1,56 @@
+"""Índices para los predicados calientes de registros y topología
+
+- Último registro de un empleado (get_last_register_type, get_scan_result,
+  get_last_station_for_user): (id_employee, id_register DESC).
+- Registro abierto de un empleado (check-in): parcial exit_hour IS NULL.
+- Registros abiertos por línea (salida general) y por posición (ocupación
+  por línea de los resúmenes): parciales exit_hour IS NULL.
+- Empleado por número de tarjeta en texto (get_scan_result).
+- Líneas por unidad de negocio y unidad por LOWER(bu_name).
+
+Revision ID: 0004_hot_predicate_indexes
+Revises: 0003_scan_idempotency
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_hot_predicate_indexes'
+down_revision = '0003_scan_idempotency'
+branch_labels = None
+depends_on = None
+
+
+def _schema():
+    return current_app.config.get('DB_SCHEMA') or 'public'
+
+
+INDEXES = [
+    ("ix_registers_employee_last", "registers", "(id_employee, id_register DESC)"),
+    ("ix_registers_open_employee", "registers", "(id_employee) WHERE exit_hour IS NULL"),
+    ("ix_registers_open_line", "registers", "(line_id_fk) WHERE exit_hour IS NULL"),
+    ("ix_registers_open_position", "registers", "(position_id_fk) WHERE exit_hour IS NULL"),
+    ("ix_empleados_numero_tarjeta", "table_empleados_tarjeta", "(numero_tarjeta)"),
+    ("ix_production_lines_business_unit", "production_lines", "(business_unit_fk)"),
+    ("ix_business_unit_lower_name", "business_unit", "((LOWER(bu_name)))"),
+]
+
+
+def upgrade():
+    schema = _schema()
+    with op.get_context().autocommit_block():
+        for name, table, definition in INDEXES:
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON "{schema}".{table} {definition}'
+            )
+
+
+def downgrade():
+    schema = _schema()
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{schema}".{name}')
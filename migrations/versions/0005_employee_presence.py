@@ -0,0 +1,61 @@
+"""Proyección de presencia actual por empleado
+
+Una fila por empleado con registro abierto (el último de su historial):
+registro, side, posición y línea. La mantienen en la misma transacción
+el check-in y las salidas generales; `flask presence-rebuild` la
+reconstruye desde registers.
+
+Revision ID: 0005_employee_presence
+Revises: 0004_hot_predicate_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_employee_presence'
+down_revision = '0004_hot_predicate_indexes'
+branch_labels = None
+depends_on = None
+
+
+def _schema():
+    return current_app.config.get('DB_SCHEMA') or 'public'
+
+
+def upgrade():
+    schema = _schema()
+    op.execute(f'''
+        CREATE TABLE IF NOT EXISTS "{schema}".employee_presence (
+            id_employee    BIGINT PRIMARY KEY,
+            id_register    BIGINT NOT NULL,
+            side_id_fk     INTEGER,
+            position_id_fk INTEGER,
+            line_id_fk     INTEGER,
+            date_register  DATE,
+            entry_hour     TIME
+        )
+    ''')
+    op.execute(f'CREATE INDEX IF NOT EXISTS ix_presence_side ON "{schema}".employee_presence (side_id_fk)')
+    op.execute(f'CREATE INDEX IF NOT EXISTS ix_presence_position ON "{schema}".employee_presence (position_id_fk)')
+    op.execute(f'CREATE INDEX IF NOT EXISTS ix_presence_line ON "{schema}".employee_presence (line_id_fk)')
+    # Carga inicial: misma consulta que RegisterRepositorySQL.rebuild_presence
+    op.execute(f'''
+        INSERT INTO "{schema}".employee_presence
+            (id_employee, id_register, side_id_fk, position_id_fk, line_id_fk, date_register, entry_hour)
+        SELECT id_employee, id_register, side_id_fk, position_id_fk, line_id_fk, date_register, entry_hour
+        FROM (
+            SELECT DISTINCT ON (id_employee) *
+            FROM "{schema}".registers
+            ORDER BY id_employee, id_register DESC
+        ) last_register
+        WHERE exit_hour IS NULL
+        ON CONFLICT (id_employee) DO NOTHING
+    ''')
+
+
+def downgrade():
+    schema = _schema()
+    op.execute(f'DROP TABLE IF EXISTS "{schema}".employee_presence')
@@ -0,0 +1,103 @@
+"""Contadores de ocupación por side mantenidos por triggers
+
+side_occupancy guarda cuántos empleados presentes hay en cada side. Lo
+mantienen triggers por sentencia sobre employee_presence (con tablas de
+transición, una actualización por side afectado y no por fila), así que
+el check-in, las salidas generales y la reconstrucción de presencia lo
+actualizan en su misma transacción. `flask occupancy-reconcile` repara
+cualquier desviación.
+
+Revision ID: 0006_side_occupancy
+Revises: 0005_employee_presence
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_side_occupancy'
+down_revision = '0005_employee_presence'
+branch_labels = None
+depends_on = None
+
+
+def _schema():
+    return current_app.config.get('DB_SCHEMA') or 'public'
+
+
+# (trigger, evento, tablas de transición)
+TRIGGERS = [
+    ("trg_side_occupancy_insert", "INSERT", "NEW TABLE AS new_rows"),
+    ("trg_side_occupancy_update", "UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+    ("trg_side_occupancy_delete", "DELETE", "OLD TABLE AS old_rows"),
+]
+
+
+def upgrade():
+    schema = _schema()
+    op.execute(f'''
+        CREATE TABLE IF NOT EXISTS "{schema}".side_occupancy (
+            side_id   INTEGER PRIMARY KEY,
+            operators INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    # Deltas agregados por side y aplicados en orden de side_id, para que
+    # dos sentencias concurrentes bloqueen las filas en el mismo orden
+    op.execute(f'''
+        CREATE OR REPLACE FUNCTION "{schema}".apply_side_occupancy() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO "{schema}".side_occupancy AS so (side_id, operators)
+                SELECT side_id_fk, COUNT(*) FROM new_rows
+                WHERE side_id_fk IS NOT NULL
+                GROUP BY side_id_fk ORDER BY side_id_fk
+                ON CONFLICT (side_id) DO UPDATE SET operators = so.operators + EXCLUDED.operators;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO "{schema}".side_occupancy AS so (side_id, operators)
+                SELECT side_id_fk, -COUNT(*) FROM old_rows
+                WHERE side_id_fk IS NOT NULL
+                GROUP BY side_id_fk ORDER BY side_id_fk
+                ON CONFLICT (side_id) DO UPDATE SET operators = so.operators + EXCLUDED.operators;
+            ELSE
+                INSERT INTO "{schema}".side_occupancy AS so (side_id, operators)
+                SELECT side_id_fk, SUM(delta)
+                FROM (SELECT side_id_fk, 1 AS delta FROM new_rows
+                      UNION ALL
+                      SELECT side_id_fk, -1 FROM old_rows) d
+                WHERE side_id_fk IS NOT NULL
+                GROUP BY side_id_fk
+                HAVING SUM(delta) <> 0
+                ORDER BY side_id_fk
+                ON CONFLICT (side_id) DO UPDATE SET operators = so.operators + EXCLUDED.operators;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    ''')
+    for name, event, transition in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {name} ON "{schema}".employee_presence')
+        op.execute(
+            f'CREATE TRIGGER {name} AFTER {event} ON "{schema}".employee_presence '
+            f'REFERENCING {transition} FOR EACH STATEMENT '
+            f'EXECUTE FUNCTION "{schema}".apply_side_occupancy()'
+        )
+    # Carga inicial desde la presencia actual
+    op.execute(f'''
+        INSERT INTO "{schema}".side_occupancy (side_id, operators)
+        SELECT side_id_fk, COUNT(*)
+        FROM "{schema}".employee_presence
+        WHERE side_id_fk IS NOT NULL
+        GROUP BY side_id_fk
+        ON CONFLICT (side_id) DO UPDATE SET operators = EXCLUDED.operators
+    ''')
+
+
+def downgrade():
+    schema = _schema()
+    for name, _, _ in reversed(TRIGGERS):
+        op.execute(f'DROP TRIGGER IF EXISTS {name} ON "{schema}".employee_presence')
+    op.execute(f'DROP FUNCTION IF EXISTS "{schema}".apply_side_occupancy()')
+    op.execute(f'DROP TABLE IF EXISTS "{schema}".side_occupancy')
@@ -0,0 +1,49 @@
+"""Retira los índices parciales de registros abiertos por side y por posición
+
+Desde 0005/0006 la ocupación por side y por posición se lee de
+employee_presence y side_occupancy, así que ix_registers_open_side (0001)
+e ix_registers_open_position (0004) ya no los usa ninguna consulta y sólo
+encarecen cada check-in y cada salida.
+
+Revision ID: 0007_drop_unused_open_indexes
+Revises: 0006_side_occupancy
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_drop_unused_open_indexes'
+down_revision = '0006_side_occupancy'
+branch_labels = None
+depends_on = None
+
+
+def _schema():
+    return current_app.config.get('DB_SCHEMA') or 'public'
+
+
+INDEXES = [
+    ("ix_registers_open_side", "registers", "(side_id_fk) WHERE exit_hour IS NULL"),
+    ("ix_registers_open_position", "registers", "(position_id_fk) WHERE exit_hour IS NULL"),
+]
+
+
+def upgrade():
+    schema = _schema()
+    # CONCURRENTLY: registers es una tabla viva; no bloquear los fichajes
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{schema}".{name}')
+
+
+def downgrade():
+    schema = _schema()
+    with op.get_context().autocommit_block():
+        for name, table, definition in reversed(INDEXES):
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON "{schema}".{table} {definition}'
+            )
@@ -0,0 +1,47 @@
+"""Índice por fecha de aplicación en scan_idempotency
+
+El flusher del diario borra periódicamente las claves más viejas que la
+ventana de retención (`applied_at < now() - ...`); sin este índice cada
+purga recorre la tabla completa.
+
+Revision ID: 0008_scan_idempotency_applied
+Revises: 0007_drop_unused_open_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_scan_idempotency_applied'
+down_revision = '0007_drop_unused_open_indexes'
+branch_labels = None
+depends_on = None
+
+
+def _schema():
+    return current_app.config.get('DB_SCHEMA') or 'public'
+
+
+INDEXES = [
+    ("ix_scan_idempotency_applied_at", "scan_idempotency", "(applied_at)"),
+]
+
+
+def upgrade():
+    schema = _schema()
+    # CONCURRENTLY: la tabla recibe una fila por escaneo del diario
+    with op.get_context().autocommit_block():
+        for name, table, definition in INDEXES:
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON "{schema}".{table} {definition}'
+            )
+
+
+def downgrade():
+    schema = _schema()
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{schema}".{name}')
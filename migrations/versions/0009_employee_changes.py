@@ -0,0 +1,92 @@
+"""Bitácora de cambios de empleados para el directorio en memoria
+
+Triggers por sentencia sobre table_empleados_tarjeta anotan en
+employee_changes el id_empleado de cada fila insertada, editada o borrada,
+junto con el ID de la transacción. Cada worker lee sólo los cambios desde
+su última consulta (`txid >= xmin` de la instantánea anterior) y recarga
+esas filas en lugar de toda la tabla.
+
+Las anotaciones de más de un día se borran en el mismo trigger: el
+directorio hace una recarga completa mucho antes (full_reload_seconds).
+
+Revision ID: 0009_employee_changes
+Revises: 0008_scan_idempotency_applied
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_employee_changes'
+down_revision = '0008_scan_idempotency_applied'
+branch_labels = None
+depends_on = None
+
+
+def _schema():
+    return current_app.config.get('DB_SCHEMA') or 'public'
+
+
+# (trigger, evento, tablas de transición)
+TRIGGERS = [
+    ("trg_employee_changes_insert", "INSERT", "NEW TABLE AS new_rows"),
+    ("trg_employee_changes_update", "UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+    ("trg_employee_changes_delete", "DELETE", "OLD TABLE AS old_rows"),
+]
+
+
+def upgrade():
+    schema = _schema()
+    op.execute(f'''
+        CREATE TABLE IF NOT EXISTS "{schema}".employee_changes (
+            change_id   BIGSERIAL PRIMARY KEY,
+            id_empleado INTEGER NOT NULL,
+            txid        BIGINT NOT NULL DEFAULT txid_current(),
+            changed_at  TIMESTAMP NOT NULL DEFAULT now()
+        )
+    ''')
+    op.execute(
+        f'CREATE INDEX IF NOT EXISTS ix_employee_changes_txid '
+        f'ON "{schema}".employee_changes (txid)'
+    )
+    # Una fila por empleado afectado; en UPDATE se anotan el id anterior y
+    # el nuevo por si cambió la llave
+    op.execute(f'''
+        CREATE OR REPLACE FUNCTION "{schema}".record_employee_changes() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO "{schema}".employee_changes (id_empleado)
+                SELECT id_empleado FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO "{schema}".employee_changes (id_empleado)
+                SELECT id_empleado FROM old_rows;
+            ELSE
+                INSERT INTO "{schema}".employee_changes (id_empleado)
+                SELECT id_empleado FROM new_rows
+                UNION
+                SELECT id_empleado FROM old_rows;
+            END IF;
+            DELETE FROM "{schema}".employee_changes
+            WHERE changed_at < now() - interval '1 day';
+            RETURN NULL;
+        END
+        $$
+    ''')
+    for name, event, transition in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {name} ON "{schema}".table_empleados_tarjeta')
+        op.execute(
+            f'CREATE TRIGGER {name} AFTER {event} ON "{schema}".table_empleados_tarjeta '
+            f'REFERENCING {transition} FOR EACH STATEMENT '
+            f'EXECUTE FUNCTION "{schema}".record_employee_changes()'
+        )
+
+
+def downgrade():
+    schema = _schema()
+    for name, _, _ in reversed(TRIGGERS):
+        op.execute(f'DROP TRIGGER IF EXISTS {name} ON "{schema}".table_empleados_tarjeta')
+    op.execute(f'DROP FUNCTION IF EXISTS "{schema}".record_employee_changes()')
+    op.execute(f'DROP TABLE IF EXISTS "{schema}".employee_changes')
@@ -0,0 +1,140 @@
+"""Versiones de datos compartidas para los ETag de dashboards y ajustes
+
+- side_occupancy gana `version` y `changed_at`: el trigger de ocupación
+  incrementa la versión de cada side tocado (aunque su delta neto sea 0,
+  p. ej. dos operadores que se cruzan), en la misma fila que ya bloquea.
+  La suma de versiones sólo crece y se ve al confirmar, así que sirve de
+  versión de ocupación para todos los workers.
+- data_versions guarda una versión por ámbito ('topology' y 'employees'),
+  incrementada por triggers por sentencia sobre las tablas de topología y
+  sobre table_empleados_tarjeta (escrituras poco frecuentes).
+
+Revision ID: 0010_data_versions
+Revises: 0009_employee_changes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_data_versions'
+down_revision = '0009_employee_changes'
+branch_labels = None
+depends_on = None
+
+
+def _schema():
+    return current_app.config.get('DB_SCHEMA') or 'public'
+
+
+# (tabla, ámbito)
+VERSIONED_TABLES = [
+    ("business_unit", "topology"),
+    ("production_lines", "topology"),
+    ("positions", "topology"),
+    ("position_status", "topology"),
+    ("tbl_sides_of_positions", "topology"),
+    ("table_empleados_tarjeta", "employees"),
+]
+
+_UPSERT = '''
+                ON CONFLICT (side_id) DO UPDATE
+                SET operators = so.operators + EXCLUDED.operators{bump}'''
+
+_BUMP = ''',
+                    version = so.version + 1,
+                    changed_at = EXCLUDED.changed_at'''
+
+
+def _occupancy_function(schema: str, versioned: bool) -> str:
+    """Cuerpo de apply_side_occupancy: con versión (0010) o como en 0006."""
+    columns = "side_id, operators, version, changed_at" if versioned else "side_id, operators"
+    extra = ", 1, clock_timestamp()" if versioned else ""
+    upsert = _UPSERT.format(bump=_BUMP if versioned else "")
+    # Sin versión, los sides con delta neto 0 no se tocan (como en 0006)
+    having = "" if versioned else "\n                HAVING SUM(delta) <> 0"
+    return f'''
+        CREATE OR REPLACE FUNCTION "{schema}".apply_side_occupancy() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO "{schema}".side_occupancy AS so ({columns})
+                SELECT side_id_fk, COUNT(*){extra} FROM new_rows
+                WHERE side_id_fk IS NOT NULL
+                GROUP BY side_id_fk ORDER BY side_id_fk{upsert};
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO "{schema}".side_occupancy AS so ({columns})
+                SELECT side_id_fk, -COUNT(*){extra} FROM old_rows
+                WHERE side_id_fk IS NOT NULL
+                GROUP BY side_id_fk ORDER BY side_id_fk{upsert};
+            ELSE
+                INSERT INTO "{schema}".side_occupancy AS so ({columns})
+                SELECT side_id_fk, SUM(delta){extra}
+                FROM (SELECT side_id_fk, 1 AS delta FROM new_rows
+                      UNION ALL
+                      SELECT side_id_fk, -1 FROM old_rows) d
+                WHERE side_id_fk IS NOT NULL
+                GROUP BY side_id_fk{having}
+                ORDER BY side_id_fk{upsert};
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    '''
+
+
+def upgrade():
+    schema = _schema()
+    op.execute(f'''
+        ALTER TABLE "{schema}".side_occupancy
+            ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    ''')
+    op.execute(_occupancy_function(schema, versioned=True))
+
+    op.execute(f'''
+        CREATE TABLE IF NOT EXISTS "{schema}".data_versions (
+            scope      TEXT PRIMARY KEY,
+            version    BIGINT NOT NULL DEFAULT 0,
+            changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    ''')
+    op.execute(f'''
+        INSERT INTO "{schema}".data_versions (scope)
+        VALUES ('topology'), ('employees')
+        ON CONFLICT (scope) DO NOTHING
+    ''')
+    op.execute(f'''
+        CREATE OR REPLACE FUNCTION "{schema}".bump_data_version() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE "{schema}".data_versions
+            SET version = version + 1, changed_at = clock_timestamp()
+            WHERE scope = TG_ARGV[0];
+            RETURN NULL;
+        END
+        $$
+    ''')
+    for table, scope in VERSIONED_TABLES:
+        op.execute(f'DROP TRIGGER IF EXISTS trg_data_version ON "{schema}".{table}')
+        op.execute(
+            f'CREATE TRIGGER trg_data_version '
+            f'AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "{schema}".{table} '
+            f'FOR EACH STATEMENT EXECUTE FUNCTION "{schema}".bump_data_version(\'{scope}\')'
+        )
+
+
+def downgrade():
+    schema = _schema()
+    for table, _ in reversed(VERSIONED_TABLES):
+        op.execute(f'DROP TRIGGER IF EXISTS trg_data_version ON "{schema}".{table}')
+    op.execute(f'DROP FUNCTION IF EXISTS "{schema}".bump_data_version()')
+    op.execute(f'DROP TABLE IF EXISTS "{schema}".data_versions')
+    op.execute(_occupancy_function(schema, versioned=False))
+    op.execute(f'''
+        ALTER TABLE "{schema}".side_occupancy
+            DROP COLUMN IF EXISTS changed_at,
+            DROP COLUMN IF EXISTS version
+    ''')
@@ -1,7 +1,17 @@
+import os
+from unittest.mock import Mock
+import psycopg2
 import pytest
+import flask_migrate
 from app.main import create_app
 from app.extensions import db
 from app.config.settings import Settings
+from app.infra.db.register_repository_sql import RegisterRepositorySQL
+from benchmarks import synthetic
+
+# Esquema propio de las pruebas contra Postgres (no pisa dle_bench)
+PG_TEST_SCHEMA = 'dle_test'
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
 
 class TestSettings(Settings):
     TESTING = True
@@ -36,3 +46,85 @@ def client(app):
 @pytest.fixture(scope='module')
 def runner(app):
     return app.test_cli_runner()
+
+
+@pytest.fixture
+def mock_register_repo():
+    """
+    Fábrica de RegisterRepositorySQL sobre un cursor simulado:
+    `mock_register_repo(row)` -> (repo, cursor, cache), con `row` como
+    resultado de `fetchone`. Aplicar con patch.object(repo, "_get_cursor").
+    """
+    def make(row=None):
+        cursor = Mock()
+        cursor.fetchone.return_value = row
+        cache = Mock()
+        return RegisterRepositorySQL("public", occupancy_cache=cache), cursor, cache
+    return make
+
+
+def _postgres_url():
+    return os.getenv('TEST_DATABASE_URL') or os.getenv('BENCH_DATABASE_URL')
+
+
+@pytest.fixture(scope='session')
+def pg_app():
+    """
+    App contra un Postgres real: esquema sintético de benchmarks/ con las
+    migraciones aplicadas encima (triggers y funciones son los de
+    migrations/). Se omite si no hay TEST_DATABASE_URL ni BENCH_DATABASE_URL.
+    """
+    url = _postgres_url()
+    if not url:
+        pytest.skip("Define TEST_DATABASE_URL (o BENCH_DATABASE_URL) para las pruebas con Postgres")
+
+    conn = psycopg2.connect(url)
+    synthetic.build_schema(conn, lines=2, positions_per_line=2, employees=50,
+                           schema_name=PG_TEST_SCHEMA)
+
+    class PostgresTestSettings(Settings):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = url
+        DB_SCHEMA = PG_TEST_SCHEMA
+
+    app = create_app(PostgresTestSettings)
+    with app.app_context():
+        flask_migrate.upgrade(directory=MIGRATIONS_DIR)
+    yield app
+
+    with app.app_context():
+        db.engine.dispose()
+    synthetic.drop_schema(conn, schema_name=PG_TEST_SCHEMA)
+    conn.close()
+
+
+@pytest.fixture
+def pg_conn(pg_app):
+    """Conexión directa al esquema de pruebas, sin registros, presencia ni contadores."""
+    conn = psycopg2.connect(_postgres_url())
+    with conn.cursor() as cur:
+        cur.execute(f'SET search_path TO "{PG_TEST_SCHEMA}"')
+        cur.execute("TRUNCATE registers, employee_presence, side_occupancy, scan_idempotency "
+                    "RESTART IDENTITY")
+    conn.commit()
+    yield conn
+    conn.rollback()
+    conn.close()
+
+
+@pytest.fixture
+def pg_register_repo(pg_app, pg_conn):
+    """RegisterRepositorySQL del contenedor, usando la conexión del pool (get_db)."""
+    with pg_app.app_context():
+        yield pg_app.container.register_repo()
+
+
+@pytest.fixture
+def pg_sides(pg_conn):
+    """{side_id: line_id} de la topología sintética."""
+    with pg_conn.cursor() as cur:
+        cur.execute("SELECT s.side_id, p.line_id FROM tbl_sides_of_positions s "
+                    "JOIN positions p ON p.position_id = s.position_id_fk ORDER BY s.side_id")
+        sides = dict(cur.fetchall())
+    pg_conn.commit()
+    return sides
@@ -0,0 +1,65 @@
+from unittest.mock import Mock, patch
+from flask import Flask
+from app.api.v1.routes.settings_routes import create_settings_bp
+from app.infra.db.register_repository_sql import RegisterRepositorySQL
+
+
+def test_bulk_logout_is_one_statement_and_one_invalidation():
+    cursor = Mock()
+    cursor.fetchall.return_value = [(1, 4), (2, 0), (3, 7)]
+    cache = Mock()
+    repo = RegisterRepositorySQL("public", occupancy_cache=cache)
+
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        counts = repo.logout_active_users_bulk(business_unit="Inyección")
+
+    assert counts == {1: 4, 2: 0, 3: 7}
+    cursor.execute.assert_called_once()
+    params = cursor.execute.call_args[0][1]
+    assert params["line_ids"] == [] and params["business_unit"] == "Inyección"
+    cursor.connection.commit.assert_called_once()
+    cache.invalidate_lines.assert_called_once_with([1, 3])
+
+
+def test_bulk_logout_failure_rolls_back_without_invalidating():
+    cursor = Mock()
+    cursor.execute.side_effect = RuntimeError("db down")
+    cache = Mock()
+    repo = RegisterRepositorySQL("public", occupancy_cache=cache)
+
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        try:
+            repo.logout_active_users_bulk(line_ids=[1, 2])
+        except RuntimeError:
+            pass
+
+    cursor.connection.rollback.assert_called_once()
+    cache.invalidate_lines.assert_not_called()
+
+
+def _client(user_service):
+    app = Flask(__name__)
+    app.register_blueprint(create_settings_bp(user_service))
+    return app.test_client()
+
+
+def test_bulk_route_reports_counts_per_line():
+    user_service = Mock()
+    user_service.perform_bulk_logout.return_value = {4: 2, 9: 5}
+
+    response = _client(user_service).post("/settings/general-exit/bulk",
+                                           json={"line_ids": ["4", 9]})
+
+    assert response.status_code == 200
+    assert response.json["count"] == 7
+    assert response.json["lines"] == [{"line_id": 4, "count": 2}, {"line_id": 9, "count": 5}]
+    user_service.perform_bulk_logout.assert_called_once_with([4, 9], None)
+
+
+def test_bulk_route_requires_lines_or_business_unit():
+    user_service = Mock()
+    client = _client(user_service)
+
+    assert client.post("/settings/general-exit/bulk", json={}).status_code == 400
+    assert client.post("/settings/general-exit/bulk", json={"line_ids": ["x"]}).status_code == 400
+    user_service.perform_bulk_logout.assert_not_called()
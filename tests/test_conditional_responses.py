@@ -0,0 +1,108 @@
+from unittest.mock import Mock
+from flask import Flask
+from app.api.v1.routes.dashboard_routes import dashboards_bp
+from app.api.v1.routes.settings_routes import create_settings_bp
+from app.common.occupancy_cache import OccupancyCache
+from app.domain.services.dashboard_service import DashboardService
+from app.main import create_app
+
+
+def _setup(validator=("o3.t1.e1", 1_700_000_000.0)):
+    app = create_app()
+    repo = Mock()
+    repo.get_active_operators.return_value = ["Ana López"]
+    repo.get_data_validator.return_value = validator
+    dashboards_bp.dashboard_service = DashboardService(Mock(), repo, OccupancyCache(ttl_seconds=60))
+    return app.test_client(), repo
+
+
+def test_matching_etag_returns_304_without_running_the_view():
+    client, repo = _setup()
+
+    first = client.get("/dashboards/api/operators?id=5")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert etag == 'W/"o3.t1.e1"'
+    assert "Last-Modified" in first.headers
+    repo.get_data_validator.assert_called_with(("occupancy", "topology", "employees"))
+
+    second = client.get("/dashboards/api/operators?id=5", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert second.data == b""
+    # Ni la vista ni la consulta de datos: sólo la de versiones
+    repo.get_active_operators.assert_called_once_with(5)
+
+
+def test_new_data_version_returns_the_fresh_body():
+    client, repo = _setup()
+    etag = client.get("/dashboards/api/operators?id=5").headers["ETag"]
+
+    repo.get_data_validator.return_value = ("o4.t1.e1", 1_700_000_050.0)
+    response = client.get("/dashboards/api/operators?id=5", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] == 'W/"o4.t1.e1"'
+    assert repo.get_active_operators.call_count == 2
+
+
+def test_if_modified_since_without_etag():
+    client, repo = _setup()
+    last_modified = client.get("/dashboards/api/operators?id=5").headers["Last-Modified"]
+
+    response = client.get("/dashboards/api/operators?id=5",
+                          headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    repo.get_active_operators.assert_called_once()
+
+
+def test_without_versions_the_view_runs_without_validators():
+    client, repo = _setup(validator=None)
+
+    response = client.get("/dashboards/api/operators?id=5", headers={"If-None-Match": "*"})
+
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+
+def test_settings_hierarchy_uses_the_topology_version():
+    user_service = Mock()
+    user_service.get_data_validator.return_value = ("t7", 1_700_000_000.0)
+    user_service.get_all_lines_for_settings.return_value = []
+    app = Flask(__name__)
+    app.register_blueprint(create_settings_bp(user_service))
+    client = app.test_client()
+
+    etag = client.get("/settings/api/hierarchy").headers["ETag"]
+    response = client.get("/settings/api/hierarchy", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    user_service.get_data_validator.assert_called_with(("topology",))
+    user_service.get_all_lines_for_settings.assert_called_once()
+
+
+def test_versions_are_shared_and_track_writes_on_postgres(pg_app, pg_register_repo, pg_conn, pg_sides):
+    with pg_app.app_context():
+        # Dos repositorios = dos workers: la versión sale de Postgres, no de memoria
+        worker_a = pg_app.container.production_line_repo()
+        worker_b = type(worker_a)(worker_a.schema)
+        scopes = ("occupancy", "topology", "employees")
+        before = worker_a.get_data_validator(scopes)
+        assert before == worker_b.get_data_validator(scopes)
+
+        side_id = next(iter(pg_sides))
+        pg_register_repo.register_entry_or_assignment(100001, side_id)
+        after_checkin = worker_b.get_data_validator(scopes)
+        assert after_checkin[0] != before[0]
+        assert after_checkin[0].split(".")[1:] == before[0].split(".")[1:]
+
+        # Mismo side otra vez: la ocupación no cambia de número, pero la versión sí
+        pg_register_repo.register_entry_or_assignment(100001, side_id)
+        assert worker_a.get_data_validator(scopes)[0] != after_checkin[0]
+
+        topology = worker_a.get_data_validator(("topology",))[0]
+        with pg_conn.cursor() as cur:
+            cur.execute("UPDATE tbl_sides_of_positions SET employee_capacity = employee_capacity "
+                        "WHERE side_id = %s", (side_id,))
+        pg_conn.commit()
+        assert worker_b.get_data_validator(("topology",))[0] != topology
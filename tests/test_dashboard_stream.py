@@ -0,0 +1,49 @@
+from unittest.mock import Mock
+from app.common.occupancy_cache import OccupancyCache
+from app.domain.services.dashboard_service import DashboardService
+from app.api.v1.routes.dashboard_routes import dashboards_bp
+from app.main import create_app
+
+
+def _cards(working):
+    return [{
+        "position_name": "Estación 1",
+        "position_id": 10,
+        "status": True,
+        "sides": [
+            {"side_id": 1, "side_title": "LH", "employee_capacity": 1, "employees_working": working},
+            {"side_id": 2, "side_title": "RH", "employee_capacity": 1, "employees_working": 1},
+        ]
+    }]
+
+
+def test_diff_snapshots_only_reports_changed_sides():
+    service = DashboardService(Mock(), Mock())
+    before = {"sides": {1: {"side_id": 1, "employees_working": 0}, 2: {"side_id": 2, "employees_working": 1}},
+              "totals": {"active": 1}}
+    after = {"sides": {1: {"side_id": 1, "employees_working": 1}, 2: {"side_id": 2, "employees_working": 1}},
+             "totals": {"active": 2}}
+
+    diff = service.diff_snapshots(before, after)
+
+    assert diff == {"sides": [{"side_id": 1, "employees_working": 1}], "totals": {"active": 2}}
+    assert service.diff_snapshots(after, after) == {}
+
+
+def test_stations_stream_sends_initial_snapshot():
+    app = create_app()
+    app.config.update(SSE_MAX_STREAM_SECONDS=0.05, SSE_POLL_SECONDS=0.01)
+    repo = Mock()
+    repo.get_station_cards_for_line.return_value = _cards(0)
+    repo.get_line_name_by_id.return_value = "Línea 1"
+    dashboards_bp.dashboard_service = DashboardService(Mock(), repo, OccupancyCache(ttl_seconds=60))
+
+    response = app.test_client().get("/dashboards/stream/stations?line=1")
+    body = response.get_data(as_text=True)
+
+    assert response.mimetype == "text/event-stream"
+    assert body.startswith("retry:")
+    assert body.count("event: occupancy") == 1
+    assert '"employees_working": 0' in body
+    # Con la caché activa, el resto de vueltas no vuelven a consultar
+    repo.get_station_cards_for_line.assert_called_once_with(1)
@@ -0,0 +1,72 @@
+from flask import Flask
+from sqlalchemy.pool import QueuePool
+from app.extensions import db
+from app.infra.db.db import get_db, get_pool_stats, init_app as init_legacy_db
+from app.infra.db.pool import PoolMonitor
+
+
+def _app(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'pool.db'}"
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "poolclass": QueuePool, "pool_size": 2, "max_overflow": 1, "pool_timeout": 1,
+    }
+    db.init_app(app)
+    init_legacy_db(app)
+
+    @app.route("/ping")
+    def ping():
+        return "ok"
+
+    @app.route("/query")
+    def query():
+        cur = get_db().cursor()
+        cur.execute("SELECT 1")
+        cur.close()
+        return "ok"
+
+    return app
+
+
+def test_connection_is_checked_out_only_when_queried(tmp_path):
+    app = _app(tmp_path)
+    client = app.test_client()
+
+    with app.app_context():
+        before = get_pool_stats()["checkouts"]
+
+    client.get("/ping")
+    with app.app_context():
+        assert get_pool_stats()["checkouts"] == before
+
+    client.get("/query")
+    with app.app_context():
+        stats = get_pool_stats()
+    assert stats["checkouts"] == before + 1
+    # Devuelta al pool al cerrar el contexto de la petición
+    assert stats["checked_out"] == 0
+    assert stats["size"] == 2 and stats["max_overflow"] == 1
+
+
+def test_checked_out_while_request_holds_connection(tmp_path):
+    app = _app(tmp_path)
+    with app.app_context():
+        get_db()
+        get_db()  # misma conexión dentro de la petición
+        stats = get_pool_stats()
+    assert stats["checked_out"] == 1
+
+
+def test_monitor_tracks_waits_and_timeouts():
+    monitor = PoolMonitor()
+    monitor.record_wait(0.002)
+    monitor.record_wait(0.004)
+    monitor.record_timeout()
+
+    class _Engine:
+        pool = object()
+
+    stats = monitor.stats(_Engine())
+    assert stats["checkouts"] == 2 and stats["timeouts"] == 1
+    assert stats["wait_avg_ms"] == 3.0 and stats["wait_max_ms"] == 4.0
+    assert stats["pool_class"] == "object"
@@ -0,0 +1,139 @@
+from unittest.mock import Mock
+from app.domain.entities.user import User
+from app.infra.db.employee_directory import EmployeeDirectory
+
+
+def _user(user_id, card):
+    return User(id=user_id, name=f"Nombre {user_id}", last_name="Apellido", numero_tarjeta=card)
+
+
+def _directory(**kwargs):
+    repo = Mock()
+    repo.list_employees.return_value = [("1001", _user(1, 1001)), ("1002", _user(2, 1002))]
+    repo.employee_changes_watermark.return_value = 100
+    repo.employee_changes_since.return_value = (100, [])
+    return EmployeeDirectory(repo, **kwargs), repo
+
+
+def test_lookups_are_served_from_memory_after_preload():
+    directory, repo = _directory()
+
+    assert directory.find_user_by_card_number(1001).id == 1
+    assert directory.find_by_id(2).numero_tarjeta == 1002
+    repo.list_employees.assert_called_once_with()
+    repo.find_user_by_card_number.assert_not_called()
+    stats = directory.stats()
+    assert stats["employees"] == 2
+    assert stats["hits"] == 2
+    assert stats["memory_bytes"] > 0
+
+
+def test_miss_falls_back_to_database_and_is_remembered():
+    directory, repo = _directory()
+    repo.find_user_by_card_number.return_value = _user(3, 1003)
+
+    assert directory.find_user_by_card_number(1003).id == 3
+    assert directory.find_user_by_card_number(1003).id == 3
+    repo.find_user_by_card_number.assert_called_once_with(1003)
+
+
+def test_no_changes_keeps_the_loaded_directory():
+    directory, repo = _directory(refresh_seconds=0)
+    directory.find_by_id(1)
+    directory.find_by_id(2)
+
+    repo.list_employees.assert_called_once_with()
+    repo.employee_changes_since.assert_called_once_with(100)
+    assert directory.stats()["change_checks"] == 1
+
+
+def test_edits_in_another_worker_reload_only_the_changed_rows():
+    directory, repo = _directory(refresh_seconds=0)
+    directory.find_by_id(1)
+    # Cambio de tarjeta de 1 y baja de 2 hechos fuera de este worker
+    repo.employee_changes_since.return_value = (105, [1, 2])
+    repo.list_employees.return_value = [("2001", _user(1, 2001))]
+    repo.find_user_by_card_number.return_value = None
+    repo.find_by_id.return_value = None
+
+    assert directory.find_user_by_card_number(2001).id == 1
+    repo.list_employees.assert_called_with([1, 2])
+    repo.employee_changes_since.return_value = (105, [])
+    assert directory.find_user_by_card_number(1001) is None
+    assert directory.find_by_id(2) is None
+    assert directory.find_user_by_card_number(1002) is None
+    # La siguiente consulta parte de la nueva marca de agua
+    assert repo.employee_changes_since.call_args[0][0] == 105
+    stats = directory.stats()
+    assert stats["full_reloads"] == 1
+    assert stats["changes_applied"] == 2
+
+
+def test_refresh_runs_outside_the_lock_and_only_once():
+    directory, repo = _directory(refresh_seconds=0)
+    directory.find_by_id(1)
+    seen = []
+
+    def changes_since(watermark):
+        # Sin el lock tomado, y una búsqueda concurrente no repite la consulta
+        assert directory._lock.acquire(blocking=False)
+        directory._lock.release()
+        seen.append(directory.find_by_id(2).id)
+        return watermark, []
+    repo.employee_changes_since.side_effect = changes_since
+
+    directory.find_by_id(1)
+
+    assert seen == [2]
+    assert repo.employee_changes_since.call_count == 1
+
+
+def test_failed_refresh_keeps_serving_from_memory():
+    directory, repo = _directory(refresh_seconds=0)
+    directory.find_by_id(1)
+    repo.employee_changes_since.side_effect = RuntimeError("Postgres no disponible")
+
+    assert directory.find_user_by_card_number(1002).id == 2
+    repo.find_user_by_card_number.assert_not_called()
+
+
+def test_invalidate_forces_full_reload():
+    directory, repo = _directory()
+    directory.find_by_id(1)
+    repo.list_employees.return_value = [("2001", _user(1, 2001))]
+
+    repo.find_user_by_card_number.return_value = None
+    directory.invalidate()
+
+    assert directory.find_user_by_card_number(1001) is None
+    assert directory.find_user_by_card_number(2001).id == 1
+    assert directory.stats()["full_reloads"] == 2
+
+
+def test_change_log_reports_edits_and_deletes_on_postgres(pg_app, pg_conn, monkeypatch):
+    from app.infra.db.models import UserModel
+    from tests.conftest import PG_TEST_SCHEMA
+    monkeypatch.setattr(UserModel.__table__, "schema", PG_TEST_SCHEMA)
+
+    with pg_app.app_context():
+        repo = pg_app.container.user_repo_sql()
+        watermark = repo.employee_changes_watermark()
+        with pg_conn.cursor() as cur:
+            cur.execute("UPDATE table_empleados_tarjeta SET numero_tarjeta = '900001' "
+                        "WHERE id_empleado = 1")
+            cur.execute("INSERT INTO table_empleados_tarjeta (nombre_empleado, numero_tarjeta) "
+                        "VALUES ('Nuevo', '900002') RETURNING id_empleado")
+            new_id = cur.fetchone()[0]
+        pg_conn.commit()
+
+        watermark, changed = repo.employee_changes_since(watermark)
+        assert sorted(changed) == [1, new_id]
+        rows = repo.list_employees(changed)
+        assert [(card, user.id) for card, user in rows] == [("900001", 1), ("900002", new_id)]
+
+        with pg_conn.cursor() as cur:
+            cur.execute("DELETE FROM table_empleados_tarjeta WHERE id_empleado = %s", (new_id,))
+            cur.execute("UPDATE table_empleados_tarjeta SET numero_tarjeta = '100001' "
+                        "WHERE id_empleado = 1")
+        pg_conn.commit()
+        assert sorted(repo.employee_changes_since(watermark)[1]) == [1, new_id]
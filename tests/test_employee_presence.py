@@ -0,0 +1,113 @@
+from unittest.mock import patch
+import pytest
+
+
+def test_checkin_updates_presence_in_the_same_statement(mock_register_repo):
+    repo, cursor, _ = mock_register_repo((None, None, 11, 2))
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        repo.register_entry_or_assignment(user_id=123, side_id=5)
+
+    cursor.execute.assert_called_once()
+    query = cursor.execute.call_args[0][0]
+    assert "INSERT INTO \"public\".employee_presence" in query
+    assert "DELETE FROM \"public\".employee_presence" in query
+
+
+def test_line_logout_clears_presence_and_counts_closed_registers(mock_register_repo):
+    repo, cursor, cache = mock_register_repo((4,))
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        assert repo.logout_active_users_in_line(3) == 4
+
+    cursor.execute.assert_called_once()
+    assert "employee_presence" in cursor.execute.call_args[0][0]
+    cursor.connection.commit.assert_called_once()
+    cache.invalidate_lines.assert_called_once_with([3])
+
+
+def test_last_register_type_reads_presence_only(mock_register_repo):
+    repo, cursor, _ = mock_register_repo(("Exit",))
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        assert repo.get_last_register_type(42) == "Exit"
+
+    query = cursor.execute.call_args[0][0]
+    assert "employee_presence" in query and "registers" not in query
+
+
+def test_rebuild_replaces_presence_under_a_write_lock(mock_register_repo):
+    repo, cursor, cache = mock_register_repo()
+    cursor.rowcount = 17
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        assert repo.rebuild_presence() == 17
+
+    statements = [c[0][0] for c in cursor.execute.call_args_list]
+    assert statements[0].startswith("LOCK TABLE \"public\".registers")
+    assert statements[1] == "DELETE FROM \"public\".employee_presence"
+    assert "DISTINCT ON (id_employee)" in statements[2]
+    cursor.connection.commit.assert_called_once()
+    cache.invalidate_all.assert_called_once()
+
+
+def test_failed_rebuild_rolls_back(mock_register_repo):
+    repo, cursor, cache = mock_register_repo()
+    cursor.execute.side_effect = [None, None, RuntimeError("boom")]
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        with pytest.raises(RuntimeError):
+            repo.rebuild_presence()
+
+    cursor.connection.rollback.assert_called_once()
+    cursor.connection.commit.assert_not_called()
+    cache.invalidate_all.assert_not_called()
+
+
+def _presence(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT id_employee, id_register, side_id_fk FROM employee_presence")
+        rows = {employee: (register, side) for employee, register, side in cur.fetchall()}
+    conn.commit()
+    return rows
+
+
+def test_presence_follows_checkins_on_postgres(pg_register_repo, pg_conn):
+    repo = pg_register_repo
+
+    first = repo.register_entry_or_assignment(user_id=101, side_id=1)
+    assert _presence(pg_conn) == {101: (first, 1)}
+    # Cambio de estación: la fila de presencia se reemplaza (upsert)
+    second = repo.register_entry_or_assignment(user_id=101, side_id=3)
+    assert _presence(pg_conn) == {101: (second, 3)}
+    assert repo.get_last_register_type(101) == "Exit"
+    # Salida: se elimina
+    assert repo.register_entry_or_assignment(user_id=101, side_id=0) is None
+    assert _presence(pg_conn) == {}
+    assert repo.get_last_register_type(101) == "Entry"
+
+
+def test_line_logout_clears_presence_on_postgres(pg_register_repo, pg_conn, pg_sides):
+    repo = pg_register_repo
+    line_a, line_b = sorted(set(pg_sides.values()))
+    side_a = next(s for s, line in pg_sides.items() if line == line_a)
+    side_b = next(s for s, line in pg_sides.items() if line == line_b)
+    repo.register_entry_or_assignment(user_id=101, side_id=side_a)
+    repo.register_entry_or_assignment(user_id=102, side_id=side_a)
+    kept = repo.register_entry_or_assignment(user_id=103, side_id=side_b)
+
+    assert repo.logout_active_users_in_line(line_a) == 2
+    assert _presence(pg_conn) == {103: (kept, side_b)}
+
+
+def test_rebuild_presence_repairs_drift_on_postgres(pg_register_repo, pg_conn):
+    repo = pg_register_repo
+    open_101 = repo.register_entry_or_assignment(user_id=101, side_id=1)
+    open_102 = repo.register_entry_or_assignment(user_id=102, side_id=2)
+    repo.register_entry_or_assignment(user_id=103, side_id=2)
+    repo.register_entry_or_assignment(user_id=103, side_id=0)
+
+    # Desviación: falta un presente y sobra uno que ya salió
+    with pg_conn.cursor() as cur:
+        cur.execute("DELETE FROM employee_presence WHERE id_employee = 102")
+        cur.execute("INSERT INTO employee_presence (id_employee, id_register, side_id_fk) "
+                    "VALUES (103, 999, 2)")
+    pg_conn.commit()
+
+    assert repo.rebuild_presence() == 2
+    assert _presence(pg_conn) == {101: (open_101, 1), 102: (open_102, 2)}
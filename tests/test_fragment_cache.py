@@ -0,0 +1,45 @@
+from unittest.mock import Mock
+from app.common.fragment_cache import FragmentCache
+from app.common.occupancy_cache import OccupancyCache
+from app.domain.services.dashboard_service import DashboardService
+
+
+def test_lru_evicts_least_recently_used():
+    cache = FragmentCache(max_entries=2)
+    cache.get_or_render("a", lambda: "A")
+    cache.get_or_render("b", lambda: "B")
+    cache.get_or_render("a", lambda: "otro")   # "a" pasa a ser el más reciente
+    cache.get_or_render("c", lambda: "C")      # desaloja "b"
+
+    assert cache.get_or_render("a", lambda: "nuevo") == "A"
+    assert cache.get_or_render("b", lambda: "B2") == "B2"
+    stats = cache.stats()
+    assert stats["evictions"] == 2
+    assert stats["entries"] == 2
+    assert stats["hits"] == 2
+
+
+def _cards(working):
+    return [{
+        "position_name": "Estación 1",
+        "status": True,
+        "sides": [{"side_id": 1, "side_title": "LH", "employee_capacity": 1,
+                   "employees_working": working}]
+    }]
+
+
+def test_station_view_rerenders_only_when_occupancy_changes():
+    repo = Mock()
+    repo.get_station_cards_for_line.side_effect = [_cards(0), _cards(0), _cards(1)]
+    repo.get_line_name_by_id.return_value = "Línea 1"
+    # TTL 0: cada petición vuelve a leer la ocupación, como otro worker
+    service = DashboardService(Mock(), repo, OccupancyCache(ttl_seconds=0), FragmentCache())
+    render = Mock(side_effect=lambda data: f"<p>{data['cards'][0]['sides'][0]['employees_working']}</p>")
+
+    first = service.render_station_view("stations_dashboard", 1, render)
+    second = service.render_station_view("stations_dashboard", 1, render)
+    third = service.render_station_view("stations_dashboard", 1, render)
+
+    assert first == second == "<p>0</p>"
+    assert third == "<p>1</p>"
+    assert render.call_count == 2
@@ -0,0 +1,81 @@
+import threading
+from unittest.mock import Mock
+import pytest
+from app.infra.db.group_commit import GroupCommitExecutor
+from app.infra.db.register_repository_sql import RegisterRepositorySQL
+
+
+def _applied(batch):
+    return [{"key": None, "status": "applied", "register_id": s["user_id"], "error": None}
+            for s in batch]
+
+
+def test_concurrent_scans_share_one_batch_and_get_their_own_result():
+    executor = GroupCommitExecutor(window_ms=200, max_batch=8)
+    apply_batch = Mock(side_effect=_applied)
+    barrier = threading.Barrier(8)
+    results = {}
+
+    def scan(user_id):
+        barrier.wait()
+        results[user_id] = executor.submit({"user_id": user_id}, apply_batch)
+
+    threads = [threading.Thread(target=scan, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    # El lote se llenó (max_batch) y se aplicó una sola vez
+    apply_batch.assert_called_once()
+    assert {i: r["register_id"] for i, r in results.items()} == {i: i for i in range(8)}
+    assert executor.stats()["largest_batch"] == 8
+
+
+def test_batches_run_in_opening_order():
+    executor = GroupCommitExecutor(window_ms=0, max_batch=1)
+    applied = []
+    release = threading.Event()
+
+    def slow_apply(batch):
+        if batch[0]["user_id"] == 1:
+            release.wait(5)
+        applied.extend(s["user_id"] for s in batch)
+        return _applied(batch)
+
+    first = threading.Thread(target=executor.submit, args=({"user_id": 1}, slow_apply))
+    first.start()
+    second = threading.Thread(target=executor.submit, args=({"user_id": 2}, slow_apply))
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert applied == [1, 2]
+
+
+def test_batch_failure_is_raised_to_every_waiter():
+    executor = GroupCommitExecutor(window_ms=0)
+
+    with pytest.raises(RuntimeError):
+        executor.submit({"user_id": 1}, Mock(side_effect=RuntimeError("db down")))
+    # El siguiente lote no queda bloqueado por el que falló
+    assert executor.submit({"user_id": 2}, _applied)["status"] == "applied"
+
+
+def test_repository_routes_checkin_through_group_commit():
+    repo = RegisterRepositorySQL("dle", group_commit=GroupCommitExecutor(window_ms=0))
+    repo.apply_scans = Mock(side_effect=lambda batch: [
+        {"key": None, "status": "rejected", "register_id": None,
+         "error": "Side con ID 99 no encontrado"} if s["side_id"] == 99 else
+        {"key": None, "status": "applied", "register_id": 42, "error": None}
+        for s in batch
+    ])
+
+    assert repo.register_entry_or_assignment(7, 3) == 42
+    scan = repo.apply_scans.call_args[0][0][0]
+    assert (scan["key"], scan["user_id"], scan["side_id"]) == (None, 7, 3)
+
+    with pytest.raises(ValueError):
+        repo.register_entry_or_assignment(7, 99)
+    assert repo.get_group_commit_stats()["batches"] == 2
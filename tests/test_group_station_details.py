@@ -0,0 +1,25 @@
+from unittest.mock import Mock
+from app.common.occupancy_cache import OccupancyCache
+from app.domain.services.dashboard_service import DashboardService
+
+
+def test_group_mode_uses_single_group_query():
+    repo = Mock()
+    repo.get_group_machine_occupancy.return_value = [
+        {"id": 7, "name": "1", "type_zone": "Inyectora", "position_id": 70,
+         "side_id": 700, "capacity": 2, "operators": 1},
+        {"id": 9, "name": "AFE", "type_zone": "Inyectora", "position_id": 90,
+         "side_id": 900, "capacity": None, "operators": 0},
+    ]
+    service = DashboardService(Mock(), repo, OccupancyCache())
+
+    details = service.get_station_details_for_line(-1)
+
+    repo.get_group_machine_occupancy.assert_called_once_with("Inyección")
+    repo.get_all_lines_summary.assert_not_called()
+    assert details["line"] == "Inyección"
+    assert details["tipo"] == "Inyectora"
+    assert [c["position_name"] for c in details["cards"]] == ["1", "AFE"]
+    assert details["cards"][0]["sides"][0]["employees_working"] == 1
+    assert details["cards"][1]["sides"][0]["employee_capacity"] == 0
+    assert details["cards"][1]["is_afe"] is True
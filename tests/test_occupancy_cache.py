@@ -0,0 +1,96 @@
+from unittest.mock import Mock
+from app.common.occupancy_cache import OccupancyCache
+from app.domain.services.dashboard_service import DashboardService
+
+
+def _cards(line_id, working=0):
+    return [{
+        "position_name": f"Estación {line_id}",
+        "position_id": line_id * 10,
+        "status": True,
+        "sides": [{"side_id": line_id * 100, "side_title": "BP", "name_side": "BP",
+                   "employee_capacity": 2, "employees_working": working}]
+    }]
+
+
+def test_second_read_is_served_from_cache():
+    repo = Mock()
+    repo.get_station_cards_for_line.side_effect = _cards
+    repo.get_line_name_by_id.return_value = "Línea 1"
+    service = DashboardService(Mock(), repo, OccupancyCache(ttl_seconds=60))
+
+    service.get_station_details_for_line(1)
+    service.get_station_details_for_line(1)
+
+    repo.get_station_cards_for_line.assert_called_once_with(1)
+    stats = service.get_cache_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+
+
+def test_returned_values_are_copies():
+    cache = OccupancyCache(ttl_seconds=60)
+    cache.get_or_load("k", lambda: _cards(1), depends_on=lambda _: [1])
+
+    first = cache.get_or_load("k", lambda: _cards(1))
+    first[0]["sides"][0]["class"] = "employee-ok"
+
+    assert "class" not in cache.get_or_load("k", lambda: _cards(1))[0]["sides"][0]
+
+
+def test_invalidate_lines_only_drops_dependent_entries():
+    cache = OccupancyCache(ttl_seconds=60)
+    loader_1, loader_2, loader_all = Mock(return_value=1), Mock(return_value=2), Mock(return_value=3)
+    cache.get_or_load(("cards", 1), loader_1, depends_on=lambda _: [1])
+    cache.get_or_load(("cards", 2), loader_2, depends_on=lambda _: [2])
+    cache.get_or_load(("summary",), loader_all, depends_on=lambda _: [1, 2])
+
+    cache.invalidate_lines([1])
+
+    cache.get_or_load(("cards", 1), loader_1, depends_on=lambda _: [1])
+    cache.get_or_load(("cards", 2), loader_2, depends_on=lambda _: [2])
+    cache.get_or_load(("summary",), loader_all, depends_on=lambda _: [1, 2])
+    assert loader_1.call_count == 2
+    assert loader_2.call_count == 1
+    assert loader_all.call_count == 2
+
+
+def test_unknown_line_invalidates_everything():
+    cache = OccupancyCache(ttl_seconds=60)
+    loader = Mock(return_value=1)
+    cache.get_or_load("k", loader, depends_on=lambda _: [5])
+    cache.invalidate_lines([None])
+    cache.get_or_load("k", loader, depends_on=lambda _: [5])
+    assert loader.call_count == 2
+
+
+def test_ttl_expiry_reloads():
+    cache = OccupancyCache(ttl_seconds=0)
+    loader = Mock(return_value=1)
+    cache.get_or_load("k", loader)
+    cache.get_or_load("k", loader)
+    assert loader.call_count == 2
+
+
+def test_disabled_cache_always_loads():
+    cache = OccupancyCache(enabled=False)
+    loader = Mock(return_value=1)
+    cache.get_or_load("k", loader)
+    cache.get_or_load("k", loader)
+    assert loader.call_count == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_keys_beyond_the_limit_are_evicted_with_their_versions():
+    cache = OccupancyCache(ttl_seconds=60, max_keys=2)
+    cache.get_versioned(("station_cards", 1), lambda: _cards(1))
+    cache.get_versioned(("station_cards", 2), lambda: _cards(2))
+    # Uso reciente: la 1 pasa a ser la más nueva
+    cache.get_versioned(("station_cards", 1), lambda: _cards(1))
+    cache.get_versioned(("station_cards", 999), lambda: [])
+
+    stats = cache.stats()
+    assert (stats["keys"], stats["entries"], stats["evictions"]) == (2, 2, 1)
+    loader = Mock(return_value=_cards(2))
+    cache.get_versioned(("station_cards", 2), loader)
+    loader.assert_called_once()
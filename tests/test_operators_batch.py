@@ -0,0 +1,41 @@
+from unittest.mock import Mock
+from app.common.occupancy_cache import OccupancyCache
+from app.domain.services.dashboard_service import DashboardService
+from app.api.v1.routes.dashboard_routes import dashboards_bp
+from app.main import create_app
+
+
+def _client(repo):
+    app = create_app()
+    repo.get_data_validator.return_value = None
+    dashboards_bp.dashboard_service = DashboardService(Mock(), repo, OccupancyCache())
+    return app.test_client()
+
+
+def test_batch_by_side_ids_returns_rosters_keyed_by_side():
+    repo = Mock()
+    repo.get_active_operators_by_side.return_value = {1: ["Ana López"], 2: []}
+
+    response = _client(repo).get("/dashboards/api/operators/batch?ids=1,2")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"1": ["Ana López"], "2": []}
+    repo.get_active_operators_by_side.assert_called_once_with(side_ids=[1, 2])
+
+
+def test_batch_by_line_and_group_fallback_to_sides():
+    repo = Mock()
+    repo.get_active_operators_by_side.return_value = {}
+    client = _client(repo)
+
+    client.get("/dashboards/api/operators/batch?line=4")
+    repo.get_active_operators_by_side.assert_called_with(line_id=4)
+
+    # Los grupos (-1, -2) no son líneas reales: se consultan por side
+    client.get("/dashboards/api/operators/batch?line=-1&ids=7")
+    repo.get_active_operators_by_side.assert_called_with(side_ids=[7])
+
+
+def test_batch_rejects_invalid_ids():
+    response = _client(Mock()).get("/dashboards/api/operators/batch?ids=1,x")
+    assert response.status_code == 400
@@ -0,0 +1,96 @@
+import os
+import pytest
+from flask import Blueprint, Flask
+from app.api.v1.routes.main.photos import register_photos
+from app.infra.media.photo_derivatives import PhotoDerivatives
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _photo(path, size=(1200, 1600), color="red"):
+    Image.new("RGB", size, color).save(path, "PNG")
+
+
+def _derivatives(tmp_path, **kwargs):
+    source = tmp_path / "media"
+    source.mkdir()
+    return source, PhotoDerivatives(str(source), str(tmp_path / "cache"), **kwargs)
+
+
+def test_lazy_generation_resizes_with_content_hashed_names(tmp_path):
+    source, derivatives = _derivatives(tmp_path)
+    _photo(source / "42.png")
+
+    names = derivatives.get("42.png")
+
+    assert set(names) == {300, 600}
+    assert names[300].startswith("42.png-300w-") and names[300].endswith(".jpg")
+    with Image.open(os.path.join(derivatives.cache_dir, names[300])) as small:
+        assert small.size == (300, 400)
+    # Segunda petición: ya existen, no se regeneran
+    assert derivatives.get("42.png") == names
+    assert derivatives.stats()["generated"] == 2
+
+
+def test_changed_source_gets_new_name_and_old_files_are_removed(tmp_path):
+    source, derivatives = _derivatives(tmp_path, recheck_seconds=0)
+    _photo(source / "7.png")
+    old = derivatives.get("7.png")
+
+    _photo(source / "7.png", color="blue")
+    os.utime(source / "7.png", ns=(1, 1))
+    new = derivatives.get("7.png")
+
+    assert new[300] != old[300]
+    assert sorted(os.listdir(derivatives.cache_dir)) == sorted(new.values())
+
+
+def test_other_sources_derivatives_are_kept(tmp_path):
+    source, derivatives = _derivatives(tmp_path, recheck_seconds=0)
+    _photo(source / "7.png")
+    _photo(source / "7.jpg")
+    _photo(source / "7-b.png")
+    others = {*derivatives.get("7.jpg").values(), *derivatives.get("7-b.png").values()}
+    derivatives.get("7.png")
+
+    _photo(source / "7.png", color="blue")
+    os.utime(source / "7.png", ns=(1, 1))
+    new = derivatives.get("7.png")
+
+    assert set(os.listdir(derivatives.cache_dir)) == others | set(new.values())
+
+
+def test_missing_or_disabled_returns_none(tmp_path):
+    source, derivatives = _derivatives(tmp_path)
+    assert derivatives.get("404.png") is None
+
+    _photo(source / "1.png")
+    disabled = PhotoDerivatives(str(source), str(tmp_path / "cache"), enabled=False)
+    assert disabled.get("1.png") is None
+
+
+def test_generate_all_for_cli(tmp_path):
+    source, derivatives = _derivatives(tmp_path)
+    _photo(source / "1.png")
+    _photo(source / "2.png")
+    (source / "notes.png").write_text("no es imagen")
+
+    assert derivatives.generate_all() == {"processed": 2, "failed": 1}
+
+
+def test_served_with_long_lived_cache_headers(tmp_path):
+    source, derivatives = _derivatives(tmp_path)
+    _photo(source / "42.png")
+    name = derivatives.get("42.png")[300]
+
+    app = Flask(__name__)
+    bp = Blueprint("main", __name__)
+    register_photos(bp, derivatives)
+    app.register_blueprint(bp)
+    response = app.test_client().get(f"/photos/{name}")
+
+    assert response.status_code == 200
+    assert response.mimetype == "image/jpeg"
+    assert response.cache_control.max_age == 365 * 24 * 3600
+    assert response.cache_control.immutable
+    response.close()
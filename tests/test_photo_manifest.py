@@ -0,0 +1,73 @@
+import os
+from unittest.mock import Mock, patch
+from flask import Flask
+from app.api.v1.routes.settings_routes import create_settings_bp
+from app.infra.media.photo_manifest import PhotoManifest
+
+
+def test_lookup_is_set_membership_without_stat(tmp_path):
+    (tmp_path / "42.png").write_bytes(b"png")
+    manifest = PhotoManifest(str(tmp_path), rescan_seconds=60)
+    manifest.rescan()
+
+    with patch("app.infra.media.photo_manifest.os.stat") as stat, \
+            patch("app.infra.media.photo_manifest.os.path.exists") as exists:
+        assert manifest.contains("42.png")
+        assert not manifest.contains("7.png")
+    stat.assert_not_called()
+    exists.assert_not_called()
+
+
+def test_directory_mtime_change_triggers_relisting(tmp_path):
+    manifest = PhotoManifest(str(tmp_path), rescan_seconds=0)
+    assert not manifest.contains("7.png")
+
+    (tmp_path / "7.png").write_bytes(b"png")
+    # Forzar un mtime distinto aunque el reloj del sistema de archivos sea grueso
+    os.utime(tmp_path, ns=(1, 1))
+
+    assert manifest.contains("7.png")
+    assert manifest.stats()["rescans"] == 2
+
+
+def test_unchanged_directory_is_not_relisted(tmp_path):
+    manifest = PhotoManifest(str(tmp_path), rescan_seconds=0)
+    manifest.contains("1.png")
+    manifest.contains("1.png")
+    assert manifest.stats()["rescans"] == 1
+
+
+def test_listing_failure_keeps_previous_photos_and_retries(tmp_path):
+    (tmp_path / "42.png").write_bytes(b"png")
+    manifest = PhotoManifest(str(tmp_path), rescan_seconds=0)
+    assert manifest.contains("42.png")
+
+    (tmp_path / "7.png").write_bytes(b"png")
+    os.utime(tmp_path, ns=(1, 1))
+    with patch("app.infra.media.photo_manifest.os.scandir", side_effect=OSError("mount")):
+        assert manifest.contains("42.png")
+    assert manifest.stats()["failures"] == 1
+
+    # La siguiente revisión ve el mtime distinto y vuelve a listar
+    assert manifest.contains("7.png")
+    assert manifest.contains("42.png")
+
+
+def test_disabled_manifest_checks_the_disk(tmp_path):
+    manifest = PhotoManifest(str(tmp_path), enabled=False)
+    (tmp_path / "9.png").write_bytes(b"png")
+    assert manifest.contains("9.png")
+
+
+def test_admin_rescan_endpoint(tmp_path):
+    manifest = PhotoManifest(str(tmp_path), rescan_seconds=3600)
+    manifest.rescan()
+    (tmp_path / "5.png").write_bytes(b"png")
+
+    app = Flask(__name__)
+    app.register_blueprint(create_settings_bp(Mock(), manifest))
+    response = app.test_client().post("/settings/api/photo-manifest/rescan")
+
+    assert response.status_code == 200
+    assert response.json["manifest"]["photos"] == 1
+    assert manifest.contains("5.png")
@@ -0,0 +1,119 @@
+from unittest.mock import Mock, patch
+import psycopg2
+import pytest
+from psycopg2 import extensions
+from app.infra.db.prepared_statements import PreparedStatementRegistry
+from app.infra.db.register_repository_sql import RegisterRepositorySQL
+
+
+class _StatementMissing(psycopg2.OperationalError):
+    pgcode = "26000"
+
+
+class _Conn:
+    def __init__(self, status=extensions.TRANSACTION_STATUS_IDLE):
+        self.status = status
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class _Cursor:
+    def __init__(self, conn, fail_on_execute=0):
+        self.connection = conn
+        self.calls = []
+        self._fail_on_execute = fail_on_execute
+
+    def execute(self, query, params=None):
+        self.calls.append((query, params))
+        if query.startswith("EXECUTE") and self._fail_on_execute:
+            self._fail_on_execute -= 1
+            raise _StatementMissing("prepared statement does not exist")
+
+
+QUERY = "SELECT name FROM dle.lines WHERE line_id = %s AND name LIKE 'x%%'"
+
+
+def test_prepares_once_per_connection_and_executes_by_name():
+    registry = PreparedStatementRegistry()
+    conn = _Conn()
+    first, second = _Cursor(conn), _Cursor(conn)
+
+    registry.execute(first, "line_name", QUERY, (5,))
+    registry.execute(second, "line_name", QUERY, (6,))
+
+    prepare_sql = first.calls[0][0]
+    assert prepare_sql.startswith("PREPARE dle_line_name_")
+    assert "line_id = $1 AND name LIKE 'x%'" in prepare_sql
+    assert first.calls[1][0].startswith("EXECUTE dle_line_name_") and first.calls[1][1] == (5,)
+    # Otro checkout de la misma conexión: sólo EXECUTE
+    assert len(second.calls) == 1 and second.calls[0][1] == (6,)
+
+    # Otra conexión (p. ej. tras reconectar) prepara de nuevo
+    other = _Cursor(_Conn())
+    registry.execute(other, "line_name", QUERY, (7,))
+    assert other.calls[0][0] == prepare_sql
+    assert registry.stats()["prepares"] == 2
+
+
+def test_named_params_map_to_positions():
+    registry = PreparedStatementRegistry()
+    cursor = _Cursor(_Conn())
+
+    registry.execute(cursor, "checkin", "SELECT %(a)s, %(b)s, %(a)s", {"b": 2, "a": 1})
+
+    assert cursor.calls[0][0].endswith("AS SELECT $1, $2, $1")
+    assert cursor.calls[1][1] == (1, 2)
+
+
+def test_missing_statement_is_reprepared_when_idle():
+    registry = PreparedStatementRegistry()
+    conn = _Conn()
+    registry.execute(_Cursor(conn), "line_name", QUERY, (5,))
+
+    # La sesión perdió la sentencia (p. ej. DISCARD ALL)
+    cursor = _Cursor(conn, fail_on_execute=1)
+    registry.execute(cursor, "line_name", QUERY, (5,))
+
+    assert conn.rollbacks == 1
+    assert [q.split()[0] for q, _ in cursor.calls] == ["EXECUTE", "PREPARE", "EXECUTE"]
+    assert registry.stats()["reprepares"] == 1
+
+
+def test_missing_statement_inside_transaction_is_raised_and_reprepared_next_time():
+    registry = PreparedStatementRegistry()
+    conn = _Conn()
+    registry.execute(_Cursor(conn), "line_name", QUERY, (5,))
+
+    conn.status = extensions.TRANSACTION_STATUS_INTRANS
+    with pytest.raises(psycopg2.OperationalError):
+        registry.execute(_Cursor(conn, fail_on_execute=1), "line_name", QUERY, (5,))
+    assert conn.rollbacks == 0
+
+    cursor = _Cursor(conn)
+    registry.execute(cursor, "line_name", QUERY, (5,))
+    assert cursor.calls[0][0].startswith("PREPARE")
+
+
+def test_disabled_registry_executes_directly():
+    cursor = Mock()
+    PreparedStatementRegistry(enabled=False).execute(cursor, "line_name", QUERY, (5,))
+    cursor.execute.assert_called_once_with(QUERY, (5,))
+
+
+def test_repository_routes_hot_query_through_registry():
+    statements = Mock()
+    repo = RegisterRepositorySQL("public", statements=statements)
+    cursor = Mock()
+    cursor.fetchone.return_value = ("Exit",)
+
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        assert repo.get_last_register_type(42) == "Exit"
+
+    name, params = statements.execute.call_args[0][1], statements.execute.call_args[0][3]
+    assert (name, params) == ("last_register_type", (42,))
+    cursor.execute.assert_not_called()
@@ -0,0 +1,50 @@
+from unittest.mock import Mock, patch
+from app.infra.db.active_staff_repository_sql import ActiveStaffRepositorySQL
+from app.infra.db.query_catalog import QueryCatalog
+from app.infra.db.register_repository_sql import RegisterRepositorySQL
+
+
+def test_compile_resolves_schema_once_per_schema():
+    catalog = QueryCatalog({"one": "SELECT 1 FROM {schema}.t WHERE id = %s"})
+
+    first = catalog.compile("dle")
+    assert first["one"] == 'SELECT 1 FROM "dle".t WHERE id = %s'
+    assert catalog.compile("dle") is first
+    assert catalog.compile("other")["one"] == 'SELECT 1 FROM "other".t WHERE id = %s'
+
+
+def test_schema_is_quoted_like_an_identifier():
+    catalog = QueryCatalog({"one": "SELECT * FROM {schema}.t"})
+    assert catalog.compile('we"ird')["one"] == 'SELECT * FROM "we""ird".t'
+
+
+def test_repositories_share_the_compiled_queries():
+    assert RegisterRepositorySQL("dle")._sql is RegisterRepositorySQL("dle")._sql
+
+
+def test_repository_executes_the_compiled_string():
+    repo = RegisterRepositorySQL("dle")
+    cursor = Mock()
+    cursor.fetchone.return_value = ("Entry", None, None)
+
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        repo.get_last_station_for_user(7)
+
+    query, params = cursor.execute.call_args[0]
+    assert isinstance(query, str) and 'FROM "dle".employee_presence' in query
+    assert params == {"user_id": 7}
+
+
+def test_paginated_staff_picks_the_matching_variant():
+    repo = ActiveStaffRepositorySQL("dle")
+    cursor = Mock()
+    cursor.fetchone.return_value = (0,)
+    cursor.fetchall.return_value = []
+
+    with patch.object(ActiveStaffRepositorySQL, "_get_cursor", return_value=cursor):
+        repo.get_paginated(2, 10, search_query="ana", sort_by="line", sort_order="desc", line_id=3)
+
+    (count_sql, count_params), (page_sql, page_params) = [c[0] for c in cursor.execute.call_args_list]
+    assert "ILIKE" in count_sql and "r.line_id_fk = %s" in count_sql
+    assert "ORDER BY line_name DESC" in page_sql
+    assert page_params == ["%ana%"] * 3 + [3, 10, 10]
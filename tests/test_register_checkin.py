@@ -0,0 +1,104 @@
+from datetime import datetime
+from unittest.mock import patch
+import psycopg2
+import pytest
+
+
+def test_checkin_is_one_statement_and_returns_new_id(mock_register_repo):
+    repo, cursor, cache = mock_register_repo((10, 1, 11, 2))
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        new_id = repo.register_entry_or_assignment(user_id=123, side_id=5)
+
+    assert new_id == 11
+    cursor.execute.assert_called_once()
+    cursor.connection.commit.assert_called_once()
+    assert set(cache.invalidate_lines.call_args[0][0]) == {1, 2}
+
+
+def test_unknown_side_rolls_back_the_close(mock_register_repo):
+    repo, cursor, cache = mock_register_repo((10, 1, None, None))
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        with pytest.raises(ValueError):
+            repo.register_entry_or_assignment(user_id=123, side_id=999)
+
+    cursor.connection.rollback.assert_called_once()
+    cursor.connection.commit.assert_not_called()
+    cache.invalidate_lines.assert_not_called()
+
+
+def test_exit_only_returns_none(mock_register_repo):
+    repo, cursor, cache = mock_register_repo((10, 1, None, None))
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        assert repo.register_entry_or_assignment(user_id=123, side_id=0) is None
+    assert set(cache.invalidate_lines.call_args[0][0]) == {1}
+
+
+def test_scan_with_bad_data_is_rejected_alone(mock_register_repo):
+    repo, cursor, cache = mock_register_repo((None, None, 11, 2))
+
+    def execute(query, params=None):
+        if isinstance(params, dict) and params.get("user_id") == 2 ** 40:
+            raise psycopg2.DataError("integer out of range")
+    cursor.execute.side_effect = execute
+
+    now = datetime.now()
+    scans = [{"key": "a", "user_id": 2 ** 40, "side_id": 5, "scanned_at": now},
+             {"key": "b", "user_id": 7, "side_id": 5, "scanned_at": now}]
+    cursor.fetchone.side_effect = [("a",), ("b",), (None, None, 11, 2)]
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        results = repo.apply_scans(scans)
+
+    assert [r["status"] for r in results] == ["rejected", "applied"]
+    assert "out of range" in results[0]["error"]
+    executed = [c[0][0] for c in cursor.execute.call_args_list]
+    assert "ROLLBACK TO SAVEPOINT scan" in executed
+    cursor.connection.commit.assert_called_once()
+
+
+def test_transient_error_fails_only_that_scan_and_defers_the_employee(mock_register_repo):
+    repo, cursor, cache = mock_register_repo(None)
+
+    def execute(query, params=None):
+        if isinstance(params, dict) and params.get("user_id") == 7 and params.get("side_id") == 5:
+            raise psycopg2.extensions.QueryCanceledError("canceling statement due to lock timeout")
+    cursor.execute.side_effect = execute
+
+    now = datetime.now()
+    scans = [{"key": None, "user_id": 7, "side_id": 5, "scanned_at": now},
+             {"key": None, "user_id": 8, "side_id": 5, "scanned_at": now},
+             {"key": None, "user_id": 7, "side_id": 6, "scanned_at": now}]
+    cursor.fetchone.side_effect = [(None, None, 12, 2)]
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        results = repo.apply_scans(scans)
+
+    # El escaneo siguiente del mismo empleado no se aplica antes que el fallido
+    assert [r["status"] for r in results] == ["failed", "applied", "deferred"]
+    assert results[1]["register_id"] == 12
+    cursor.connection.commit.assert_called_once()
+
+
+def test_connection_error_fails_the_whole_batch(mock_register_repo):
+    repo, cursor, cache = mock_register_repo((None, None, 11, 2))
+    cursor.execute.side_effect = [None, psycopg2.OperationalError("server closed the connection")]
+
+    scans = [{"key": None, "user_id": 7, "side_id": 5, "scanned_at": datetime.now()}]
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        with pytest.raises(psycopg2.OperationalError):
+            repo.apply_scans(scans)
+
+    cursor.connection.rollback.assert_called_once()
+    cursor.connection.commit.assert_not_called()
+
+
+def test_purge_drops_only_expired_idempotency_keys_on_postgres(pg_register_repo, pg_conn):
+    with pg_conn.cursor() as cur:
+        cur.execute("INSERT INTO scan_idempotency (idempotency_key, applied_at) "
+                    "SELECT 'old' || g, now() - interval '8 days' FROM generate_series(1, 5) g")
+        cur.execute("INSERT INTO scan_idempotency (idempotency_key) VALUES ('new')")
+    pg_conn.commit()
+
+    assert pg_register_repo.purge_scan_idempotency(7 * 24 * 3600, batch_size=2) == 5
+
+    with pg_conn.cursor() as cur:
+        cur.execute("SELECT idempotency_key FROM scan_idempotency")
+        assert cur.fetchall() == [("new",)]
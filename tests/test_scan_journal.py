@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+import pytest
+from flask import Flask
+from app.domain.services.user_service import UserService
+from app.infra.db.scan_journal import ScanJournal, ScanJournalFlusher
+
+
+def _applied(batch):
+    return [{"key": s["key"], "status": "applied", "register_id": 1, "error": None} for s in batch]
+
+
+def test_write_behind_acknowledges_without_touching_postgres(tmp_path):
+    journal = ScanJournal(str(tmp_path / "journal.sqlite3"))
+    register_repo = Mock()
+    service = UserService(Mock(), Mock(), register_repo, scan_journal=journal)
+
+    assert service.register_entry_or_assignment(7, side_id=3, idempotency_key="k1") is None
+    # Reenvío del kiosco con la misma clave: no se duplica
+    service.register_entry_or_assignment(7, side_id=3, idempotency_key="k1")
+
+    register_repo.register_entry_or_assignment.assert_not_called()
+    assert service.get_scan_journal_backlog()["pending"] == 1
+
+
+@pytest.mark.parametrize("employee, side", [(2 ** 63, 3), (7, 3_000_000_000), (7, -5)])
+def test_out_of_range_scans_never_reach_the_journal(tmp_path, employee, side):
+    journal = ScanJournal(str(tmp_path / "journal.sqlite3"))
+    service = UserService(Mock(), Mock(), Mock(), scan_journal=journal)
+
+    with pytest.raises(ValueError):
+        service.register_entry_or_assignment(employee, side_id=side)
+    assert service.get_scan_journal_backlog()["pending"] == 0
+
+
+def test_flusher_replays_in_order_and_keeps_rejected(tmp_path):
+    journal = ScanJournal(str(tmp_path / "journal.sqlite3"))
+    for user_id in (1, 2, 3):
+        journal.append(user_id, 10, idempotency_key=f"k{user_id}")
+    repo = Mock()
+    repo.apply_scans.side_effect = lambda batch: [
+        {"key": s["key"], "status": "rejected" if s["user_id"] == 2 else "applied",
+         "register_id": None, "error": "Side con ID 10 no encontrado" if s["user_id"] == 2 else None}
+        for s in batch
+    ]
+
+    flusher = ScanJournalFlusher(Flask(__name__), journal, repo, batch_size=2)
+    assert flusher.flush_once() == 3
+
+    first_batch = repo.apply_scans.call_args_list[0][0][0]
+    assert [s["user_id"] for s in first_batch] == [1, 2]
+    assert journal.backlog() == {"pending": 0, "rejected": 1, "oldest_pending_seconds": 0.0}
+
+
+def test_failed_batch_stays_pending(tmp_path):
+    journal = ScanJournal(str(tmp_path / "journal.sqlite3"))
+    journal.append(1, 10, idempotency_key="k1")
+    repo = Mock()
+    repo.apply_scans.side_effect = ConnectionError("Postgres no disponible")
+
+    with pytest.raises(ConnectionError):
+        ScanJournalFlusher(Flask(__name__), journal, repo).flush_once()
+
+    assert journal.backlog()["pending"] == 1
+    repo.apply_scans.side_effect = _applied
+    ScanJournalFlusher(Flask(__name__), journal, repo).flush_once()
+    assert journal.backlog()["pending"] == 0
+
+
+def test_failed_scan_stays_pending_without_holding_back_the_rest(tmp_path):
+    journal = ScanJournal(str(tmp_path / "journal.sqlite3"))
+    for user_id in (1, 2):
+        journal.append(user_id, 10, idempotency_key=f"k{user_id}")
+    repo = Mock()
+    repo.apply_scans.side_effect = lambda batch: [
+        {"key": s["key"], "status": "failed" if s["user_id"] == 1 else "applied",
+         "register_id": None, "error": "deadlock detected" if s["user_id"] == 1 else None}
+        for s in batch
+    ]
+
+    # El fallido se reintenta en el siguiente ciclo, no en un bucle inmediato
+    assert ScanJournalFlusher(Flask(__name__), journal, repo).flush_once() == 2
+    repo.apply_scans.assert_called_once()
+    assert [s["key"] for s in journal.pending(10)] == ["k1"]
+
+
+def test_scan_failing_past_max_attempts_is_rejected(tmp_path):
+    journal = ScanJournal(str(tmp_path / "journal.sqlite3"), max_attempts=3)
+    journal.append(1, 10, idempotency_key="k1")
+    journal.append(1, 11, idempotency_key="k2")
+    repo = Mock()
+    repo.apply_scans.side_effect = lambda batch: [
+        {"key": s["key"], "status": "failed" if i == 0 else "deferred", "register_id": None,
+         "error": "lock timeout" if i == 0 else "Pospuesto"}
+        for i, s in enumerate(batch)
+    ]
+    flusher = ScanJournalFlusher(Flask(__name__), journal, repo)
+
+    for _ in range(3):
+        flusher.flush_once()
+
+    # El pospuesto no gasta intentos: sigue pendiente tras rechazar al primero
+    assert [s["key"] for s in journal.pending(10)] == ["k2"]
+    assert journal.backlog()["rejected"] == 1
+
+
+def test_postgres_outage_does_not_use_up_attempts(tmp_path):
+    journal = ScanJournal(str(tmp_path / "journal.sqlite3"), max_attempts=1)
+    journal.append(1, 10, idempotency_key="k1")
+    repo = Mock()
+    repo.apply_scans.side_effect = ConnectionError("Postgres no disponible")
+
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            ScanJournalFlusher(Flask(__name__), journal, repo).flush_once()
+
+    assert journal.backlog()["pending"] == 1
+
+
+def test_purge_waits_for_the_interval_and_for_old_pending_scans(tmp_path):
+    journal = ScanJournal(str(tmp_path / "journal.sqlite3"))
+    repo = Mock()
+    repo.purge_scan_idempotency.return_value = 5
+    flusher = ScanJournalFlusher(Flask(__name__), journal, repo,
+                                 retention_seconds=3600, purge_interval_seconds=3600)
+
+    assert flusher.purge_once() == 5
+    assert flusher.purge_once() is None
+    repo.purge_scan_idempotency.assert_called_once_with(3600)
+
+    # Un escaneo pendiente más viejo que la ventana podría ser un reenvío
+    journal.append(1, 10, idempotency_key="k1", scanned_at=datetime.now() - timedelta(hours=2))
+    stale = ScanJournalFlusher(Flask(__name__), journal, repo, retention_seconds=3600)
+    assert stale.purge_once() is None
+    repo.purge_scan_idempotency.assert_called_once()
+
+
+def test_only_one_flusher_holds_the_lease(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    assert ScanJournal(path).acquire_lease() is True
+    assert ScanJournal(path).acquire_lease() is False
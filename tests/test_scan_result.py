@@ -0,0 +1,90 @@
+from unittest.mock import Mock
+from flask import Flask
+from app.domain.services.station_service import StationService
+from app.domain.services.user_service import UserService
+
+
+def _raw(**overrides):
+    raw = {"user_id": 42, "name": "Ana", "last_name": "López", "register_type": "Exit",
+           "station_name": "Estación 1", "line_name": "Línea 3"}
+    raw.update(overrides)
+    return raw
+
+
+def test_scan_result_is_memoized_within_a_request():
+    register_repo = Mock()
+    register_repo.get_scan_result.return_value = _raw()
+    service = StationService(Mock(), register_repo)
+
+    with Flask(__name__).test_request_context():
+        first = service.get_scan_result(7)
+        second = service.get_scan_result(7)
+
+    assert first == second
+    assert first["user"] == "Ana López"
+    assert first["type"] == "Entrada"
+    assert first["image"] == "42.png"
+    register_repo.get_scan_result.assert_called_once_with(7)
+
+
+def test_write_clears_the_request_memo():
+    register_repo = Mock()
+    register_repo.get_scan_result.side_effect = [_raw(), _raw(register_type="Entry")]
+    stations = StationService(Mock(), register_repo)
+    users = UserService(Mock(), Mock(), register_repo)
+
+    with Flask(__name__).test_request_context():
+        assert stations.get_scan_result(7)["type"] == "Entrada"
+        users.register_entry_or_assignment(employee_number=7)
+        assert stations.get_scan_result(7)["type"] == "Salida"
+
+
+def test_unknown_card_uses_placeholders():
+    register_repo = Mock()
+    register_repo.get_scan_result.return_value = _raw(
+        user_id=None, name=None, last_name=None, register_type="Entry",
+        station_name=None, line_name=None)
+
+    result = StationService(Mock(), register_repo).get_scan_result(7)
+
+    assert result["user"] == "Usuario aún no registrado"
+    assert result["image"] is None
+    assert result["line_name"] == "Línea desconocida"
+
+
+def test_pending_scan_result_renders_without_location_when_lookup_times_out():
+    import psycopg2
+    register_repo = Mock()
+    register_repo.get_side_location.side_effect = psycopg2.extensions.QueryCanceledError("timeout")
+    users = Mock()
+    users.find_user_by_card_number.return_value = None
+
+    result = StationService(users, register_repo, side_lookup_timeout_ms=150) \
+        .get_pending_scan_result(7, side_id=3)
+
+    register_repo.get_side_location.assert_called_once_with(3, timeout_ms=150)
+    assert result["type"] == "Entrada"
+    assert result["station_name"] == "Estación desconocida"
+
+
+def test_side_location_is_served_from_memory_until_topology_changes():
+    from unittest.mock import patch
+    from app.common.occupancy_cache import OccupancyCache
+    from app.infra.db.register_repository_sql import RegisterRepositorySQL
+
+    cache = OccupancyCache()
+    repo = RegisterRepositorySQL("public", occupancy_cache=cache)
+    cursor = Mock()
+    cursor.fetchone.side_effect = [("0s",), ("Estación 1", "3", "Línea")] * 2
+
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        first = repo.get_side_location(5, timeout_ms=200)
+        assert repo.get_side_location(5, timeout_ms=200) == first
+        assert cursor.execute.call_count == 3
+        assert cursor.execute.call_args_list[0][0][1] == ("200ms",)
+
+        cache.invalidate_topology()
+        repo.get_side_location(5, timeout_ms=200)
+        assert cursor.execute.call_count == 6
+
+    assert first == {"station_name": "Estación 1", "line_name": "Línea 3"}
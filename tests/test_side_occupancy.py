@@ -0,0 +1,194 @@
+import threading
+from datetime import datetime
+from unittest.mock import Mock, patch
+import pytest
+from app.infra.db.production_lines_repository_sql import ProductionLineRepositorySQL
+
+
+def test_station_cards_read_the_side_counters():
+    repo = ProductionLineRepositorySQL("public")
+    cursor = Mock()
+    cursor.fetchall.return_value = [("Estación 1", 7, "LH", 2, 1, 3)]
+
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        cards = repo.get_station_cards_for_line(1)
+
+    query = cursor.execute.call_args[0][0]
+    assert 'LEFT JOIN "public".side_occupancy so ON so.side_id = ls.side_id' in query
+    assert "registers" not in query and "employee_presence" not in query
+    assert cards[0]["sides"][0]["employees_working"] == 1
+
+
+def test_line_summaries_sum_side_counters():
+    repo = ProductionLineRepositorySQL("public")
+    cursor = Mock()
+    cursor.fetchall.return_value = []
+
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        repo.get_all_lines_summary()
+
+    query = cursor.execute.call_args[0][0]
+    assert "SUM(so.operators)" in query and "registers" not in query
+
+
+def test_reconcile_repairs_drift_under_a_presence_lock(mock_register_repo):
+    repo, cursor, cache = mock_register_repo()
+    cursor.rowcount = 2
+
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        assert repo.reconcile_side_occupancy() == 2
+
+    statements = [c[0][0] for c in cursor.execute.call_args_list]
+    assert statements[0] == 'LOCK TABLE "public".employee_presence IN SHARE MODE'
+    assert "FULL JOIN" in statements[1] and "ON CONFLICT (side_id)" in statements[1]
+    cursor.connection.commit.assert_called_once()
+    cache.invalidate_all.assert_called_once()
+
+
+def test_reconcile_without_drift_keeps_the_cache(mock_register_repo):
+    repo, cursor, cache = mock_register_repo()
+    cursor.rowcount = 0
+
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        assert repo.reconcile_side_occupancy() == 0
+    cache.invalidate_all.assert_not_called()
+
+
+def test_failed_reconcile_rolls_back(mock_register_repo):
+    repo, cursor, _ = mock_register_repo()
+    cursor.execute.side_effect = [None, RuntimeError("boom")]
+
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        with pytest.raises(RuntimeError):
+            repo.reconcile_side_occupancy()
+    cursor.connection.rollback.assert_called_once()
+    cursor.connection.commit.assert_not_called()
+
+
+def test_batch_locks_its_side_counters_in_order_first(mock_register_repo):
+    repo, cursor, _ = mock_register_repo((None, None, 11, 2))
+    now = datetime.now()
+    scans = [{"key": None, "user_id": 7, "side_id": 5, "scanned_at": now},
+             {"key": None, "user_id": 8, "side_id": 3, "scanned_at": now},
+             {"key": None, "user_id": 9, "side_id": 2 ** 40, "scanned_at": now}]
+
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        repo.apply_scans(scans)
+
+    query, params = cursor.execute.call_args_list[0][0]
+    assert "ORDER BY side_id" in query and "side_occupancy" in query
+    # Los ids fuera de rango no llegan al bloqueo previo (se rechazan por escaneo)
+    assert params == {"side_ids": [3, 5], "user_ids": [7, 8, 9]}
+
+    # Un solo escaneo ya bloquea en orden dentro de su sentencia
+    cursor.reset_mock()
+    with patch.object(repo, "_get_cursor", return_value=cursor):
+        repo.apply_scans(scans[:1])
+    assert "side_occupancy" not in cursor.execute.call_args_list[0][0][0]
+
+
+def _counters(conn):
+    """Contadores distintos de cero y el conteo real desde la presencia."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT side_id, operators FROM side_occupancy WHERE operators <> 0")
+        counters = dict(cur.fetchall())
+        cur.execute("SELECT side_id_fk, COUNT(*) FROM employee_presence GROUP BY side_id_fk")
+        actual = dict(cur.fetchall())
+    conn.commit()
+    return counters, actual
+
+
+def test_triggers_track_checkins_moves_and_exits_on_postgres(pg_register_repo, pg_conn):
+    repo = pg_register_repo
+    for user_id in (101, 102, 103):
+        repo.register_entry_or_assignment(user_id=user_id, side_id=1)
+    repo.register_entry_or_assignment(user_id=104, side_id=2)
+    assert _counters(pg_conn) == ({1: 3, 2: 1}, {1: 3, 2: 1})
+
+    # Cambio de side (UPDATE) y salida (DELETE)
+    repo.register_entry_or_assignment(user_id=101, side_id=2)
+    repo.register_entry_or_assignment(user_id=102, side_id=0)
+    assert _counters(pg_conn) == ({1: 1, 2: 2}, {1: 1, 2: 2})
+
+
+def test_multi_row_statements_apply_net_deltas_on_postgres(pg_conn):
+    with pg_conn.cursor() as cur:
+        cur.execute("INSERT INTO employee_presence (id_employee, id_register, side_id_fk) "
+                    "SELECT g, g, 1 + g % 2 FROM generate_series(1, 6) g")
+        # Intercambio en una sentencia: los deltas se anulan por side
+        cur.execute("UPDATE employee_presence SET side_id_fk = 3 - side_id_fk "
+                    "WHERE id_employee IN (1, 2)")
+        # Traslado de dos filas en una sentencia: -2 / +2
+        cur.execute("UPDATE employee_presence SET side_id_fk = 5 WHERE id_employee IN (4, 6)")
+        cur.execute("DELETE FROM employee_presence WHERE id_employee IN (3, 5)")
+    pg_conn.commit()
+
+    assert _counters(pg_conn) == ({1: 1, 2: 1, 5: 2}, {1: 1, 2: 1, 5: 2})
+
+
+def test_bulk_logout_and_rebuild_keep_counters_on_postgres(pg_register_repo, pg_conn, pg_sides):
+    repo = pg_register_repo
+    for user_id, side_id in zip(range(101, 109), pg_sides):
+        repo.register_entry_or_assignment(user_id=user_id, side_id=side_id)
+    repo.rebuild_presence()
+    assert _counters(pg_conn)[0] == {side_id: 1 for side_id in pg_sides}
+
+    closed = repo.logout_active_users_bulk(line_ids=sorted(set(pg_sides.values())))
+    assert sum(closed.values()) == len(pg_sides)
+    assert _counters(pg_conn) == ({}, {})
+
+
+def test_reconcile_repairs_drift_on_postgres(pg_register_repo, pg_conn):
+    repo = pg_register_repo
+    repo.register_entry_or_assignment(user_id=101, side_id=1)
+    repo.register_entry_or_assignment(user_id=102, side_id=2)
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE side_occupancy SET operators = 42 WHERE side_id = 1")
+        cur.execute("DELETE FROM side_occupancy WHERE side_id = 2")
+        cur.execute("INSERT INTO side_occupancy (side_id, operators) VALUES (7, 5)")
+    pg_conn.commit()
+
+    assert repo.reconcile_side_occupancy() == 3
+    assert _counters(pg_conn) == ({1: 1, 2: 1}, {1: 1, 2: 1})
+    assert repo.reconcile_side_occupancy() == 0
+
+
+def test_concurrent_batches_on_crossed_sides_do_not_deadlock(pg_app, pg_register_repo, pg_conn):
+    repo = pg_register_repo
+    now = datetime.now()
+    batches = {
+        "a": [{"key": None, "user_id": 201, "side_id": 5, "scanned_at": now},
+              {"key": None, "user_id": 202, "side_id": 3, "scanned_at": now}],
+        "b": [{"key": None, "user_id": 203, "side_id": 3, "scanned_at": now},
+              {"key": None, "user_id": 204, "side_id": 5, "scanned_at": now}],
+    }
+    first_done = {name: threading.Event() for name in batches}
+    checkin = repo._execute_checkin
+    local = threading.local()
+
+    def interleaved(cur, *args):
+        result = checkin(cur, *args)
+        if not getattr(local, "paused", False):
+            # Tras el primer escaneo, esperar a que el otro lote aplique el suyo
+            local.paused = True
+            first_done[local.name].set()
+            first_done["b" if local.name == "a" else "a"].wait(1)
+        return result
+
+    results = {}
+
+    def run(name):
+        local.name = name
+        with pg_app.app_context():
+            results[name] = repo.apply_scans(batches[name])
+
+    with patch.object(repo, "_execute_checkin", side_effect=interleaved):
+        threads = [threading.Thread(target=run, args=(name,)) for name in batches]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10)
+
+    statuses = [r["status"] for name in batches for r in results[name]]
+    assert statuses == ["applied"] * 4
+    assert _counters(pg_conn) == ({3: 2, 5: 2}, {3: 2, 5: 2})
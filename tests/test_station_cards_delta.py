@@ -0,0 +1,67 @@
+from unittest.mock import Mock
+from app.common.occupancy_cache import OccupancyCache
+from app.domain.services.dashboard_service import DashboardService
+
+
+def _cards(lh, rh):
+    return [{
+        "position_name": "Estación 1",
+        "position_id": 10,
+        "status": True,
+        "sides": [
+            {"side_id": 1, "side_title": "LH", "employee_capacity": 1, "employees_working": lh},
+            {"side_id": 2, "side_title": "RH", "employee_capacity": 1, "employees_working": rh},
+        ]
+    }]
+
+
+def _service(*snapshots):
+    repo = Mock()
+    repo.get_station_cards_for_line.side_effect = list(snapshots)
+    # TTL 0: cada llamada recarga, como si otro worker hubiera escrito
+    return DashboardService(Mock(), repo, OccupancyCache(ttl_seconds=0))
+
+
+def test_first_call_returns_full_tree_with_version():
+    service = _service(_cards(0, 0))
+    delta = service.get_station_cards_delta(1)
+    assert delta["full"] is True
+    assert delta["version"] > 0
+    assert len(delta["cards"][0]["sides"]) == 2
+
+
+def test_unchanged_line_returns_none():
+    service = _service(_cards(0, 0), _cards(0, 0))
+    first = service.get_station_cards_delta(1)
+    assert service.get_station_cards_delta(1, since=first["version"]) is None
+
+
+def test_since_returns_only_changed_sides():
+    service = _service(_cards(0, 0), _cards(1, 0))
+    first = service.get_station_cards_delta(1)
+
+    delta = service.get_station_cards_delta(1, since=first["version"])
+
+    assert delta["full"] is False
+    assert delta["version"] > first["version"]
+    assert [s["side_id"] for s in delta["sides"]] == [1]
+    assert delta["sides"][0]["employees_working"] == 1
+
+
+def test_unknown_version_falls_back_to_full_tree():
+    service = _service(_cards(0, 0), _cards(1, 0))
+    service.get_station_cards_delta(1)
+    delta = service.get_station_cards_delta(1, since=12345)
+    assert delta["full"] is True
+
+
+def test_history_is_kept_only_for_existing_lines_and_bounded():
+    repo = Mock()
+    repo.get_station_cards_for_line.side_effect = lambda line_id: _cards(0, 0) if line_id < 4 else []
+    service = DashboardService(Mock(), repo, OccupancyCache(ttl_seconds=0))
+    service.CARDS_HISTORY_LINES = 2
+
+    for line_id in (1, 2, 3, 1000, 1001):
+        service.get_station_cards_delta(line_id)
+
+    assert list(service._cards_history) == [2, 3]
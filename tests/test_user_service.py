@@ -29,3 +29,13 @@ def test_get_user_info_for_display_not_found():
     info = service.get_user_info_for_display(999)
     assert info['name'] == 'Usuario aún no registrado'
     assert info['id'] is None
+
+def test_provision_missing_defaults_uses_machine_groups_by_default():
+    lines_repo = Mock()
+    lines_repo.provision_missing_defaults.return_value = {"positions_created": 2, "sides_created": 3}
+    service = UserService(Mock(), lines_repo, Mock())
+
+    created = service.provision_missing_defaults()
+
+    assert created == {"positions_created": 2, "sides_created": 3}
+    lines_repo.provision_missing_defaults.assert_called_once_with(["Inyección", "Metalizado"])